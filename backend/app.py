@@ -7,14 +7,57 @@ from config import Config
 from routes.user_routes import init_user_routes
 from routes.health_routes import init_health_routes
 from routes.food_routes import init_food_routes
+from routes.dashboard_routes import init_dashboard_routes
+from routes.history_routes import init_history_routes
+from routes.metrics_routes import init_metrics_routes
+from routes.job_routes import init_job_routes
+from services.container import ServiceContainer
 from utils.logger import setup_logger, log_function_call
+from utils.profiler import init_profiler
+from utils.encoding import init_response_encoding
+from utils.lifecycle import register_shutdown_hook
 
 # Set up logger
 logger = setup_logger('app')
 
+# Loaded once per process; under gunicorn this happens in the master before
+# forking so workers share the model pages (see gunicorn.conf.py)
+_diabetes_model = None
+
+def load_diabetes_model():
+    """Load the diabetes model once and cache it for the process"""
+    global _diabetes_model
+    if _diabetes_model is None:
+        logger.info('Loading ML model')
+        _diabetes_model = joblib.load(Config.DIABETES_MODEL_PATH)
+        logger.info('ML model loaded successfully')
+    return _diabetes_model
+
+def init_firebase():
+    """Initialize the Firebase app (once per process) and return a Firestore client.
+
+    gRPC channels do not survive fork(), so under gunicorn this must run in
+    the worker, after forking.
+    """
+    try:
+        firebase_admin.get_app()
+    except ValueError:
+        logger.info('Initializing Firebase')
+        cred = credentials.Certificate(Config.FIREBASE_CREDENTIALS_PATH)
+        firebase_admin.initialize_app(cred)
+        logger.info('Firebase initialized successfully')
+    db = firestore.client()
+    register_shutdown_hook(db.close, 'firestore_client')
+    return db
+
 @log_function_call(logger)
-def create_app():
-    """Create and configure the Flask application"""
+def create_app(db=None, diabetes_model=None):
+    """Create and configure the Flask application.
+
+    ``db`` and ``diabetes_model`` can be passed in to run the app against
+    stand-in dependencies (see ``benchmarks/fakes.py``); by default Firebase
+    is initialized and the model is loaded from ``Config``.
+    """
     logger.info('Initializing Flask application')
     
     # Initialize Flask app
@@ -29,24 +72,36 @@ def create_app():
     
     logger.debug('Flask app initialized with config', extra={'config': str(Config)})
 
+    # Fast JSON encoding and response compression
+    init_response_encoding(app)
+
+    # Per-request profiling hooks (no-op unless PROFILING_ENABLED is set).
+    # Registered after compression: after_request hooks run in reverse order,
+    # so an inline profile replaces the body before it is compressed
+    init_profiler(app)
+
     try:
-        # Initialize Firebase
-        logger.info('Initializing Firebase')
-        cred = credentials.Certificate(Config.FIREBASE_CREDENTIALS_PATH)
-        firebase_admin.initialize_app(cred)
-        db = firestore.client()
-        logger.info('Firebase initialized successfully')
+        if db is None:
+            # Initialize Firebase
+            db = init_firebase()
 
-        # Load ML model
-        logger.info('Loading ML model')
-        diabetes_model = joblib.load(Config.DIABETES_MODEL_PATH)
-        logger.info('ML model loaded successfully')
+        if diabetes_model is None:
+            # Load ML model
+            diabetes_model = load_diabetes_model()
+
+        # One instance of each service for the whole process
+        services = ServiceContainer(db, diabetes_model)
+        app.extensions['services'] = services
 
         # Initialize routes
         logger.info('Initializing route blueprints')
-        user_bp = init_user_routes(db)
-        health_bp = init_health_routes(db, diabetes_model)
-        food_bp = init_food_routes(db)
+        user_bp = init_user_routes(services)
+        health_bp = init_health_routes(services)
+        food_bp = init_food_routes(services)
+        dashboard_bp = init_dashboard_routes(services)
+        history_bp = init_history_routes(services)
+        metrics_bp = init_metrics_routes()
+        job_bp = init_job_routes(services)
         logger.debug('Route blueprints initialized')
 
         # Register blueprints
@@ -54,8 +109,16 @@ def create_app():
         app.register_blueprint(user_bp, url_prefix='/api/user')
         app.register_blueprint(health_bp, url_prefix='/api/health')
         app.register_blueprint(food_bp, url_prefix='/api/food')
+        app.register_blueprint(dashboard_bp, url_prefix='/api/dashboard')
+        app.register_blueprint(history_bp, url_prefix='/api/history')
+        app.register_blueprint(metrics_bp, url_prefix='/api/metrics')
+        app.register_blueprint(job_bp, url_prefix='/api/jobs')
         logger.info('Blueprints registered successfully')
 
+        # Background job workers, once every job kind has its handler
+        services.job_service.start()
+        register_shutdown_hook(services.job_service.shutdown, 'job_service')
+
         return app
     except Exception as e:
         logger.error('Error during app initialization', extra={'error': str(e)})
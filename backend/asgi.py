@@ -0,0 +1,10 @@
+"""ASGI entry point.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000 --workers 2
+
+Long-running endpoints (chat, plan, advice) run as coroutines, so a process
+can hold thousands of them in flight without a thread each.
+"""
+from async_app import create_asgi_app
+
+app = create_asgi_app()
@@ -0,0 +1,74 @@
+from a2wsgi import WSGIMiddleware
+from quart import Quart
+from config import Config
+from app import create_app, init_firebase, load_diabetes_model
+from routes.async_routes import init_async_routes, ASYNC_ROUTES
+from utils.async_offload import BackgroundTasks
+from utils.encoding import init_async_response_encoding
+from utils.logger import setup_logger, log_function_call
+
+# Set up logger
+logger = setup_logger('async_app')
+
+
+class AsyncDispatcher:
+    """ASGI app sending the async routes to Quart and everything else to Flask.
+
+    Requests for a background job (``Prefer: respond-async``) only queue the
+    job, so they go to Flask, which owns the job workers.
+    """
+
+    def __init__(self, async_app, wsgi_app):
+        self.async_app = async_app
+        # Synchronous Flask routes run on a fixed-size thread pool
+        self.wsgi_app = WSGIMiddleware(wsgi_app, workers=Config.ASYNC_WSGI_THREADS)
+
+    @staticmethod
+    def wants_job(scope):
+        return any(
+            name == b'prefer' and b'respond-async' in value.lower()
+            for name, value in scope.get('headers', ())
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and (
+            (scope['method'], scope['path']) not in ASYNC_ROUTES or self.wants_job(scope)
+        ):
+            return await self.wsgi_app(scope, receive, send)
+        # Async routes plus lifespan events
+        return await self.async_app(scope, receive, send)
+
+
+@log_function_call(logger)
+def create_asgi_app(db=None, diabetes_model=None):
+    """Create the ASGI application.
+
+    The chat, plan and advice POST endpoints run on Quart coroutines; the
+    remaining endpoints are served by the regular Flask app.
+    """
+    if db is None:
+        db = init_firebase()
+    if diabetes_model is None:
+        diabetes_model = load_diabetes_model()
+
+    flask_app = create_app(db=db, diabetes_model=diabetes_model)
+
+    async_app = Quart(__name__)
+    init_async_response_encoding(async_app)
+    background = BackgroundTasks()
+    # Same services as the Flask routes
+    async_app.register_blueprint(init_async_routes(flask_app.extensions['services'], background))
+
+    @async_app.after_request
+    async def add_cors_headers(response):
+        # Same default as flask_cors on the Flask app; preflight OPTIONS
+        # requests are answered by the Flask app
+        response.headers.setdefault('Access-Control-Allow-Origin', '*')
+        return response
+
+    @async_app.after_serving
+    async def flush_background_tasks():
+        await background.drain()
+
+    logger.info('ASGI application created')
+    return AsyncDispatcher(async_app, flask_app)
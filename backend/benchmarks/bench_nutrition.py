@@ -0,0 +1,89 @@
+"""Lookup latency and memory footprint of the bundled nutrition table.
+
+Loads ``data/nutrition.csv`` into ``NutritionTable`` while tracing
+allocations, then times ``lookup`` for exact names, aliases, misspellings
+(fuzzy matches) and foods that are not in the table (misses, which fall
+back to the model in the app).
+
+Usage (from the ``backend`` directory)::
+
+    python -m benchmarks.bench_nutrition --iterations 20000 --output nutrition_bench.json
+"""
+import argparse
+import json
+import logging
+import time
+import tracemalloc
+
+from benchmarks.run_benchmarks import percentile
+from config import Config
+from services.nutrition_table import NutritionTable
+
+QUERIES = {
+    'exact': ['apple', 'chicken breast', 'brown rice', 'greek yogurt', 'olive oil'],
+    'alias': ['apples', 'Grilled Chicken', 'porridge', 'garbanzo beans', 'Fries'],
+    'fuzzy': ['bannana', 'brocoli', 'avocadoes', 'chick peas', 'salmon filet'],
+    'miss': ['apple pie with custard', 'beef wellington', 'pad thai', 'xyz', 'grilled halloumi skewers'],
+}
+
+
+def measure_load(path, threshold):
+    """Build the table; returns (table, seconds, bytes allocated)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    table = NutritionTable.from_csv(path, threshold)
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return table, elapsed, current
+
+
+def measure_lookups(table, queries, iterations):
+    """Per-lookup latency percentiles in microseconds"""
+    samples = []
+    for index in range(iterations):
+        query = queries[index % len(queries)]
+        start = time.perf_counter()
+        table.lookup(query)
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return {
+        'p50': round(percentile(samples, 50), 2),
+        'p99': round(percentile(samples, 99), 2),
+        'mean': round(sum(samples) / len(samples), 2),
+        'matched': sum(table.match(query) is not None for query in queries),
+        'queries': len(queries),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--path', default=Config.NUTRITION_TABLE_PATH, help='nutrition CSV to load')
+    parser.add_argument('--threshold', type=float, default=Config.NUTRITION_MATCH_THRESHOLD)
+    parser.add_argument('--iterations', type=int, default=10000, help='lookups per query kind')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args(argv)
+
+    # Keep the app loggers quiet while timing
+    logging.disable(logging.CRITICAL)
+
+    table, load_seconds, load_bytes = measure_load(args.path, args.threshold)
+    results = {
+        'foods': len(table),
+        'load_ms': round(load_seconds * 1000, 2),
+        'memory_kib': round(load_bytes / 1024, 1),
+        'lookup_us': {kind: measure_lookups(table, queries, args.iterations) for kind, queries in QUERIES.items()},
+    }
+
+    print(f"{results['foods']} foods, loaded in {results['load_ms']} ms, {results['memory_kib']} KiB")
+    for kind, stats in results['lookup_us'].items():
+        print(f"{kind:6s} p50={stats['p50']:8.2f}us p99={stats['p99']:8.2f}us "
+              f"matched {stats['matched']}/{stats['queries']}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f'Results written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""WSGI entry point serving the app against the local fakes.
+
+Lets the benchmark harness drive a real server over HTTP::
+
+    python -m benchmarks.fake_app                 # Flask dev server
+    python -m benchmarks.run_benchmarks --base-url http://127.0.0.1:5000
+
+    PRELOAD_MODEL=false gunicorn -c gunicorn.conf.py benchmarks.fake_app:app
+    BENCH_ASGI=true uvicorn benchmarks.fake_app:app --port 5000
+
+Fake latencies are read from the environment (seconds):
+``BENCH_GEMINI_LATENCY``, ``BENCH_GEMINI_JITTER``, ``BENCH_CLARIFAI_LATENCY``
+and ``BENCH_FIRESTORE_LATENCY``.
+
+Each gunicorn worker has its own in-memory Firestore, so the benchmark users
+(``BENCH_USERS``, default 100) are seeded into every worker at import time.
+"""
+import os
+
+from benchmarks.fakes import build_fake_app
+from benchmarks.run_benchmarks import SAMPLE_PROFILE
+
+app, db = build_fake_app(
+    gemini_latency=float(os.environ.get('BENCH_GEMINI_LATENCY', '0')),
+    gemini_jitter=float(os.environ.get('BENCH_GEMINI_JITTER', '0')),
+    clarifai_latency=float(os.environ.get('BENCH_CLARIFAI_LATENCY', '0')),
+    firestore_latency=float(os.environ.get('BENCH_FIRESTORE_LATENCY', '0')),
+    asgi=os.environ.get('BENCH_ASGI', 'False').lower() == 'true',
+)
+
+for index in range(int(os.environ.get('BENCH_USERS', '100'))):
+    uid = f'bench-user-{index}'
+    db.collection('users').document(uid).set({
+        'email': f'{uid}@bench.local',
+        'display_name': uid,
+        **SAMPLE_PROFILE,
+        'last_metrics': {'bmi': 29.0, 'bmi_class': 'overweight', 'bmr': 1920.0, 'tdee': 2640.0},
+    })
+
+if __name__ == '__main__':
+    # The development server only serves the WSGI app
+    app.run(host='127.0.0.1', port=int(os.environ.get('PORT', '5000')), threaded=True)
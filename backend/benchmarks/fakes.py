@@ -0,0 +1,759 @@
+"""Local stand-ins for the Google services used by the backend.
+
+These fakes let ``create_app`` run without network access so the service
+can be benchmarked offline:
+
+- ``FakeFirestore``: in-memory collections/documents with the subset of the
+  Firestore client API the services use (queries, batches, transactions,
+  ``get_all``).
+- ``FakeGenaiClient``: a ``genai.Client`` replacement returning canned
+  responses that match the requested output schema, after a configurable
+  latency.
+- ``FakeClarifaiModel``: a Clarifai ``Model`` replacement with a fixed
+  prediction.
+- ``mint_token`` / ``verify_id_token``: a Firebase Auth token verifier that
+  accepts locally minted tokens.
+
+``install_fakes`` patches all of them in and returns a callable that removes
+the patches again.
+"""
+import base64
+import copy
+import itertools
+import json
+import random
+import re
+import threading
+import time
+import typing
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest import mock
+
+import firebase_admin.auth
+from google.api_core import exceptions as google_exceptions
+from google.cloud import firestore as gc_firestore
+
+FAKE_TOKEN_PREFIX = 'fake-token.'
+
+
+# ---------------------------------------------------------------------------
+# Firestore
+# ---------------------------------------------------------------------------
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def _resolve_transforms(data):
+    """Replace SERVER_TIMESTAMP sentinels the way the server would"""
+    resolved = {}
+    for key, value in data.items():
+        if value is gc_firestore.SERVER_TIMESTAMP:
+            resolved[key] = _now()
+        elif isinstance(value, dict):
+            resolved[key] = _resolve_transforms(value)
+        else:
+            resolved[key] = copy.deepcopy(value)
+    return resolved
+
+
+def _get_field(data, field_path):
+    value = data
+    for part in field_path.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            raise KeyError(field_path)
+        value = value[part]
+    return value
+
+
+def _set_field(data, field_path, value):
+    parts = field_path.split('.')
+    target = data
+    for part in parts[:-1]:
+        target = target.setdefault(part, {})
+    if value is gc_firestore.DELETE_FIELD:
+        target.pop(parts[-1], None)
+    else:
+        target[parts[-1]] = value
+
+
+def _project(data, field_paths):
+    if field_paths is None:
+        return data
+    projected = {}
+    for field_path in field_paths:
+        try:
+            _set_field(projected, field_path, _get_field(data, field_path))
+        except KeyError:
+            continue
+    return projected
+
+
+class FakeDocumentSnapshot:
+    def __init__(self, reference, data, create_time=None, update_time=None):
+        self.reference = reference
+        self._data = data
+        self.create_time = create_time
+        self.update_time = update_time
+
+    @property
+    def id(self):
+        return self.reference.id
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field_path):
+        if self._data is None:
+            return None
+        return copy.deepcopy(_get_field(self._data, field_path))
+
+
+class FakeDocumentReference:
+    def __init__(self, db, path):
+        self._db = db
+        self.path = path
+
+    @property
+    def id(self):
+        return self.path.rsplit('/', 1)[-1]
+
+    @property
+    def parent(self):
+        return FakeCollectionReference(self._db, self.path.rsplit('/', 1)[0])
+
+    def collection(self, name):
+        return FakeCollectionReference(self._db, f'{self.path}/{name}')
+
+    def get(self, field_paths=None, transaction=None):
+        return self._db._snapshot(self.path, field_paths)
+
+    def set(self, data, merge=False):
+        self._db._write(self.path, data, merge=merge)
+
+    def update(self, data):
+        self._db._update(self.path, data)
+
+    def create(self, data):
+        self._db._create(self.path, data)
+
+    def delete(self):
+        self._db._delete(self.path)
+
+
+class FakeQuery:
+    def __init__(self, collection, filters=(), orders=(), limit=None,
+                 projection=None, start_after=None):
+        self._collection = collection
+        self._filters = tuple(filters)
+        self._orders = tuple(orders)
+        self._limit = limit
+        self._projection = projection
+        self._start_after = start_after
+
+    def _copy(self, **changes):
+        params = {
+            'filters': self._filters,
+            'orders': self._orders,
+            'limit': self._limit,
+            'projection': self._projection,
+            'start_after': self._start_after,
+        }
+        params.update(changes)
+        return FakeQuery(self._collection, **params)
+
+    def where(self, field_path=None, op_string=None, value=None, filter=None):
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        return self._copy(filters=self._filters + ((field_path, op_string, value),))
+
+    def order_by(self, field_path, direction='ASCENDING'):
+        return self._copy(orders=self._orders + ((field_path, direction),))
+
+    def limit(self, count):
+        return self._copy(limit=count)
+
+    def select(self, field_paths):
+        return self._copy(projection=list(field_paths))
+
+    def start_after(self, document_fields_or_snapshot):
+        return self._copy(start_after=document_fields_or_snapshot)
+
+    def _matches(self, data):
+        for field_path, op, expected in self._filters:
+            try:
+                actual = _get_field(data, field_path)
+            except KeyError:
+                return False
+            if op == '==' and not actual == expected:
+                return False
+            if op == '!=' and not actual != expected:
+                return False
+            if op == '<' and not actual < expected:
+                return False
+            if op == '<=' and not actual <= expected:
+                return False
+            if op == '>' and not actual > expected:
+                return False
+            if op == '>=' and not actual >= expected:
+                return False
+            if op == 'in' and actual not in expected:
+                return False
+            if op == 'array_contains' and expected not in actual:
+                return False
+        return True
+
+    def get(self, transaction=None):
+        return list(self.stream())
+
+    def stream(self, transaction=None):
+        items = [
+            (path, data) for path, data in self._collection._db._documents_in(self._collection.path)
+            if self._matches(data)
+        ]
+
+        # Firestore drops documents missing an order_by field
+        for field_path, _ in self._orders:
+            if field_path != '__name__':
+                items = [item for item in items if _has_field(item[1], field_path)]
+
+        for field_path, direction in reversed(self._orders):
+            reverse = direction in ('DESCENDING', gc_firestore.Query.DESCENDING)
+            items.sort(key=lambda item: _order_value(item, field_path), reverse=reverse)
+
+        if self._start_after is not None:
+            items = self._apply_cursor(items)
+
+        if self._limit is not None:
+            items = items[:self._limit]
+
+        db = self._collection._db
+        for path, data in items:
+            meta = db._meta.get(path, {})
+            yield FakeDocumentSnapshot(
+                FakeDocumentReference(db, path),
+                copy.deepcopy(_project(data, self._projection)),
+                meta.get('create_time'),
+                meta.get('update_time'),
+            )
+
+    def _apply_cursor(self, items):
+        cursor = self._start_after
+        if isinstance(cursor, FakeDocumentSnapshot):
+            paths = [path for path, _ in items]
+            if cursor.reference.path in paths:
+                return items[paths.index(cursor.reference.path) + 1:]
+            cursor = {**(cursor.to_dict() or {}), '__name__': cursor.reference.path}
+
+        if not self._orders:
+            for index, (_, data) in enumerate(items):
+                if all(_has_field(data, f) and _get_field(data, f) == v for f, v in cursor.items()):
+                    return items[index + 1:]
+            return items
+
+        # Like Firestore: keep the items that sort strictly after the cursor
+        # values, compared field by field in order_by order
+        def after_cursor(item):
+            for field_path, direction in self._orders:
+                expected = cursor[field_path]
+                if field_path == '__name__' and '/' not in str(expected):
+                    expected = f'{self._collection.path}/{expected}'
+                actual = _order_value(item, field_path)
+                if actual == expected:
+                    continue
+                descending = direction in ('DESCENDING', gc_firestore.Query.DESCENDING)
+                return actual < expected if descending else actual > expected
+            return False
+
+        return [item for item in items if after_cursor(item)]
+
+def _has_field(data, field_path):
+    try:
+        _get_field(data, field_path)
+        return True
+    except KeyError:
+        return False
+
+
+def _order_value(item, field_path):
+    path, data = item
+    if field_path == '__name__':
+        return path
+    return _get_field(data, field_path)
+
+
+class FakeCollectionReference(FakeQuery):
+    def __init__(self, db, path):
+        self._db = db
+        self.path = path
+        super().__init__(self)
+
+    @property
+    def id(self):
+        return self.path.rsplit('/', 1)[-1]
+
+    def document(self, document_id=None):
+        document_id = document_id or uuid.uuid4().hex[:20]
+        return FakeDocumentReference(self._db, f'{self.path}/{document_id}')
+
+    def add(self, document_data, document_id=None):
+        ref = self.document(document_id)
+        ref.set(document_data)
+        return self._db._meta[ref.path]['update_time'], ref
+
+
+class FakeWriteBatch:
+    def __init__(self, db):
+        self._db = db
+        self._ops = []
+
+    def set(self, reference, document_data, merge=False):
+        self._ops.append(lambda: reference.set(document_data, merge=merge))
+        return self
+
+    def update(self, reference, field_updates):
+        self._ops.append(lambda: reference.update(field_updates))
+        return self
+
+    def create(self, reference, document_data):
+        self._ops.append(lambda: reference.create(document_data))
+        return self
+
+    def delete(self, reference):
+        self._ops.append(reference.delete)
+        return self
+
+    def commit(self):
+        with self._db._lock:
+            for op in self._ops:
+                op()
+        results = [SimpleNamespace(update_time=_now()) for _ in self._ops]
+        self._ops = []
+        return results
+
+
+class FakeTransaction(FakeWriteBatch):
+    """Transaction for functions decorated with ``firestore.transactional``.
+
+    Holds the database lock from ``_begin`` until it commits or rolls back,
+    so transactions never conflict and are not retried.
+    """
+
+    _read_only = False
+    _max_attempts = 5
+
+    def __init__(self, db):
+        super().__init__(db)
+        self._id = None
+
+    def _begin(self, retry_id=None):
+        self._db._lock.acquire()
+        self._id = uuid.uuid4().bytes
+
+    def _release(self):
+        if self._id is not None:
+            self._id = None
+            self._db._lock.release()
+
+    def _clean_up(self):
+        self._ops = []
+        self._release()
+
+    def _commit(self):
+        try:
+            return self.commit()
+        finally:
+            self._release()
+
+    def _rollback(self):
+        self._ops = []
+        self._release()
+
+
+class FakeFirestore:
+    """In-memory stand-in for ``google.cloud.firestore.Client``"""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self._lock = threading.RLock()
+        self._docs = {}
+        self._meta = {}
+
+    def _sleep(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _documents_in(self, collection_path):
+        self._sleep()
+        prefix = collection_path + '/'
+        with self._lock:
+            return [
+                (path, data) for path, data in self._docs.items()
+                if path.startswith(prefix) and '/' not in path[len(prefix):]
+            ]
+
+    def _snapshot(self, path, field_paths=None):
+        self._sleep()
+        with self._lock:
+            data = self._docs.get(path)
+            meta = self._meta.get(path, {})
+            data = copy.deepcopy(_project(data, field_paths)) if data is not None else None
+        return FakeDocumentSnapshot(
+            FakeDocumentReference(self, path), data,
+            meta.get('create_time'), meta.get('update_time')
+        )
+
+    def _write(self, path, data, merge=False):
+        self._sleep()
+        resolved = _resolve_transforms(data)
+        with self._lock:
+            now = _now()
+            if merge and path in self._docs:
+                merged = copy.deepcopy(self._docs[path])
+                for key, value in resolved.items():
+                    _set_field(merged, key, value)
+                resolved = merged
+            self._docs[path] = resolved
+            meta = self._meta.setdefault(path, {'create_time': now})
+            meta['update_time'] = now
+
+    def _create(self, path, data):
+        with self._lock:
+            if path in self._docs:
+                raise google_exceptions.Conflict(f'Document already exists: {path}')
+            self._write(path, data)
+
+    def _update(self, path, data):
+        self._sleep()
+        resolved = _resolve_transforms(data)
+        with self._lock:
+            if path not in self._docs:
+                raise google_exceptions.NotFound(f'No document to update: {path}')
+            updated = copy.deepcopy(self._docs[path])
+            for field_path, value in resolved.items():
+                _set_field(updated, field_path, value)
+            self._docs[path] = updated
+            self._meta[path]['update_time'] = _now()
+
+    def _delete(self, path):
+        self._sleep()
+        with self._lock:
+            self._docs.pop(path, None)
+            self._meta.pop(path, None)
+
+    def collection(self, name):
+        return FakeCollectionReference(self, name)
+
+    def document(self, path):
+        return FakeDocumentReference(self, path)
+
+    def batch(self):
+        return FakeWriteBatch(self)
+
+    def transaction(self, **kwargs):
+        return FakeTransaction(self)
+
+    def get_all(self, references, field_paths=None, transaction=None):
+        self._sleep()
+        for reference in references:
+            with self._lock:
+                data = self._docs.get(reference.path)
+                meta = self._meta.get(reference.path, {})
+                data = copy.deepcopy(_project(data, field_paths)) if data is not None else None
+            yield FakeDocumentSnapshot(
+                reference, data, meta.get('create_time'), meta.get('update_time')
+            )
+
+    def document_count(self, collection_path):
+        return len(self._documents_in(collection_path))
+
+
+# ---------------------------------------------------------------------------
+# Gemini
+# ---------------------------------------------------------------------------
+
+def _sample_value(annotation, index):
+    origin = typing.get_origin(annotation)
+    if origin in (list, typing.List):
+        (item_type,) = typing.get_args(annotation) or (str,)
+        return [_sample_value(item_type, i) for i in range(2)]
+    if hasattr(annotation, 'model_fields'):
+        return _sample_object(annotation, index)
+    if annotation is int:
+        return 100 + index
+    if annotation is float:
+        return 1.5 + index
+    if annotation is bool:
+        return index % 2 == 0
+    return f'sample text {index}'
+
+
+def _sample_object(model_class, index):
+    return {
+        name: _sample_value(field.annotation, index)
+        for name, field in model_class.model_fields.items()
+    }
+
+
+def _prompt_food_items(prompt):
+    """Food names of a batch prompt (the JSON list it embeds), or None"""
+    match = re.search(r'\[.*?\]', prompt or '')
+    if not match:
+        return None
+    try:
+        return json.loads(match.group(0))
+    except ValueError:
+        return None
+
+
+def canned_response(response_schema, items=3, prompt=None):
+    """Return a JSON string matching ``list[Model]`` style response schemas.
+
+    Per-food batch schemas (a ``food_item`` field) get one object per food
+    listed in the prompt.
+    """
+    if response_schema is None:
+        return 'This is a canned answer from the offline Gemini stand-in.'
+    if typing.get_origin(response_schema) in (list, typing.List):
+        (model_class,) = typing.get_args(response_schema)
+        food_items = _prompt_food_items(prompt) if 'food_item' in model_class.model_fields else None
+        if food_items:
+            return json.dumps([{**_sample_object(model_class, i), 'food_item': name}
+                               for i, name in enumerate(food_items)])
+        return json.dumps([_sample_object(model_class, i) for i in range(items)])
+    return json.dumps(_sample_object(response_schema, 0))
+
+
+class _FakeLatency:
+    def __init__(self, latency, jitter):
+        self.latency = latency
+        self.jitter = jitter
+
+    def wait(self, config=None):
+        delay = self.latency + random.uniform(0, self.jitter) if self.jitter else self.latency
+        # Honour the per-request timeout like the real client does
+        timeout = ((config or {}).get('http_options') or {}).get('timeout') if isinstance(config, dict) else None
+        if timeout is not None and delay > timeout / 1000:
+            time.sleep(timeout / 1000)
+            raise TimeoutError('Fake Gemini request timed out')
+        if delay > 0:
+            time.sleep(delay)
+
+
+class _FakeModels:
+    def __init__(self, client):
+        self._client = client
+
+    def generate_content(self, model, contents, config=None):
+        self._client.calls += 1
+        self._client.latency.wait(config)
+        schema = (config or {}).get('response_schema') if isinstance(config, dict) else None
+        return SimpleNamespace(text=canned_response(schema, prompt=contents))
+
+
+class _FakeChat:
+    def __init__(self, client, history):
+        self._client = client
+        self.history = list(history or [])
+
+    def send_message(self, message, config=None):
+        self._client.calls += 1
+        self._client.latency.wait(config)
+        return SimpleNamespace(text=f'Canned reply to: {message}')
+
+
+class _FakeChats:
+    def __init__(self, client):
+        self._client = client
+
+    def create(self, model, history=None, config=None):
+        return _FakeChat(self._client, history)
+
+
+class FakeGenaiClient:
+    """Stand-in for ``google.genai.Client`` with configurable latency"""
+
+    latency_seconds = 0.0
+    jitter_seconds = 0.0
+
+    def __init__(self, api_key=None, **kwargs):
+        self.calls = 0
+        self.latency = _FakeLatency(self.latency_seconds, self.jitter_seconds)
+        self.models = _FakeModels(self)
+        self.chats = _FakeChats(self)
+
+
+# ---------------------------------------------------------------------------
+# Clarifai
+# ---------------------------------------------------------------------------
+
+class FakeClarifaiModel:
+    """Stand-in for ``clarifai.client.model.Model``"""
+
+    latency_seconds = 0.0
+    concepts = (('apple', 0.97), ('banana', 0.02))
+
+    def __init__(self, url=None, pat=None, **kwargs):
+        self.url = url
+
+    def _prediction(self):
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        concepts = [SimpleNamespace(name=name, value=value) for name, value in self.concepts]
+        return SimpleNamespace(outputs=[SimpleNamespace(data=SimpleNamespace(concepts=concepts))])
+
+    def predict_by_filepath(self, filepath, input_type=None, **kwargs):
+        return self._prediction()
+
+    def predict_by_bytes(self, input_bytes, input_type=None, **kwargs):
+        return self._prediction()
+
+
+# ---------------------------------------------------------------------------
+# Firebase Auth
+# ---------------------------------------------------------------------------
+
+def mint_token(uid, email=None, expires_in=3600):
+    """Create a token accepted by ``verify_id_token``"""
+    payload = {'uid': uid, 'email': email, 'exp': time.time() + expires_in}
+    encoded = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+    return FAKE_TOKEN_PREFIX + encoded
+
+
+def verify_id_token(id_token, app=None, check_revoked=False, clock_skew_seconds=0):
+    """Verify a locally minted token, mirroring ``firebase_admin.auth``"""
+    if not id_token or not id_token.startswith(FAKE_TOKEN_PREFIX):
+        raise firebase_admin.auth.InvalidIdTokenError('Token was not minted locally')
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(id_token[len(FAKE_TOKEN_PREFIX):]))
+    except ValueError as e:
+        raise firebase_admin.auth.InvalidIdTokenError('Malformed token', cause=e)
+    if payload['exp'] < time.time():
+        raise firebase_admin.auth.InvalidIdTokenError('Token expired')
+    return {'uid': payload['uid'], 'user_id': payload['uid'], 'email': payload.get('email')}
+
+
+class FakeAuthDirectory:
+    """Users known to the fake Firebase Auth (for login/signup).
+
+    Accounts for any address in ``implicit_domain`` exist implicitly, so a
+    separately started server can be logged into without seeding it first.
+    """
+
+    implicit_domain = '@bench.local'
+
+    def __init__(self):
+        self._users = {}
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def create_user(self, email=None, password=None, display_name=None, **kwargs):
+        with self._lock:
+            uid = f'fake-uid-{next(self._counter)}'
+            record = SimpleNamespace(uid=uid, email=email, display_name=display_name)
+            self._users[email] = record
+            return record
+
+    def get_user_by_email(self, email, app=None):
+        with self._lock:
+            if email not in self._users and email.endswith(self.implicit_domain):
+                uid = email[:-len(self.implicit_domain)]
+                self._users[email] = SimpleNamespace(uid=uid, email=email, display_name=uid)
+            if email not in self._users:
+                raise firebase_admin.auth.UserNotFoundError(f'No user record found for {email}')
+            return self._users[email]
+
+    def create_custom_token(self, uid, developer_claims=None, app=None):
+        return f'custom-{uid}'.encode('utf-8')
+
+
+class FakeIdentityToolkit:
+    """Replaces the ``requests`` session that exchanges custom tokens for ID tokens"""
+
+    def post(self, url, json=None, **kwargs):
+        custom_token = (json or {}).get('token', '')
+        uid = custom_token[len('custom-'):] if custom_token.startswith('custom-') else custom_token
+        payload = {'idToken': mint_token(uid)}
+        return SimpleNamespace(status_code=200, json=lambda: payload)
+
+    def close(self):
+        pass
+
+
+# ---------------------------------------------------------------------------
+# Diabetes model
+# ---------------------------------------------------------------------------
+
+class FakeDiabetesModel:
+    def predict(self, input_df):
+        return [1 if float(input_df['blood_glucose_level'][0]) >= 200 else 0]
+
+
+# ---------------------------------------------------------------------------
+# Wiring
+# ---------------------------------------------------------------------------
+
+def install_fakes(gemini_latency=0.0, gemini_jitter=0.0, clarifai_latency=0.0):
+    """Patch the Google client libraries with the local fakes.
+
+    Returns a callable that removes the patches.
+    """
+    FakeGenaiClient.latency_seconds = gemini_latency
+    FakeGenaiClient.jitter_seconds = gemini_jitter
+    FakeClarifaiModel.latency_seconds = clarifai_latency
+
+    directory = FakeAuthDirectory()
+    patchers = [
+        mock.patch('google.genai.Client', FakeGenaiClient),
+        mock.patch('services.food_recognizer.Model', FakeClarifaiModel),
+        mock.patch('firebase_admin.auth.verify_id_token', verify_id_token),
+        mock.patch('firebase_admin.auth.create_user', directory.create_user),
+        mock.patch('firebase_admin.auth.get_user_by_email', directory.get_user_by_email),
+        mock.patch('firebase_admin.auth.create_custom_token', directory.create_custom_token),
+        mock.patch('services.container.requests', SimpleNamespace(Session=FakeIdentityToolkit)),
+    ]
+    for patcher in patchers:
+        patcher.start()
+
+    def uninstall():
+        for patcher in reversed(patchers):
+            patcher.stop()
+
+    return uninstall
+
+
+def build_fake_app(gemini_latency=0.0, gemini_jitter=0.0, clarifai_latency=0.0,
+                   firestore_latency=0.0, asgi=False, rate_limits=False):
+    """Create the app wired to the local fakes.
+
+    Returns ``(app, db)`` so callers can inspect the in-memory Firestore.
+    With ``asgi=True`` the app is the ASGI application from async_app.py.
+    Per-user rate limits are off unless ``rate_limits`` is set, since the
+    benchmarks send many requests per user.
+    """
+    # Imported here so the patches below target already-imported modules
+    import routes.food_routes  # noqa: F401
+    import services.food_recognizer  # noqa: F401
+    import services.container  # noqa: F401
+    from app import create_app
+    from config import Config
+
+    # The fakes never use credentials, but create_app validates they are set
+    for name in ('FIREBASE_WEB_API_KEY', 'PALM_API_KEY', 'CLARIFAI_PAT'):
+        if not getattr(Config, name):
+            setattr(Config, name, 'offline-benchmark')
+
+    Config.RATE_LIMIT_ENABLED = rate_limits
+    install_fakes(gemini_latency, gemini_jitter, clarifai_latency)
+    db = FakeFirestore(latency=firestore_latency)
+    if asgi:
+        from async_app import create_asgi_app
+        return create_asgi_app(db=db, diabetes_model=FakeDiabetesModel()), db
+    app = create_app(db=db, diabetes_model=FakeDiabetesModel())
+    return app, db
@@ -0,0 +1,241 @@
+"""Replay recorded API traffic from the daily log files.
+
+Every request that goes through ``log_api_call`` is logged as an
+"API Request: <METHOD> <URL>" entry whose Extra JSON carries the query
+arguments, the headers (credentials redacted), the authenticated user and
+the body fields allowed by ``utils.logger.LOGGED_BODY_FIELDS``. Other body
+fields are only named; the replay fills in ``PLACEHOLDER_FIELDS`` for them
+or leaves them out. This tool turns those entries into a request trace and
+replays it against the app, either in-process against the local fakes
+(default) or against a running server, at the original pacing or sped up.
+
+Usage (from the ``backend`` directory)::
+
+    # Build a trace and replay it 10x faster against the fakes
+    python -m benchmarks.replay_logs logs/ --speed 10
+
+    # Save the trace, then replay it as fast as possible against a server
+    python -m benchmarks.replay_logs logs/2025-06-08.log --save-trace trace.jsonl --dry-run
+    python -m benchmarks.replay_logs --trace trace.jsonl --speed 0 \\
+        --base-url http://127.0.0.1:5000
+"""
+import argparse
+import json
+import logging
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlsplit
+
+from benchmarks.fakes import build_fake_app, mint_token
+from benchmarks.run_benchmarks import HttpClient, InProcessClient, seed_user, summarize
+from utils.decorators import peek_token_uid
+from utils.log_parser import iter_log_files
+
+REQUEST_PREFIX = 'API Request: '
+PLACEHOLDER_UPLOAD = b'\xff\xd8\xff\xe0 replayed upload'
+# Stand-ins for body fields whose values are not logged
+PLACEHOLDER_FIELDS = {
+    'newMessage': 'What foods lower blood sugar?',
+}
+
+
+def _uid_from_authorization(value):
+    """Read the uid claim from a recorded Firebase ID token (unverified);
+    only logs written before tokens were redacted carry one"""
+    if not value or not value.startswith('Bearer '):
+        return None
+    return peek_token_uid(value[len('Bearer '):])
+
+
+def build_trace(paths, start_date=None, end_date=None):
+    """Yield trace entries (dicts) for every logged API request"""
+    first_timestamp = None
+    for entry in iter_log_files(paths, start_date, end_date):
+        if not entry.message.startswith(REQUEST_PREFIX):
+            continue
+
+        method, _, url = entry.message[len(REQUEST_PREFIX):].partition(' ')
+        request_data = entry.extra.get('request') or {}
+        headers = request_data.get('headers') or {}
+        split = urlsplit(url)
+        path = split.path + (f'?{split.query}' if split.query else '')
+
+        if first_timestamp is None:
+            first_timestamp = entry.timestamp
+
+        body = request_data.get('json')
+        if body is not None:
+            body = dict(body)
+            for field in request_data.get('json_fields') or ():
+                if field not in body and field in PLACEHOLDER_FIELDS:
+                    body[field] = PLACEHOLDER_FIELDS[field]
+
+        yield {
+            'offset': (entry.timestamp - first_timestamp).total_seconds(),
+            'method': method,
+            'path': path,
+            'json': body,
+            'files': request_data.get('files'),
+            # Entries logged before request details were recorded carry no
+            # headers; every logged endpoint requires a token, so assume one
+            'authenticated': 'Authorization' in headers if request_data else True,
+            'uid': request_data.get('user_id') or _uid_from_authorization(headers.get('Authorization')),
+        }
+
+
+def load_trace(path):
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def endpoint_name(entry):
+    return f"{entry['method']} {entry['path'].split('?')[0]}"
+
+
+class Replayer:
+    """Schedules trace entries at their recorded offsets divided by ``speed``"""
+
+    def __init__(self, client, token_for, speed=1.0, concurrency=32):
+        self.client = client
+        self.token_for = token_for
+        self.speed = speed
+        self.concurrency = concurrency
+        self.latencies = {}
+        self.status_codes = {}
+        self.max_lag = 0.0
+        self._lock = threading.Lock()
+
+    def _send(self, entry):
+        headers = {}
+        if entry.get('authenticated'):
+            token = self.token_for(entry.get('uid'))
+            if token:
+                headers['Authorization'] = f'Bearer {token}'
+
+        files = None
+        if entry.get('files'):
+            files = {name: (f'replay-{time.time_ns()}.jpg', PLACEHOLDER_UPLOAD)
+                     for name in entry['files']}
+
+        started = time.perf_counter()
+        try:
+            status = self.client.request(
+                entry['method'], entry['path'], headers=headers,
+                json_body=entry.get('json'), files=files
+            )
+        except Exception:
+            status = 'exception'
+        elapsed = time.perf_counter() - started
+
+        name = endpoint_name(entry)
+        with self._lock:
+            self.latencies.setdefault(name, []).append(elapsed)
+            codes = self.status_codes.setdefault(name, {})
+            codes[str(status)] = codes.get(str(status), 0) + 1
+
+    def run(self, trace):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            for entry in trace:
+                if self.speed > 0:
+                    due = started + entry['offset'] / self.speed
+                    delay = due - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    else:
+                        self.max_lag = max(self.max_lag, -delay)
+                pool.submit(self._send, entry)
+        return time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('logs', nargs='*', default=['logs'],
+                        help='log files, directories or globs (default: logs/)')
+    parser.add_argument('--trace', help='replay a saved trace instead of parsing logs')
+    parser.add_argument('--save-trace', help='write the parsed trace as JSON lines')
+    parser.add_argument('--dry-run', action='store_true', help='only build/save the trace')
+    parser.add_argument('--from', dest='start_date', help='first log date (YYYY-MM-DD)')
+    parser.add_argument('--to', dest='end_date', help='last log date (YYYY-MM-DD)')
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='pacing multiplier; 1 = original pacing, 0 = as fast as possible')
+    parser.add_argument('--concurrency', type=int, default=32,
+                        help='maximum requests in flight')
+    parser.add_argument('--base-url', help='replay against a running server')
+    parser.add_argument('--token', help='ID token for authenticated requests (with --base-url)')
+    parser.add_argument('--gemini-latency', type=float, default=0.0)
+    parser.add_argument('--clarifai-latency', type=float, default=0.0)
+    parser.add_argument('--log-level', default='WARNING')
+    parser.add_argument('--output', help='write per-endpoint results as JSON')
+    args = parser.parse_args(argv)
+
+    start_date = datetime.strptime(args.start_date, '%Y-%m-%d').date() if args.start_date else None
+    end_date = datetime.strptime(args.end_date, '%Y-%m-%d').date() if args.end_date else None
+
+    if args.trace:
+        trace = list(load_trace(args.trace))
+    else:
+        trace = list(build_trace(args.logs, start_date, end_date))
+    print(f'Trace: {len(trace)} requests spanning '
+          f"{trace[-1]['offset'] if trace else 0:.1f}s", file=sys.stderr)
+
+    if args.save_trace:
+        with open(args.save_trace, 'w') as f:
+            for entry in trace:
+                f.write(json.dumps(entry) + '\n')
+        print(f'Trace written to {args.save_trace}', file=sys.stderr)
+
+    if args.dry_run or not trace:
+        return None
+
+    logging.disable(getattr(logging, args.log_level.upper()) - 1)
+
+    if args.base_url:
+        client = HttpClient(args.base_url)
+        token_for = lambda uid: args.token or (mint_token(uid) if uid else None)
+    else:
+        app, _ = build_fake_app(gemini_latency=args.gemini_latency,
+                                clarifai_latency=args.clarifai_latency)
+        client = InProcessClient(app)
+        anonymous = 'replay-anonymous'
+        for uid in {entry.get('uid') or anonymous for entry in trace if entry.get('authenticated')}:
+            seed_user(client, uid)
+        token_for = lambda uid: mint_token(uid or anonymous)
+
+    replayer = Replayer(client, token_for, speed=args.speed, concurrency=args.concurrency)
+    wall_time = replayer.run(trace)
+
+    results = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'mode': args.base_url or 'in-process',
+            'requests': len(trace),
+            'speed': args.speed,
+            'wall_time_s': round(wall_time, 3),
+            'max_schedule_lag_s': round(replayer.max_lag, 3),
+        },
+        'endpoints': {
+            name: summarize(latencies, replayer.status_codes[name], wall_time)
+            for name, latencies in replayer.latencies.items()
+        },
+    }
+
+    for name, stats in sorted(results['endpoints'].items()):
+        latency = stats['latency_ms']
+        print(f"{name:40} n={stats['requests']:6} p50={latency['p50']:9.2f}ms "
+              f"p95={latency['p95']:9.2f}ms p99={latency['p99']:9.2f}ms "
+              f"errors={stats['errors']}", file=sys.stderr)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+if __name__ == '__main__':
+    main()
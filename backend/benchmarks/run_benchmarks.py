@@ -0,0 +1,351 @@
+"""Offline throughput/latency benchmark for the backend API.
+
+Runs ``create_app`` against the local fakes in ``benchmarks/fakes.py`` (or
+against a server started with ``benchmarks/fake_app.py`` via ``--base-url``)
+and drives every endpoint of the user, health and food blueprints at a fixed
+concurrency. Results are written as JSON so runs can be compared across
+commits.
+
+Usage (from the ``backend`` directory)::
+
+    python -m benchmarks.run_benchmarks --concurrency 8 --requests 200 \\
+        --gemini-latency 0.05 --output bench_results.json
+
+    python -m benchmarks.run_benchmarks --baseline old.json --output new.json
+"""
+import argparse
+import io
+import json
+import logging
+import math
+import platform
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from benchmarks.fakes import build_fake_app, mint_token
+
+SAMPLE_PROFILE = {
+    'age': 45,
+    'sex': 'Male',
+    'height': 178,
+    'weight': 92,
+    'activity_level': 'Lightly Active',
+    'goal': 'lose weight',
+    'ethnicity': 'Caucasian',
+    'vegan': False,
+    'location': 'Texas',
+    'race': 'Caucasian',
+    'hypertension': 'No',
+    'heart_disease': 'No',
+    'smoking_history': 'never',
+    'hba1c': 6.1,
+    'blood_glucose': 140,
+}
+
+
+# ---------------------------------------------------------------------------
+# Clients
+# ---------------------------------------------------------------------------
+
+class InProcessClient:
+    """Sends requests through Flask's test client (no sockets involved)"""
+
+    def __init__(self, app):
+        self._app = app
+        self._local = threading.local()
+
+    def _client(self):
+        if not hasattr(self._local, 'client'):
+            self._local.client = self._app.test_client()
+        return self._local.client
+
+    def request(self, method, path, headers=None, json_body=None, files=None):
+        kwargs = {'headers': headers or {}}
+        if json_body is not None:
+            kwargs['json'] = json_body
+        if files:
+            kwargs['data'] = {
+                name: (io.BytesIO(content), filename)
+                for name, (filename, content) in files.items()
+            }
+            kwargs['content_type'] = 'multipart/form-data'
+        response = self._client().open(path, method=method, **kwargs)
+        return response.status_code
+
+
+class HttpClient:
+    """Sends requests to a running server over HTTP"""
+
+    def __init__(self, base_url):
+        import requests
+        self._requests = requests
+        self._base_url = base_url.rstrip('/')
+        self._local = threading.local()
+
+    def _session(self):
+        if not hasattr(self._local, 'session'):
+            self._local.session = self._requests.Session()
+        return self._local.session
+
+    def request(self, method, path, headers=None, json_body=None, files=None):
+        response = self._session().request(
+            method, self._base_url + path, headers=headers or {}, json=json_body,
+            files=files
+        )
+        return response.status_code
+
+
+# ---------------------------------------------------------------------------
+# Scenarios
+# ---------------------------------------------------------------------------
+
+def _auth(user):
+    return {'Authorization': f"Bearer {user['token']}"}
+
+
+def _new_account(u):
+    uid = f'bench-new-{uuid.uuid4().hex}'
+    return {'headers': {'Authorization': f'Bearer {mint_token(uid)}'},
+            'json_body': {'email': f'{uid}@bench.local', 'display_name': uid}}
+
+
+def _image():
+    return {'file': (f'bench-{uuid.uuid4().hex}.jpg', b'\xff\xd8\xff\xe0 fake image bytes')}
+
+
+# (name, method, path, request builder). Builders take a user and return
+# keyword arguments for ``client.request``.
+SCENARIOS = [
+    ('POST /api/user/createUser', 'POST', '/api/user/createUser', _new_account),
+    ('POST /api/user/signup', 'POST', '/api/user/signup',
+     lambda u: {'json_body': {'email': f'signup-{uuid.uuid4().hex}@bench.local',
+                              'password': 'bench-password', 'display_name': 'Bench'}}),
+    ('POST /api/user/login', 'POST', '/api/user/login',
+     lambda u: {'json_body': {'email': u['email'], 'password': 'bench-password'}}),
+    ('GET /api/user/', 'GET', '/api/user/', lambda u: {'headers': _auth(u)}),
+    ('POST /api/user/', 'POST', '/api/user/',
+     lambda u: {'headers': _auth(u), 'json_body': {'weight': SAMPLE_PROFILE['weight']}}),
+    ('GET /api/user/profile', 'GET', '/api/user/profile', lambda u: {'headers': _auth(u)}),
+    ('PUT /api/user/profile', 'PUT', '/api/user/profile',
+     lambda u: {'headers': _auth(u), 'json_body': {'goal': SAMPLE_PROFILE['goal']}}),
+    ('POST /api/user/chat', 'POST', '/api/user/chat',
+     lambda u: {'headers': _auth(u), 'json_body': {'newMessage': 'What foods lower blood sugar?'}}),
+    ('GET /api/user/chat/history', 'GET', '/api/user/chat/history', lambda u: {'headers': _auth(u)}),
+    ('POST /api/health/calculate_metrics', 'POST', '/api/health/calculate_metrics',
+     lambda u: {'headers': _auth(u), 'json_body': {}}),
+    ('GET /api/health/calculate_metrics', 'GET', '/api/health/calculate_metrics',
+     lambda u: {'headers': _auth(u)}),
+    ('POST /api/health/plan', 'POST', '/api/health/plan',
+     lambda u: {'headers': _auth(u), 'json_body': {'preferences': 'high protein'}}),
+    ('GET /api/health/plan', 'GET', '/api/health/plan', lambda u: {'headers': _auth(u)}),
+    ('POST /api/health/advice', 'POST', '/api/health/advice',
+     lambda u: {'headers': _auth(u), 'json_body': {}}),
+    ('GET /api/health/advice', 'GET', '/api/health/advice', lambda u: {'headers': _auth(u)}),
+    ('POST /api/health/diabetes_check', 'POST', '/api/health/diabetes_check',
+     lambda u: {'headers': _auth(u), 'json_body': {}}),
+    ('GET /api/health/diabetes_check', 'GET', '/api/health/diabetes_check',
+     lambda u: {'headers': _auth(u)}),
+    ('GET /api/dashboard', 'GET', '/api/dashboard', lambda u: {'headers': _auth(u)}),
+    ('POST /api/food/diet', 'POST', '/api/food/diet',
+     lambda u: {'headers': _auth(u), 'json_body': {'food_item': 'apple'}}),
+    ('POST /api/food/diet/batch', 'POST', '/api/food/diet/batch',
+     lambda u: {'headers': _auth(u), 'json_body': {'food_items': ['apple', 'oatmeal', 'greek yogurt']}}),
+    ('GET /api/food/diet', 'GET', '/api/food/diet', lambda u: {'headers': _auth(u)}),
+    ('GET /api/history/diet_queries', 'GET', '/api/history/diet_queries?fields=food_item',
+     lambda u: {'headers': _auth(u)}),
+    ('POST /api/food/recipes', 'POST', '/api/food/recipes',
+     lambda u: {'headers': _auth(u), 'files': _image()}),
+    ('DELETE /api/user/chat/history', 'DELETE', '/api/user/chat/history',
+     lambda u: {'headers': _auth(u)}),
+]
+
+
+def seed_user(client, uid):
+    """Create a user with a complete profile through the public API"""
+    user = {
+        'uid': uid,
+        'email': f'{uid}@bench.local',
+        'token': mint_token(uid, f'{uid}@bench.local'),
+    }
+    client.request('POST', '/api/user/createUser', headers=_auth(user),
+                   json_body={'email': user['email'], 'display_name': uid})
+    client.request('POST', '/api/user/', headers=_auth(user), json_body=SAMPLE_PROFILE)
+
+    # Metrics are needed by the diabetes check
+    client.request('POST', '/api/health/calculate_metrics', headers=_auth(user), json_body={})
+    return user
+
+
+def seed_users(client, count):
+    """Create ``count`` benchmark users"""
+    return [seed_user(client, f'bench-user-{index}') for index in range(count)]
+
+
+# ---------------------------------------------------------------------------
+# Measurement
+# ---------------------------------------------------------------------------
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = math.ceil(pct / 100 * len(sorted_values))
+    return sorted_values[max(0, min(len(sorted_values), rank) - 1)]
+
+
+def run_scenario(client, users, scenario, total_requests, concurrency):
+    name, method, path, build = scenario
+    latencies = []
+    status_codes = {}
+    lock = threading.Lock()
+
+    def one(index):
+        user = users[index % len(users)]
+        kwargs = build(user)
+        started = time.perf_counter()
+        try:
+            status = client.request(method, path, **kwargs)
+        except Exception:
+            status = 'exception'
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            status_codes[str(status)] = status_codes.get(str(status), 0) + 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total_requests)))
+    wall_time = time.perf_counter() - started
+
+    return name, summarize(latencies, status_codes, wall_time)
+
+
+def summarize(latencies, status_codes, wall_time):
+    """Build the per-endpoint result entry from raw latencies (seconds)"""
+    latencies = sorted(latencies)
+    errors = sum(
+        count for status, count in status_codes.items()
+        if status == 'exception' or int(status) >= 500
+    )
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'status_codes': status_codes,
+        'throughput_rps': round(len(latencies) / wall_time, 2) if wall_time else None,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 50) * 1000, 3),
+            'p95': round(percentile(latencies, 95) * 1000, 3),
+            'p99': round(percentile(latencies, 99) * 1000, 3),
+            'mean': round(sum(latencies) / len(latencies) * 1000, 3),
+            'max': round(latencies[-1] * 1000, 3),
+        },
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(baseline, results):
+    """Print p50/p95/p99 and throughput changes against a previous run"""
+    print(f"{'endpoint':40} {'p50 ms':>16} {'p95 ms':>16} {'p99 ms':>16} {'rps':>16}")
+    for name, current in results['endpoints'].items():
+        previous = baseline.get('endpoints', {}).get(name)
+        if not previous:
+            continue
+        cells = []
+        for key in ('p50', 'p95', 'p99'):
+            cells.append(f"{previous['latency_ms'][key]:.1f}->{current['latency_ms'][key]:.1f}")
+        cells.append(f"{previous['throughput_rps']:.0f}->{current['throughput_rps']:.0f}")
+        print(f'{name:40} ' + ' '.join(f'{cell:>16}' for cell in cells))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=200,
+                        help='requests per endpoint')
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--gemini-latency', type=float, default=0.0,
+                        help='seconds added to every fake Gemini call')
+    parser.add_argument('--gemini-jitter', type=float, default=0.0)
+    parser.add_argument('--clarifai-latency', type=float, default=0.0)
+    parser.add_argument('--firestore-latency', type=float, default=0.0)
+    parser.add_argument('--base-url',
+                        help='benchmark a running server (e.g. benchmarks.fake_app) over HTTP')
+    parser.add_argument('--endpoint', action='append',
+                        help='only run endpoints containing this substring (repeatable)')
+    parser.add_argument('--log-level', default='WARNING',
+                        help='application log level while benchmarking')
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--baseline', help='previous results file to compare against')
+    args = parser.parse_args(argv)
+
+    logging.disable(getattr(logging, args.log_level.upper()) - 1)
+
+    if args.base_url:
+        client = HttpClient(args.base_url)
+        mode = args.base_url
+    else:
+        app, _ = build_fake_app(
+            gemini_latency=args.gemini_latency,
+            gemini_jitter=args.gemini_jitter,
+            clarifai_latency=args.clarifai_latency,
+            firestore_latency=args.firestore_latency,
+        )
+        client = InProcessClient(app)
+        mode = 'in-process'
+
+    users = seed_users(client, args.users)
+    scenarios = [
+        scenario for scenario in SCENARIOS
+        if not args.endpoint or any(part in scenario[0] for part in args.endpoint)
+    ]
+
+    results = {
+        'meta': {
+            'git_commit': _git_commit(),
+            'timestamp': datetime.now().isoformat(),
+            'mode': mode,
+            'concurrency': args.concurrency,
+            'requests_per_endpoint': args.requests,
+            'users': args.users,
+            'gemini_latency_s': args.gemini_latency,
+            'clarifai_latency_s': args.clarifai_latency,
+            'firestore_latency_s': args.firestore_latency,
+            'python': platform.python_version(),
+        },
+        'endpoints': {},
+    }
+
+    for scenario in scenarios:
+        name, stats = run_scenario(client, users, scenario, args.requests, args.concurrency)
+        results['endpoints'][name] = stats
+        latency = stats['latency_ms']
+        print(f"{name:40} p50={latency['p50']:9.2f}ms p95={latency['p95']:9.2f}ms "
+              f"p99={latency['p99']:9.2f}ms rps={stats['throughput_rps']:9.1f} "
+              f"errors={stats['errors']}", file=sys.stderr)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f'Results written to {args.output}', file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(json.load(f), results)
+
+    return results
+
+
+if __name__ == '__main__':
+    main()
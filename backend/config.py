@@ -1,9 +1,25 @@
+import json
 import os
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
+
+def _call_policies(defaults, overrides):
+    """Per-method policies with keys overridden from a JSON object string"""
+    policies = {method: dict(policy) for method, policy in defaults.items()}
+    for method, policy in json.loads(overrides or '{}').items():
+        policies.setdefault(method, dict(defaults['default'])).update(policy)
+    return policies
+
+def _rate_limits(defaults, overrides):
+    """Per-route [[limit, window seconds], ...] with routes replaced from a
+    JSON object string; an empty list turns a route's limits off"""
+    limits = dict(defaults)
+    limits.update(json.loads(overrides or '{}'))
+    return {route: [tuple(pair) for pair in pairs] for route, pairs in limits.items()}
+
 class Config:
     # Flask settings
     SECRET_KEY = os.environ.get('SECRET_KEY', 'dev')
@@ -17,12 +33,180 @@ class Config:
     PALM_API_KEY = os.environ.get('PALM_API_KEY')
     GEMINI_MODEL = os.environ.get('GEMINI_MODEL', 'gemini-2.0-flash')
 
+    # Shared limiter in front of all Gemini calls (per process): AIMD-adapted
+    # concurrency between MIN and MAX, request/token budgets per minute, and
+    # a bounded queue whose callers wait at most GEMINI_QUEUE_TIMEOUT seconds
+    GEMINI_INITIAL_CONCURRENCY = int(os.environ.get('GEMINI_INITIAL_CONCURRENCY', '8'))
+    GEMINI_MIN_CONCURRENCY = int(os.environ.get('GEMINI_MIN_CONCURRENCY', '1'))
+    GEMINI_MAX_CONCURRENCY = int(os.environ.get('GEMINI_MAX_CONCURRENCY', '64'))
+    GEMINI_RPM = int(os.environ.get('GEMINI_RPM', '1000'))
+    GEMINI_TPM = int(os.environ.get('GEMINI_TPM', '1000000'))
+    GEMINI_QUEUE_SIZE = int(os.environ.get('GEMINI_QUEUE_SIZE', '64'))
+    GEMINI_QUEUE_TIMEOUT = float(os.environ.get('GEMINI_QUEUE_TIMEOUT', '10'))
+    # Output tokens reserved per call until the actual usage is known
+    GEMINI_OUTPUT_TOKEN_ESTIMATE = int(os.environ.get('GEMINI_OUTPUT_TOKEN_ESTIMATE', '1000'))
+
+    # Retry and hedging policy per AIService method ('default' for the rest):
+    #   budget:           seconds for the whole call, queueing and retries included
+    #   attempts:         tries on transient errors (429, 5xx, timeouts)
+    #   backoff_base/max: full-jitter exponential backoff between tries
+    #   hedge_percentile: send a second request once the first has taken longer
+    #                     than this percentile of recent latencies (None: never)
+    #   hedge_delay:      hedge delay used until enough latencies are recorded
+    # GEMINI_CALL_POLICIES (JSON) overrides keys, e.g.
+    # {"generate_diet_plan": {"hedge_percentile": null}}
+    GEMINI_CALL_POLICIES = _call_policies({
+        'default': {'budget': 30.0, 'attempts': 3, 'backoff_base': 0.5, 'backoff_max': 4.0,
+                    'hedge_percentile': None, 'hedge_delay': 10.0},
+        'chat': {'budget': 30.0, 'attempts': 2, 'backoff_base': 0.5, 'backoff_max': 2.0,
+                 'hedge_percentile': None, 'hedge_delay': 10.0},
+        'generate_diet_plan': {'budget': 45.0, 'attempts': 3, 'backoff_base': 0.5, 'backoff_max': 4.0,
+                               'hedge_percentile': 95, 'hedge_delay': 15.0},
+        'generate_cohort_diet_plan': {'budget': 45.0, 'attempts': 3, 'backoff_base': 0.5, 'backoff_max': 4.0,
+                                      'hedge_percentile': 95, 'hedge_delay': 15.0},
+        'generate_health_advice': {'budget': 45.0, 'attempts': 3, 'backoff_base': 0.5, 'backoff_max': 4.0,
+                                   'hedge_percentile': 95, 'hedge_delay': 15.0},
+        'generate_recipe': {'budget': 30.0, 'attempts': 3, 'backoff_base': 0.5, 'backoff_max': 4.0,
+                            'hedge_percentile': None, 'hedge_delay': 10.0},
+        'get_macro_breakdowns': {'budget': 30.0, 'attempts': 3, 'backoff_base': 0.25, 'backoff_max': 2.0,
+                                 'hedge_percentile': None, 'hedge_delay': 10.0},
+        'get_macro_breakdown': {'budget': 20.0, 'attempts': 3, 'backoff_base': 0.25, 'backoff_max': 2.0,
+                                'hedge_percentile': None, 'hedge_delay': 5.0},
+    }, os.environ.get('GEMINI_CALL_POLICIES'))
+
+    # Circuit breakers: open after this many consecutive failed calls, then
+    # fail fast for RESET_TIMEOUT seconds before letting one probe through
+    GEMINI_BREAKER_FAILURES = int(os.environ.get('GEMINI_BREAKER_FAILURES', '5'))
+    GEMINI_BREAKER_RESET_TIMEOUT = float(os.environ.get('GEMINI_BREAKER_RESET_TIMEOUT', '30'))
+
+    # Diet plans are shared by users in the same cohort (BMI band, TDEE to the
+    # nearest 100 kcal, goal, vegan flag, normalized preferences). Each cohort
+    # holds up to PLAN_LIBRARY_VARIANTS plans; requests are served from it once
+    # it is full and fill it otherwise (or run tools/pregenerate_plans.py)
+    PLAN_LIBRARY_ENABLED = os.environ.get('PLAN_LIBRARY_ENABLED', 'True').lower() == 'true'
+    PLAN_LIBRARY_VARIANTS = int(os.environ.get('PLAN_LIBRARY_VARIANTS', '3'))
+    PLAN_LIBRARY_BMI_BANDS = [float(edge) for edge in os.environ.get('PLAN_LIBRARY_BMI_BANDS', '18.5,25,30,35,40').split(',')]
+
+    # Macro breakdowns by food item, shared by POST /api/food/diet and /diet/batch
+    MACRO_CACHE_SIZE = int(os.environ.get('MACRO_CACHE_SIZE', '4096'))
+    MACRO_CACHE_TTL = int(os.environ.get('MACRO_CACHE_TTL', str(7 * 24 * 3600)))
+    # Bundled per-100 g nutrition facts answered before asking the model; a
+    # fuzzy name match counts from this trigram similarity (0-1) upwards
+    NUTRITION_TABLE_ENABLED = os.environ.get('NUTRITION_TABLE_ENABLED', 'True').lower() == 'true'
+    NUTRITION_TABLE_PATH = os.environ.get(
+        'NUTRITION_TABLE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'nutrition.csv')
+    )
+    NUTRITION_MATCH_THRESHOLD = float(os.environ.get('NUTRITION_MATCH_THRESHOLD', '0.8'))
+    # Most food items accepted by one POST /api/food/diet/batch request
+    DIET_BATCH_MAX_ITEMS = int(os.environ.get('DIET_BATCH_MAX_ITEMS', '25'))
+    # Shared answers to generic chat questions (opt-in); a question matches a
+    # stored one from this estimated shingle similarity (0-1) upwards
+    CHAT_ANSWER_CACHE_ENABLED = os.environ.get('CHAT_ANSWER_CACHE_ENABLED', 'False').lower() == 'true'
+    CHAT_ANSWER_CACHE_SIZE = int(os.environ.get('CHAT_ANSWER_CACHE_SIZE', '5000'))
+    CHAT_ANSWER_CACHE_TTL = int(os.environ.get('CHAT_ANSWER_CACHE_TTL', '86400'))
+    CHAT_ANSWER_CACHE_THRESHOLD = float(os.environ.get('CHAT_ANSWER_CACHE_THRESHOLD', '0.8'))
+    CHAT_ANSWER_CACHE_PERMUTATIONS = int(os.environ.get('CHAT_ANSWER_CACHE_PERMUTATIONS', '64'))
+    CHAT_ANSWER_CACHE_BANDS = int(os.environ.get('CHAT_ANSWER_CACHE_BANDS', '16'))
+
     # ML model settings
     DIABETES_MODEL_PATH = os.environ.get('DIABETES_MODEL_PATH', 'random_forest_model.pkl')
 
     # Clarifai settings
     CLARIFAI_MODEL_URL = os.environ.get('CLARIFAI_MODEL_URL', 'https://clarifai.com/clarifai/main/models/food-item-recognition')
     CLARIFAI_PAT = os.environ.get('CLARIFAI_PAT')
+    CLARIFAI_BREAKER_FAILURES = int(os.environ.get('CLARIFAI_BREAKER_FAILURES', '5'))
+    CLARIFAI_BREAKER_RESET_TIMEOUT = float(os.environ.get('CLARIFAI_BREAKER_RESET_TIMEOUT', '30'))
+
+    # Production server settings (gunicorn.conf.py)
+    SERVER_BIND = os.environ.get('SERVER_BIND', '0.0.0.0:5000')
+    SERVER_WORKERS = int(os.environ.get('SERVER_WORKERS', '2'))
+    SERVER_THREADS = int(os.environ.get('SERVER_THREADS', '16'))
+    SERVER_TIMEOUT = int(os.environ.get('SERVER_TIMEOUT', '120'))
+    SERVER_GRACEFUL_TIMEOUT = int(os.environ.get('SERVER_GRACEFUL_TIMEOUT', '30'))
+    PRELOAD_MODEL = os.environ.get('PRELOAD_MODEL', 'True').lower() == 'true'
+
+    # Async (ASGI) serving: thread pool sizes for offloaded blocking client calls
+    ASYNC_AUTH_THREADS = int(os.environ.get('ASYNC_AUTH_THREADS', '8'))
+    ASYNC_FIRESTORE_THREADS = int(os.environ.get('ASYNC_FIRESTORE_THREADS', '32'))
+    ASYNC_GEMINI_THREADS = int(os.environ.get('ASYNC_GEMINI_THREADS', '64'))
+    ASYNC_WSGI_THREADS = int(os.environ.get('ASYNC_WSGI_THREADS', '32'))
+
+    # Background jobs (POST /plan, /advice and /recipes with "Prefer: respond-async"):
+    # worker threads and queue length per process, how long a job may stay
+    # queued or running before another process takes it over, and how often
+    # (seconds) clients are told to poll GET /api/jobs/<id>
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '4'))
+    JOB_QUEUE_SIZE = int(os.environ.get('JOB_QUEUE_SIZE', '100'))
+    JOB_LEASE_SECONDS = int(os.environ.get('JOB_LEASE_SECONDS', '300'))
+    JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', '3'))
+    # Seconds before an overloaded job is tried again, doubled per attempt
+    JOB_RETRY_DELAY = int(os.environ.get('JOB_RETRY_DELAY', '30'))
+    JOB_RECOVERY_INTERVAL = int(os.environ.get('JOB_RECOVERY_INTERVAL', '60'))
+    JOB_POLL_INTERVAL = int(os.environ.get('JOB_POLL_INTERVAL', '2'))
+    # Send an FCM data message to the user's ``fcm_token`` when a job finishes
+    JOB_PUSH_ENABLED = os.environ.get('JOB_PUSH_ENABLED', 'False').lower() == 'true'
+    # Uploaded images waiting for a recipe job; shared storage lets any
+    # process recover the job
+    JOB_UPLOAD_DIR = os.environ.get(
+        'JOB_UPLOAD_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
+    )
+
+    # Responses kept per process for POSTs sent with an Idempotency-Key header:
+    # how many keys, for how long (seconds), and how long a repeated request
+    # waits for the first one before getting a 409
+    IDEMPOTENCY_STORE_SIZE = int(os.environ.get('IDEMPOTENCY_STORE_SIZE', '2000'))
+    IDEMPOTENCY_TTL = int(os.environ.get('IDEMPOTENCY_TTL', '86400'))
+    IDEMPOTENCY_WAIT_TIMEOUT = float(os.environ.get('IDEMPOTENCY_WAIT_TIMEOUT', '60'))
+    IDEMPOTENCY_RETRY_AFTER = int(os.environ.get('IDEMPOTENCY_RETRY_AFTER', '2'))
+
+    # Per-user request limits on the routes that call the model, as sliding
+    # windows of [requests, seconds] (all must hold); a 429 beyond them.
+    # Counters are per process unless RATE_LIMIT_BACKEND names a shared
+    # backend ('module:Class', see utils/rate_limit.py)
+    RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'True').lower() == 'true'
+    RATE_LIMITS = _rate_limits({
+        'chat': [[20, 60], [500, 86400]],
+        'recipes': [[5, 60], [100, 86400]],
+        'plan': [[5, 60], [50, 86400]],
+        'advice': [[5, 60], [50, 86400]],
+        'diet': [[30, 60], [1000, 86400]],
+        'diet_batch': [[5, 60], [200, 86400]],
+    }, os.environ.get('RATE_LIMITS'))
+    RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'local')
+    RATE_LIMIT_MAX_KEYS = int(os.environ.get('RATE_LIMIT_MAX_KEYS', '100000'))
+
+    # Threads per process for the parallel reads behind GET /api/dashboard
+    DASHBOARD_THREADS = int(os.environ.get('DASHBOARD_THREADS', '16'))
+
+    # Cache-Control max-age (seconds) for ETagged GET responses; 0 means
+    # clients revalidate every time (If-None-Match -> 304 when unchanged)
+    HTTP_CACHE_MAX_AGE = int(os.environ.get('HTTP_CACHE_MAX_AGE', '0'))
+
+    # Response encoding: JSON datetimes as 'http' dates (Flask's default) or
+    # 'iso' 8601, and gzip/brotli compression of bodies above a size threshold
+    # (per-route overrides via utils.encoding.compression)
+    JSON_DATETIME_FORMAT = os.environ.get('JSON_DATETIME_FORMAT', 'http')
+    COMPRESSION_ENABLED = os.environ.get('COMPRESSION_ENABLED', 'True').lower() == 'true'
+    COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', '1024'))
+    COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', '6'))
+    COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', '4'))
+
+    # Return model output as JSON-encoded strings (the old format) unless the
+    # client sends "X-LLM-Output: json"
+    LLM_OUTPUT_AS_STRING = os.environ.get('LLM_OUTPUT_AS_STRING', 'False').lower() == 'true'
+
+    # GET /api/metrics requires "Authorization: Bearer <METRICS_TOKEN>" when set
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+    # History list endpoints (/api/history/<collection>, GET /api/food/diet)
+    HISTORY_PAGE_SIZE = int(os.environ.get('HISTORY_PAGE_SIZE', '20'))
+    HISTORY_MAX_PAGE_SIZE = int(os.environ.get('HISTORY_MAX_PAGE_SIZE', '100'))
+
+    # Profiling settings (per-request profiles via the X-Profile header or ?profile= flag)
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'False').lower() == 'true'
+    PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+    PROFILE_SORT_KEY = os.environ.get('PROFILE_SORT_KEY', 'cumulative')
+    PROFILE_INLINE_LIMIT = int(os.environ.get('PROFILE_INLINE_LIMIT', '50'))
 
     # Activity level multipliers for TDEE calculation
     ACTIVITY_LEVEL_MULTIPLIERS = {
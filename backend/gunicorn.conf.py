@@ -0,0 +1,34 @@
+"""gunicorn settings for the production (pre-fork) server.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The master process validates the configuration and loads the diabetes model
+before forking, so workers share it copy-on-write. The app itself (Firebase,
+Gemini and Clarifai clients) is created in each worker after the fork, since
+gRPC/HTTP client state must not be shared across processes.
+"""
+from config import Config
+
+bind = Config.SERVER_BIND
+workers = Config.SERVER_WORKERS
+threads = Config.SERVER_THREADS
+worker_class = 'gthread'
+timeout = Config.SERVER_TIMEOUT
+graceful_timeout = Config.SERVER_GRACEFUL_TIMEOUT
+
+# Create the app after fork; shared state is preloaded in on_starting instead
+preload_app = False
+
+
+def on_starting(server):
+    """Runs once in the master before any worker is forked"""
+    Config.validate_config()
+    if Config.PRELOAD_MODEL:
+        from app import load_diabetes_model
+        load_diabetes_model()
+
+
+def worker_exit(server, worker):
+    """Flush pending writes and logs when a worker stops"""
+    from utils.lifecycle import run_shutdown_hooks
+    run_shutdown_hooks()
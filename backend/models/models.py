@@ -20,6 +20,10 @@ class MacroBreakdown(BaseModel):
     nutrient: str
     amount: str 
 
+class FoodMacroBreakdown(BaseModel):
+    food_item: str
+    macros: list[MacroBreakdown]
+
 class HealthAdvice(BaseModel):
     general_recommendations: str
     exercise_suggestions: str
@@ -0,0 +1,239 @@
+import asyncio
+from quart import Blueprint, request, jsonify, make_response
+import firebase_admin.auth
+from config import Config
+from utils.async_offload import BoundedOffloader
+from utils.decorators import peek_token_uid
+from utils.limiter import ServiceOverloaded
+from utils.encoding import LLM_OUTPUT_HEADER, present_llm_fields
+from utils.idempotency import IDEMPOTENCY_HEADER, REPLAYED_HEADER, IdempotentRequest
+from utils.lifecycle import register_shutdown_hook
+from utils.logger import setup_logger, log_async_api_call
+
+# Set up logger
+logger = setup_logger('async_routes')
+
+async_bp = Blueprint('async_api', __name__)
+
+# (method, path) pairs served by the async blueprint; all other requests
+# are handled by the Flask app (see async_app.py)
+ASYNC_ROUTES = {
+    ('POST', '/api/user/chat'),
+    ('POST', '/api/health/plan'),
+    ('POST', '/api/health/advice'),
+}
+
+
+def _discard(task):
+    """Let a speculative task finish without 'exception never retrieved' noise"""
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+
+def init_async_routes(services, background):
+    """Initialize the async (ASGI) versions of the long-running endpoints.
+
+    Blocking clients run on bounded per-dependency thread pools, so waiting
+    requests cost a coroutine rather than an OS thread. Independent work runs
+    concurrently: the caller's data is prefetched while the token is
+    verified, and Firestore writes that the response does not depend on are
+    finished in the background after the response is sent. The work itself
+    is ``services.generation_service``, as for the Flask routes.
+    """
+    user_service = services.user_service
+    generation_service = services.generation_service
+    rate_limiter = services.rate_limiter
+    idempotency_store = services.idempotency_store
+
+    auth_pool = BoundedOffloader('auth', Config.ASYNC_AUTH_THREADS)
+    firestore_pool = BoundedOffloader('firestore', Config.ASYNC_FIRESTORE_THREADS)
+    gemini_pool = BoundedOffloader('gemini', Config.ASYNC_GEMINI_THREADS)
+
+    async def authenticate(load):
+        """Verify the bearer token while ``load(uid)`` runs concurrently.
+
+        The uid is read from the unverified token so the load can start right
+        away; its result is only handed out once verification succeeds for
+        the same uid, otherwise the load is repeated for the verified uid.
+
+        Returns (user_id, load_task, error_response).
+        """
+        auth_header = request.headers.get('Authorization')
+        if not auth_header or not auth_header.startswith('Bearer '):
+            return None, None, (jsonify({"error": "Authorization token missing or invalid"}), 401)
+
+        id_token = auth_header.split(' ')[1]
+        claimed_uid = peek_token_uid(id_token)
+        speculative = None
+        if claimed_uid:
+            speculative = asyncio.ensure_future(firestore_pool.run(load, claimed_uid))
+
+        try:
+            decoded_token = await auth_pool.run(firebase_admin.auth.verify_id_token, id_token)
+        except firebase_admin.auth.InvalidIdTokenError:
+            error = (jsonify({"error": "Invalid ID token"}), 401)
+        except Exception as e:
+            error = (jsonify({"error": str(e)}), 500)
+        else:
+            user_id = decoded_token['uid']
+            if speculative is not None and user_id == claimed_uid:
+                return user_id, speculative, None
+            if speculative is not None:
+                _discard(speculative)
+            return user_id, asyncio.ensure_future(firestore_pool.run(load, user_id)), None
+
+        if speculative is not None:
+            _discard(speculative)
+        return None, None, error
+
+    def rate_limit_exceeded(user_id, route, prefetch):
+        """429 response if the user is over the ``route`` limits, else None
+        (see ``utils.decorators.rate_limited``)"""
+        retry_after = rate_limiter.check(user_id, route)
+        if retry_after is None:
+            return None
+        _discard(prefetch)
+        return jsonify({"error": "Too many requests, slow down"}), 429, {'Retry-After': str(retry_after)}
+
+    def save_in_background():
+        """``save`` for GenerationService calls run on a pool thread: the
+        write is finished on the Firestore pool after the response is sent"""
+        loop = asyncio.get_running_loop()
+
+        def save(description, write, *args):
+            loop.call_soon_threadsafe(background.spawn, firestore_pool.run(write, *args), description)
+        return save
+
+    async def idempotent(user_id, route, handle, prefetch):
+        """Await ``handle()`` at most once per Idempotency-Key and user.
+
+        Async counterpart of ``utils.decorators.idempotent`` stacked on
+        ``rate_limited``, sharing their state: only requests that run
+        ``handle`` count against the ``route`` limits, so replays and
+        requests joining one in flight do not. ``prefetch`` (the task
+        started by ``authenticate``) is discarded when ``handle`` does not
+        run.
+        """
+        async def run():
+            limited = rate_limit_exceeded(user_id, route, prefetch)
+            if limited:
+                return limited
+            return await handle()
+
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return await run()
+
+        call = IdempotentRequest(
+            idempotency_store, user_id, request.path, key,
+            await request.get_data(), request.headers.get(LLM_OUTPUT_HEADER)
+        )
+        action, value = call.step()
+        while action == 'wait':
+            try:
+                # shield: a timeout must not cancel the shared future
+                await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(value)), call.remaining())
+            except asyncio.TimeoutError:
+                pass
+            action, value = call.step()
+        if action == 'error':
+            _discard(prefetch)
+            message, status, headers = value
+            return jsonify({"error": message}), status, headers
+        if action == 'replay':
+            _discard(prefetch)
+            response = await make_response(value.body, value.status, value.headers)
+            response.headers[REPLAYED_HEADER] = 'true'
+            return response
+
+        response = None
+        try:
+            response = await make_response(await run())
+            return response
+        finally:
+            if response is None:
+                call.finish()
+            else:
+                call.finish(response.status_code, response.headers.items(), await response.get_data())
+
+    @async_bp.route('/api/user/chat', methods=['POST'])
+    @log_async_api_call(logger)
+    async def chat():
+        """Async version of POST /api/user/chat"""
+        user_id, history_task, error = await authenticate(user_service.get_chat_history)
+        if error:
+            return error
+        return await idempotent(user_id, 'chat', lambda: respond_chat(user_id, history_task), history_task)
+
+    async def respond_chat(user_id, history_task):
+        try:
+            data = await request.get_json()
+            new_message = data.get('newMessage')
+
+            if not new_message:
+                _discard(history_task)
+                logger.warning('No message provided in chat request')
+                return jsonify({"error": "Message is required"}), 400
+
+            body, status = await gemini_pool.run(
+                generation_service.make_chat, user_id, new_message, await history_task, save_in_background()
+            )
+            return jsonify(body), status
+
+        except ServiceOverloaded as e:
+            return jsonify({"error": str(e)}), e.status, {'Retry-After': str(e.retry_after)}
+        except Exception as e:
+            logger.error('Error in chat', extra={
+                'user_id': user_id,
+                'error': str(e)
+            })
+            return jsonify({"error": str(e)}), 500
+
+    @async_bp.route('/api/health/plan', methods=['POST'])
+    @log_async_api_call(logger)
+    async def plan():
+        """Async version of POST /api/health/plan"""
+        user_id, user_task, error = await authenticate(user_service.get_user)
+        if error:
+            return error
+        return await idempotent(user_id, 'plan', lambda: respond_plan(user_id, user_task), user_task)
+
+    async def respond_plan(user_id, user_task):
+        try:
+            data = await request.get_json()
+            preferences = data.get('preferences', 'no specific preferences')
+            body, status = await gemini_pool.run(
+                generation_service.make_plan, user_id, preferences, await user_task, save_in_background()
+            )
+            return jsonify(present_llm_fields(body, ('plan',), request)), status
+
+        except ServiceOverloaded as e:
+            return jsonify({"error": str(e)}), e.status, {'Retry-After': str(e.retry_after)}
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+    @async_bp.route('/api/health/advice', methods=['POST'])
+    @log_async_api_call(logger)
+    async def life_advice():
+        """Async version of POST /api/health/advice"""
+        user_id, user_task, error = await authenticate(user_service.get_user)
+        if error:
+            return error
+        return await idempotent(user_id, 'advice', lambda: respond_advice(user_id, user_task), user_task)
+
+    async def respond_advice(user_id, user_task):
+        try:
+            body, status = await gemini_pool.run(
+                generation_service.make_advice, user_id, await user_task, save_in_background()
+            )
+            return jsonify(present_llm_fields(body, ('advice',), request)), status
+
+        except ServiceOverloaded as e:
+            return jsonify({"error": str(e)}), e.status, {'Retry-After': str(e.retry_after)}
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+    for pool in (auth_pool, firestore_pool, gemini_pool):
+        register_shutdown_hook(pool.shutdown, f'{pool.name}_offload_pool')
+
+    logger.info('Async routes initialized successfully')
+    return async_bp
@@ -0,0 +1,92 @@
+from concurrent.futures import ThreadPoolExecutor
+from flask import Blueprint, request, jsonify
+from config import Config
+from services.history_service import RECORD_TYPES
+from utils.decorators import require_auth, conditional_get
+from utils.encoding import present_llm_fields
+from utils.lifecycle import register_shutdown_hook
+from utils.logger import setup_logger, log_api_call
+
+# Set up logger
+logger = setup_logger('dashboard_routes')
+
+dashboard_bp = Blueprint('dashboard', __name__)
+
+# Sections returned by GET /api/dashboard, in response order
+DASHBOARD_SECTIONS = ('profile', 'metrics') + tuple(RECORD_TYPES)
+
+
+def init_dashboard_routes(services):
+    db = services.db
+    history_service = services.history_service
+    executor = ThreadPoolExecutor(max_workers=Config.DASHBOARD_THREADS, thread_name_prefix='dashboard')
+    register_shutdown_hook(executor.shutdown, 'dashboard_executor')
+
+    def read_user(user_id, sections):
+        """Read the user document, limited to ``last_metrics`` when the
+        profile itself was not requested"""
+        field_paths = None if 'profile' in sections else ['last_metrics']
+        snapshot = db.collection('users').document(user_id).get(field_paths=field_paths)
+        return snapshot.to_dict() if snapshot.exists else None
+
+    @dashboard_bp.route('', methods=['GET'])
+    @require_auth
+    @conditional_get
+    @log_api_call(logger)
+    def dashboard(user_id):
+        """
+        Everything the app shows on load in one call: profile, metrics and the
+        latest plan, advice and diabetes check.
+
+        Query parameters:
+            sections: comma-separated subset of DASHBOARD_SECTIONS
+                      (default: all). Sections that were not requested are
+                      omitted; requested sections without data are null.
+        """
+        requested = request.args.get('sections')
+        if requested:
+            sections = [section.strip() for section in requested.split(',') if section.strip()]
+            unknown = [section for section in sections if section not in DASHBOARD_SECTIONS]
+            if unknown:
+                return jsonify({
+                    "error": f"Unknown sections: {', '.join(unknown)}",
+                    "sections": list(DASHBOARD_SECTIONS)
+                }), 400
+        else:
+            sections = list(DASHBOARD_SECTIONS)
+
+        try:
+            # The user document (profile and metrics) and the latest-record
+            # documents (one multi-document read) are fetched in parallel
+            record_types = [record_type for record_type in RECORD_TYPES if record_type in sections]
+            user_future = None
+            if 'profile' in sections or 'metrics' in sections:
+                user_future = executor.submit(read_user, user_id, sections)
+            records = history_service.latest_many(record_types, user_id) if record_types else {}
+            user_data = user_future.result() if user_future else None
+
+            response = {"user_id": user_id}
+            for section in DASHBOARD_SECTIONS:
+                if section not in sections:
+                    continue
+                if section == 'profile':
+                    response['profile'] = user_data
+                elif section == 'metrics':
+                    response['metrics'] = (user_data or {}).get('last_metrics')
+                else:
+                    response[section] = present_llm_fields(
+                        records[section], RECORD_TYPES[section].get('llm_fields', ()), request
+                    )
+
+            logger.info('Dashboard loaded', extra={'user_id': user_id, 'sections': sections})
+            return jsonify(response)
+
+        except Exception as e:
+            logger.error('Error loading dashboard', extra={
+                'user_id': user_id,
+                'error': str(e)
+            })
+            return jsonify({"error": str(e)}), 500
+
+    logger.info('Dashboard routes initialized successfully')
+    return dashboard_bp
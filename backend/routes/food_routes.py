@@ -1,8 +1,13 @@
 from flask import Blueprint, request, jsonify
-from services.ai_service import AIService
-from utils.decorators import require_auth
+from services.job_service import save_upload, remove_upload
+from routes.job_routes import wants_job, job_accepted
+from routes.history_routes import parse_page_args
+from utils.circuit_breaker import CircuitOpen
+from utils.decorators import require_auth, idempotent, rate_limited
+from utils.limiter import ServiceOverloaded
+from utils.encoding import present_llm_output, present_llm_fields
+from utils.food_names import normalize_food_name
 from firebase_admin import firestore, auth
-from clarifai.client.model import Model
 import os
 from datetime import datetime
 from config import Config
@@ -10,13 +15,77 @@ from utils.logger import setup_logger, log_api_call, log_function_call
 
 food_bp = Blueprint('food', __name__)
 
-def init_food_routes(db):
+def init_food_routes(services):
     """Initialize food routes blueprint"""
     logger = setup_logger('food_routes')
-    ai_service = AIService()
+    db = services.db
+    ai_service = services.ai_service
+    history_service = services.history_service
+    recognizer = services.recognizer
+    macro_service = services.macro_service
+    job_service = services.job_service
+
+    def make_recipe(user_id, image_path):
+        """Recognize the food in an image and generate a recipe for it;
+        returns (body, status). Shared by POST /recipes and its background jobs.
+        """
+        # Run food recognition model
+        recognized = recognizer.recognize(image_path)
+
+        if not recognized:
+            logger.warning('No food detected in image', extra={'user_id': user_id})
+            return {"error": "No food detected"}, 400
+
+        food_name, confidence = recognized
+        food_name = normalize_food_name(food_name)
+        logger.debug('Food recognized', extra={
+            'food_name': food_name,
+            'confidence': confidence
+        })
+
+        # Generate recipe
+        logger.debug('Generating recipe')
+        try:
+            response = ai_service.generate_recipe(food_name)
+        except CircuitOpen:
+            # Gemini is failing: serve an earlier recipe for this food if there is one
+            previous = history_service.find_any('recipe_queries', 'food_name', food_name)
+            if previous is None:
+                raise
+            logger.warning('Serving stored recipe while Gemini is unavailable', extra={
+                'user_id': user_id,
+                'food_name': food_name
+            })
+            return {"recipe": previous['recipe'], "stale": True}, 200
+
+        # Save recipe query
+        logger.debug('Saving recipe query to Firestore')
+        db.collection('recipe_queries').add({
+            'user_id': user_id,
+            'food_name': food_name,
+            'recipe': response,
+            'timestamp': firestore.SERVER_TIMESTAMP
+        })
+
+        logger.info('Recipe generated successfully', extra={
+            'user_id': user_id,
+            'food_name': food_name
+        })
+        return {"recipe": response}, 200
+
+    def recipe_job(user_id, params):
+        image_path = params['image_path']
+        if not os.path.exists(image_path):
+            return {"error": "Uploaded image is no longer available"}, 410
+        return make_recipe(user_id, image_path)
+
+    # The image is kept for retries until the job is done or has failed for good
+    job_service.register('recipe', recipe_job, ('recipe',),
+                         on_finish=lambda params: remove_upload(params['image_path']))
 
     @food_bp.route('/recipes', methods=['POST'])
     @require_auth
+    @rate_limited(services.rate_limiter, 'recipes')
     @log_api_call(logger)
     def generate_recipe(user_id):
         """Generate recipe from uploaded image"""
@@ -37,48 +106,24 @@ def init_food_routes(db):
                 'content_type': file.content_type
             })
 
+            if wants_job(request):
+                # The image waits on disk until a job worker picks it up
+                image_path = save_upload(file)
+                try:
+                    job_id = job_service.submit(user_id, 'recipe', {'image_path': image_path})
+                except Exception:
+                    remove_upload(image_path)
+                    raise
+                return job_accepted(job_id)
+
             # Save file temporarily
             temp_path = f"temp_{file.filename}"
             file.save(temp_path)
             logger.debug('Saved uploaded file', extra={'temp_path': temp_path})
 
             try:
-                # Run food recognition model
-                logger.debug('Initializing Clarifai model')
-                model = Model(url=Config.CLARIFAI_MODEL_URL, 
-                            pat=Config.CLARIFAI_PAT)
-                logger.debug('Running food recognition')
-                prediction = model.predict_by_filepath(temp_path, input_type="image")
-                
-                if prediction.outputs:
-                    food_name = prediction.outputs[0].data.concepts[0].name
-                    confidence = prediction.outputs[0].data.concepts[0].value
-                    logger.debug('Food recognized', extra={
-                        'food_name': food_name,
-                        'confidence': confidence
-                    })
-                    
-                    # Generate recipe
-                    logger.debug('Generating recipe')
-                    response = ai_service.generate_recipe(food_name)
-
-                    # Save recipe query
-                    logger.debug('Saving recipe query to Firestore')
-                    db.collection('recipe_queries').add({
-                        'user_id': user_id,
-                        'food_name': food_name,
-                        'recipe': response,
-                        'timestamp': firestore.SERVER_TIMESTAMP
-                    })
-                    
-                    logger.info('Recipe generated successfully', extra={
-                        'user_id': user_id,
-                        'food_name': food_name
-                    })
-                    return jsonify({"recipe": response})
-                
-                logger.warning('No food detected in image', extra={'user_id': user_id})
-                return jsonify({"error": "No food detected"}), 400
+                body, status = make_recipe(user_id, temp_path)
+                return jsonify(present_llm_fields(body, ('recipe',), request)), status
 
             finally:
                 # Clean up temporary file
@@ -86,6 +131,8 @@ def init_food_routes(db):
                     os.remove(temp_path)
                     logger.debug('Removed temporary file', extra={'temp_path': temp_path})
 
+        except ServiceOverloaded as e:
+            return jsonify({"error": str(e)}), e.status, {'Retry-After': str(e.retry_after)}
         except Exception as e:
             logger.error('Error generating recipe', extra={
                 'user_id': user_id,
@@ -95,35 +142,42 @@ def init_food_routes(db):
 
     @food_bp.route('/diet', methods=['POST', 'GET'])
     @require_auth
+    @idempotent(services.idempotency_store)
+    @rate_limited(services.rate_limiter, 'diet')
     @log_api_call(logger)
     def diet(user_id):
         if request.method == 'GET':
+            limit, cursor, fields, error = parse_page_args('diet_queries')
+            if error:
+                return error
+
             try:
-                # Get diet query history for user
-                diet_ref = db.collection('diet_queries')
-                query = diet_ref.where('user_id', '==', user_id).limit(50)  # Get last 50 diet queries
-                diet_queries = query.get()
+                # Get a page of diet query history for user, newest first
+                diet_queries, next_cursor = history_service.list_page(
+                    'diet_queries', user_id, limit, cursor, fields
+                )
 
-                if not diet_queries:
+                if not diet_queries and not cursor:
                     logger.info('No diet query history found', extra={'user_id': user_id})
                     return jsonify({"error": "No diet query history found"}), 404
 
-                # Sort in memory by timestamp
-                sorted_queries = sorted(diet_queries, key=lambda x: x.get('timestamp', 0), reverse=True)
-                
                 diet_history = []
-                for query in sorted_queries:
-                    diet_history.append({
-                        'food_item': query.get('food_item'),
-                        'macro_breakdown': query.get('response'),
-                        'timestamp': query.get('timestamp')
-                    })
+                for query in diet_queries:
+                    entry = {'timestamp': query['timestamp']}
+                    if 'food_item' in query:
+                        entry['food_item'] = query['food_item']
+                    if 'response' in query:
+                        entry['macro_breakdown'] = present_llm_output(query['response'], request)
+                    diet_history.append(entry)
 
                 logger.info('Diet history retrieved successfully', extra={'user_id': user_id})
                 return jsonify({
-                    "diet_history": diet_history
+                    "diet_history": diet_history,
+                    "next_cursor": next_cursor
                 })
 
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
             except Exception as e:
                 logger.error('Error fetching diet history', extra={
                     'user_id': user_id,
@@ -143,13 +197,29 @@ def init_food_routes(db):
                 'user_id': user_id,
                 'food_item': food_item
             })
-            response = ai_service.get_macro_breakdown(food_item)
+            try:
+                response, _ = macro_service.breakdown(food_item)
+            except CircuitOpen:
+                # Gemini is failing: serve an earlier breakdown of this item if there is one
+                previous = history_service.find_any('diet_queries', 'food_key', normalize_food_name(food_item))
+                if previous is None:
+                    raise
+                logger.warning('Serving stored macro breakdown while Gemini is unavailable', extra={
+                    'user_id': user_id,
+                    'food_item': food_item
+                })
+                return jsonify({
+                    "food_item": food_item,
+                    "macro_breakdown": present_llm_output(previous['response'], request),
+                    "stale": True
+                })
             
             # Save diet query
             logger.debug('Saving diet query to Firestore', extra={'user_id': user_id})
             db.collection('diet_queries').add({
                 'user_id': user_id,
                 'food_item': food_item,
+                'food_key': normalize_food_name(food_item),
                 'response': response,
                 'timestamp': firestore.SERVER_TIMESTAMP
             })
@@ -157,9 +227,11 @@ def init_food_routes(db):
             logger.info('Diet query processed successfully', extra={'user_id': user_id})
             return jsonify({
                 "food_item": food_item,
-                "macro_breakdown": response
+                "macro_breakdown": present_llm_output(response, request)
             })
 
+        except ServiceOverloaded as e:
+            return jsonify({"error": str(e)}), e.status, {'Retry-After': str(e.retry_after)}
         except Exception as e:
             logger.error('Error in diet', extra={
                 'user_id': user_id,
@@ -167,5 +239,116 @@ def init_food_routes(db):
             })
             return jsonify({"error": str(e)}), 500
 
+    @food_bp.route('/diet/batch', methods=['POST'])
+    @require_auth
+    @rate_limited(services.rate_limiter, 'diet_batch')
+    @log_api_call(logger)
+    def diet_batch(user_id):
+        """
+        Macro breakdowns for several food items, e.g. a whole meal.
+
+        Request: {"food_items": ["apple", "oatmeal", ...]}
+
+        Items in the nutrition table or the cache are answered without a
+        model call; the rest are resolved with a single request. Every
+        submitted item, including repeats, is saved to diet_queries in one
+        batch write.
+
+        Returns:
+        {
+            "items": [{"food_item": "...", "macro_breakdown": [...], "source": "table" | "cache" | "model"}]
+        }
+        Items that could not be resolved have an "error" instead of a
+        breakdown.
+        """
+        data = request.get_json(silent=True) or {}
+        food_items = data.get('food_items')
+        if not isinstance(food_items, list) or not food_items:
+            return jsonify({"error": "food_items must be a non-empty list"}), 400
+        if not all(isinstance(item, str) and item.strip() for item in food_items):
+            return jsonify({"error": "food_items must be non-empty strings"}), 400
+        food_items = [item.strip() for item in food_items]
+        if len(food_items) > Config.DIET_BATCH_MAX_ITEMS:
+            return jsonify({"error": f"At most {Config.DIET_BATCH_MAX_ITEMS} food items per request"}), 400
+
+        try:
+            # Names that normalize to the same key ("apple", "Apples") are
+            # resolved once, under the first name given for the key, and
+            # share the breakdown
+            keys = [(food_item, normalize_food_name(food_item)) for food_item in food_items]
+            names = {}
+            for food_item, key in keys:
+                names.setdefault(key, food_item)
+            results = {}
+            for key, food_item in names.items():
+                found = macro_service.lookup(food_item)
+                if found is not None:
+                    results[key] = found
+
+            pending = [food_item for key, food_item in names.items() if key not in results]
+            error = None
+            if pending:
+                logger.debug('Getting macro breakdowns', extra={
+                    'user_id': user_id,
+                    'cached': len(results),
+                    'pending': len(pending)
+                })
+                try:
+                    for food_item, breakdown in macro_service.generate_many(pending).items():
+                        results[normalize_food_name(food_item)] = (breakdown, 'model')
+                except ServiceOverloaded as e:
+                    # Still answer the items found without the model
+                    if not results:
+                        raise
+                    error = e
+
+            # Save all diet queries in one write, one per submitted item
+            batch = db.batch()
+            saved = 0
+            for food_item, key in keys:
+                if key not in results:
+                    continue
+                saved += 1
+                batch.set(db.collection('diet_queries').document(), {
+                    'user_id': user_id,
+                    'food_item': food_item,
+                    'food_key': key,
+                    'response': results[key][0],
+                    'timestamp': firestore.SERVER_TIMESTAMP
+                })
+            if saved:
+                batch.commit()
+
+            items = []
+            for food_item, key in keys:
+                if key in results:
+                    breakdown, source = results[key]
+                    items.append({
+                        "food_item": food_item,
+                        "macro_breakdown": present_llm_output(breakdown, request),
+                        "source": source
+                    })
+                else:
+                    items.append({
+                        "food_item": food_item,
+                        "error": str(error) if error else "No breakdown returned for this item"
+                    })
+
+            logger.info('Diet batch processed successfully', extra={
+                'user_id': user_id,
+                'items': len(food_items),
+                'resolved': saved
+            })
+            return jsonify({"items": items})
+
+        except ServiceOverloaded as e:
+            return jsonify({"error": str(e)}), e.status, {'Retry-After': str(e.retry_after)}
+        except Exception as e:
+            logger.error('Error in diet batch', extra={
+                'user_id': user_id,
+                'error': str(e)
+            })
+            return jsonify({"error": str(e)}), 500
+
     logger.info('Food routes initialized successfully')
     return food_bp 
\ No newline at end of file
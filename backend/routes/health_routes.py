@@ -1,8 +1,8 @@
 from flask import Blueprint, request, jsonify
-from services.health_service import HealthService
-from services.ai_service import AIService
-from services.user_service import UserService
-from utils.decorators import require_auth
+from routes.job_routes import wants_job, job_accepted
+from utils.decorators import require_auth, conditional_get, idempotent, rate_limited
+from utils.limiter import ServiceOverloaded
+from utils.encoding import present_llm_fields
 from firebase_admin import firestore, auth
 from utils.logger import setup_logger, log_api_call, log_function_call
 
@@ -11,159 +11,100 @@ logger = setup_logger('health_routes')
 
 health_bp = Blueprint('health', __name__)
 
-def init_health_routes(db, diabetes_model):
-    health_service = HealthService(db, diabetes_model)
-    user_service = UserService(db)
-    ai_service = AIService()
+def init_health_routes(services):
+    db = services.db
+    health_service = services.health_service
+    user_service = services.user_service
+    history_service = services.history_service
+    generation_service = services.generation_service
+    job_service = services.job_service
+
+    job_service.register(
+        'plan', lambda user_id, params: generation_service.make_plan(user_id, params['preferences']), ('plan',)
+    )
+    job_service.register('advice', lambda user_id, params: generation_service.make_advice(user_id), ('advice',))
 
     @health_bp.route('/plan', methods=['POST', 'GET'])
     @require_auth
+    @idempotent(services.idempotency_store)
+    @rate_limited(services.rate_limiter, 'plan')
+    @conditional_get
     def plan(user_id):
         if request.method == 'GET':
             try:
                 # Get latest plan for user
-                plans_ref = db.collection('plans')
-                query = plans_ref.where('user_id', '==', user_id).limit(10)  # Get last 10 plans
-                plans = query.get()
+                latest_plan = history_service.latest('plan', user_id)
 
-                if not plans:
+                if not latest_plan:
                     return jsonify({"error": "No plan found"}), 404
 
-                # Sort in memory by created_at
-                sorted_plans = sorted(plans, key=lambda x: x.to_dict().get('created_at', 0), reverse=True)
-                plan_doc = sorted_plans[0]
-                
-                return jsonify({
-                    "plan": plan_doc.to_dict().get('plan'),
-                    "plan_id": plan_doc.id,
-                    "created_at": plan_doc.to_dict().get('created_at')
-                })
+                return jsonify(present_llm_fields(latest_plan, ('plan',), request))
 
             except Exception as e:
                 return jsonify({"error": str(e)}), 500
 
         try:
-            # Get user data
-            user_data = user_service.get_user(user_id)
-            
             # Get preferences from request
             data = request.json
             preferences = data.get('preferences', 'no specific preferences')
 
-            # Calculate metrics
-            bmi, _ = health_service.calculate_bmi(user_data)
-            bmr, tdee = health_service.calculate_energy(user_data)
-
-            # Add metrics to user data
-            user_data.update({
-                'bmi': bmi,
-                'bmr': bmr,
-                'tdee': tdee
-            })
+            if wants_job(request):
+                return job_accepted(job_service.submit(user_id, 'plan', {'preferences': preferences}))
 
-            # Generate diet plan
-            plan_json = ai_service.generate_diet_plan(user_data, preferences)
-            
-            # Save to user's plan history
-            plan_ref = db.collection('plans').document()
-            plan_ref.set({
-                'user_id': user_id,
-                'plan': plan_json,
-                'created_at': firestore.SERVER_TIMESTAMP
-            })
-
-            return jsonify({
-                "plan": plan_json,
-                "plan_id": plan_ref.id
-            })
+            body, status = generation_service.make_plan(user_id, preferences)
+            return jsonify(present_llm_fields(body, ('plan',), request)), status
 
+        except ServiceOverloaded as e:
+            return jsonify({"error": str(e)}), e.status, {'Retry-After': str(e.retry_after)}
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
     @health_bp.route('/advice', methods=['POST', 'GET'])
     @require_auth
+    @idempotent(services.idempotency_store)
+    @rate_limited(services.rate_limiter, 'advice')
+    @conditional_get
     @log_api_call(logger)
     def life_advice(user_id):
         if request.method == 'GET':
             try:
                 # Get latest advice for user
-                advice_ref = db.collection('advice')
-                query = advice_ref.where('user_id', '==', user_id).limit(10)  # Get last 10 advice entries
-                advice_docs = query.get()
+                latest_advice = history_service.latest('advice', user_id)
 
-                if not advice_docs:
+                if not latest_advice:
                     return jsonify({"error": "No advice found"}), 404
 
-                # Sort in memory by timestamp
-                sorted_advice = sorted(advice_docs, key=lambda x: x.to_dict().get('timestamp', 0), reverse=True)
-                advice_doc = sorted_advice[0]
-                
-                return jsonify({
-                    "advice": advice_doc.get('advice'),
-                    "metrics": advice_doc.get('metrics'),
-                    "timestamp": advice_doc.get('timestamp')
-                })
+                return jsonify(present_llm_fields(latest_advice, ('advice',), request))
 
             except Exception as e:
                 return jsonify({"error": str(e)}), 500
 
         try:
-            # Get user data
-            user_data = user_service.get_user(user_id)
-            
-            # Calculate metrics
-            bmi, bmi_class = health_service.calculate_bmi(user_data)
-            bmr, tdee = health_service.calculate_energy(user_data)
-            
-            metrics = {
-                'bmi': bmi,
-                'bmi_class': bmi_class,
-                'bmr': bmr,
-                'tdee': tdee
-            }
-            
-            # Generate health advice
-            advice = ai_service.generate_health_advice(user_data, metrics)
-            
-            # Save advice
-            db.collection('advice').add({
-                'user_id': user_id,
-                'advice': advice,
-                'metrics': metrics,
-                'timestamp': firestore.SERVER_TIMESTAMP
-            })
-            
-            return jsonify({
-                "advice": advice,
-                "metrics": metrics
-            })
+            if wants_job(request):
+                return job_accepted(job_service.submit(user_id, 'advice', {}))
+
+            body, status = generation_service.make_advice(user_id)
+            return jsonify(present_llm_fields(body, ('advice',), request)), status
 
+        except ServiceOverloaded as e:
+            return jsonify({"error": str(e)}), e.status, {'Retry-After': str(e.retry_after)}
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
     @health_bp.route('/diabetes_check', methods=['POST', 'GET'])
     @require_auth
+    @conditional_get
     @log_api_call(logger)
     def diabetes_check(user_id):
         if request.method == 'GET':
             try:
                 # Get latest diabetes check for user
-                checks_ref = db.collection('diabetes_checks')
-                query = checks_ref.where('user_id', '==', user_id).limit(10)  # Get last 10 checks
-                checks = query.get()
+                latest_check = history_service.latest('diabetes_check', user_id)
 
-                if not checks:
+                if not latest_check:
                     return jsonify({"error": "No diabetes check found"}), 404
 
-                # Sort in memory by timestamp
-                sorted_checks = sorted(checks, key=lambda x: x.get('timestamp', 0), reverse=True)
-                check_doc = sorted_checks[0]
-                
-                return jsonify({
-                    "prediction": check_doc.get('prediction'),
-                    "prediction_code": check_doc.get('prediction_code'),
-                    "timestamp": check_doc.get('timestamp')
-                })
+                return jsonify(latest_check)
 
             except Exception as e:
                 return jsonify({"error": str(e)}), 500
@@ -176,11 +117,9 @@ def init_health_routes(db, diabetes_model):
             result = health_service.check_diabetes_risk(user_data)
             
             # Save check result
-            db.collection('diabetes_checks').add({
-                'user_id': user_id,
+            history_service.add('diabetes_check', user_id, {
                 'prediction': result["prediction"],
-                'prediction_code': result["prediction_code"],
-                'timestamp': firestore.SERVER_TIMESTAMP
+                'prediction_code': result["prediction_code"]
             })
             
             return jsonify({
@@ -194,6 +133,7 @@ def init_health_routes(db, diabetes_model):
 
     @health_bp.route('/calculate_metrics', methods=['POST', 'GET'])
     @require_auth
+    @conditional_get
     @log_api_call(logger)
     def calculate_metrics(user_id):
         if request.method == 'GET':
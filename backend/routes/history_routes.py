@@ -0,0 +1,94 @@
+from flask import Blueprint, request, jsonify
+from config import Config
+from services.history_service import HISTORY_COLLECTIONS
+from utils.decorators import require_auth
+from utils.encoding import compression, present_llm_fields
+from utils.logger import setup_logger, log_api_call
+
+# Set up logger
+logger = setup_logger('history_routes')
+
+history_bp = Blueprint('history', __name__)
+
+
+def parse_page_args(collection):
+    """Read ``limit``, ``cursor`` and ``fields`` from the query string.
+
+    Returns (limit, cursor, fields, error_response).
+    """
+    try:
+        limit = int(request.args.get('limit', Config.HISTORY_PAGE_SIZE))
+    except ValueError:
+        return None, None, None, (jsonify({"error": "limit must be an integer"}), 400)
+    if limit < 1:
+        return None, None, None, (jsonify({"error": "limit must be at least 1"}), 400)
+    limit = min(limit, Config.HISTORY_MAX_PAGE_SIZE)
+
+    fields = None
+    if request.args.get('fields'):
+        allowed = HISTORY_COLLECTIONS[collection]['fields']
+        fields = [field.strip() for field in request.args['fields'].split(',') if field.strip()]
+        unknown = [field for field in fields if field not in allowed]
+        if unknown:
+            return None, None, None, (jsonify({
+                "error": f"Unknown fields: {', '.join(unknown)}",
+                "fields": list(allowed)
+            }), 400)
+
+    return limit, request.args.get('cursor'), fields, None
+
+
+def init_history_routes(services):
+    history_service = services.history_service
+
+    @history_bp.route('/<collection>', methods=['GET'])
+    @require_auth
+    # List pages are small once projected with fields=
+    @compression(min_size=256)
+    @log_api_call(logger)
+    def history(user_id, collection):
+        """
+        Page through the user's plans, advice, diabetes_checks,
+        recipe_queries or diet_queries, newest first.
+
+        Query parameters:
+            limit:  page size (default HISTORY_PAGE_SIZE, capped at HISTORY_MAX_PAGE_SIZE)
+            cursor: next_cursor from the previous page
+            fields: comma-separated fields to return, e.g. fields=food_name
+                    (the id and timestamp are always included)
+
+        Returns:
+        {
+            "items": [{"id": "...", ..., "timestamp": "..."}],
+            "next_cursor": "..." or null
+        }
+        """
+        if collection not in HISTORY_COLLECTIONS:
+            return jsonify({"error": f"Unknown history collection: {collection}"}), 404
+
+        limit, cursor, fields, error = parse_page_args(collection)
+        if error:
+            return error
+
+        try:
+            items, next_cursor = history_service.list_page(collection, user_id, limit, cursor, fields)
+            llm_fields = HISTORY_COLLECTIONS[collection].get('llm_fields', ())
+            for item in items:
+                present_llm_fields(item, llm_fields, request)
+            return jsonify({
+                "items": items,
+                "next_cursor": next_cursor
+            })
+
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            logger.error('Error listing history', extra={
+                'user_id': user_id,
+                'collection': collection,
+                'error': str(e)
+            })
+            return jsonify({"error": str(e)}), 500
+
+    logger.info('History routes initialized successfully')
+    return history_bp
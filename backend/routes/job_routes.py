@@ -0,0 +1,65 @@
+from flask import Blueprint, request, jsonify
+from config import Config
+from utils.decorators import require_auth
+from utils.encoding import present_llm_fields
+from utils.logger import setup_logger, log_api_call
+
+# Set up logger
+logger = setup_logger('job_routes')
+
+job_bp = Blueprint('jobs', __name__)
+
+
+def wants_job(request):
+    """Whether the client asked for a background job (``Prefer: respond-async``)"""
+    return 'respond-async' in request.headers.get('Prefer', '').lower()
+
+
+def job_accepted(job_id):
+    """202 response pointing the client at the job's status endpoint"""
+    location = f'/api/jobs/{job_id}'
+    return jsonify({
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": location
+    }), 202, {'Location': location, 'Retry-After': str(Config.JOB_POLL_INTERVAL)}
+
+
+def init_job_routes(services):
+    job_service = services.job_service
+
+    @job_bp.route('/<job_id>', methods=['GET'])
+    @require_auth
+    @log_api_call(logger)
+    def get_job(user_id, job_id):
+        """
+        Status of a background job started with ``Prefer: respond-async``.
+
+        Returns:
+        {
+            "job_id": "...",
+            "kind": "plan" | "advice" | "recipe",
+            "status": "queued" | "running" | "done" | "failed",
+            "result": {...},       (done: the body the endpoint would have returned)
+            "error": "...",        (failed)
+            "error_status": 503    (failed: the status the endpoint would have returned)
+        }
+        """
+        try:
+            job = job_service.get(job_id, user_id)
+            if job is None:
+                return jsonify({"error": "Job not found"}), 404
+
+            if job['status'] == 'done':
+                present_llm_fields(job['result'], job_service.llm_fields(job['kind']), request)
+                return jsonify(job)
+            if job['status'] == 'failed':
+                return jsonify(job)
+            return jsonify(job), 200, {'Retry-After': str(Config.JOB_POLL_INTERVAL)}
+
+        except Exception as e:
+            logger.error('Error getting job', extra={'user_id': user_id, 'job_id': job_id, 'error': str(e)})
+            return jsonify({"error": str(e)}), 500
+
+    logger.info('Job routes initialized successfully')
+    return job_bp
@@ -0,0 +1,24 @@
+import hmac
+from flask import Blueprint, request, jsonify
+from config import Config
+from utils.metrics import metrics
+from utils.logger import setup_logger
+
+# Set up logger
+logger = setup_logger('metrics_routes')
+
+metrics_bp = Blueprint('metrics', __name__)
+
+
+def init_metrics_routes():
+    @metrics_bp.route('', methods=['GET'])
+    def get_metrics():
+        """Counters and gauges of the worker process serving the request"""
+        if Config.METRICS_TOKEN:
+            auth_header = request.headers.get('Authorization', '')
+            if not hmac.compare_digest(auth_header, f'Bearer {Config.METRICS_TOKEN}'):
+                return jsonify({"error": "Unauthorized"}), 401
+        return jsonify(metrics.snapshot())
+
+    logger.info('Metrics routes initialized successfully')
+    return metrics_bp
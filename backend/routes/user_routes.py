@@ -1,8 +1,6 @@
 from flask import Blueprint, request, jsonify
-from services.user_service import UserService
-from services.ai_service import AIService
-from utils.decorators import require_auth
-import requests
+from utils.decorators import require_auth, conditional_get, idempotent, rate_limited
+from utils.limiter import ServiceOverloaded
 from config import Config
 from utils.logger import setup_logger, log_api_call, log_function_call
 from google.cloud import firestore
@@ -10,9 +8,11 @@ from firebase_admin import auth
 
 user_bp = Blueprint('user', __name__)
 
-def init_user_routes(db):
-    user_service = UserService(db)
-    ai_service = AIService()
+def init_user_routes(services):
+    db = services.db
+    user_service = services.user_service
+    generation_service = services.generation_service
+    http = services.http
     logger = setup_logger('UserRoutes')
 
 
@@ -59,7 +59,7 @@ def init_user_routes(db):
                 "token": result["custom_token"],
                 "returnSecureToken": True
             }
-            response = requests.post(url, json=payload)
+            response = http.post(url, json=payload)
             if response.status_code == 200:
                 id_token = response.json().get("idToken")
             else:
@@ -96,7 +96,7 @@ def init_user_routes(db):
                 "token": result["custom_token"],
                 "returnSecureToken": True
             }
-            response = requests.post(url, json=payload)
+            response = http.post(url, json=payload)
             if response.status_code == 200:
                 id_token = response.json().get("idToken")
             else:
@@ -116,6 +116,7 @@ def init_user_routes(db):
 
     @user_bp.route('/', methods=['GET'])
     @require_auth
+    @conditional_get
     def get_user(user_id):
         try:
             user_data = user_service.get_user(user_id)
@@ -142,6 +143,8 @@ def init_user_routes(db):
 
     @user_bp.route('/chat', methods=['POST'])
     @require_auth
+    @idempotent(services.idempotency_store)
+    @rate_limited(services.rate_limiter, 'chat')
     @log_api_call(logger)
     def chat(user_id):
         """
@@ -166,31 +169,11 @@ def init_user_routes(db):
                 'chat_message': new_message
             })
 
-            # Get chat history
-            history = user_service.get_chat_history(user_id)
-            
-            # Get chat response
-            response = ai_service.chat(new_message=new_message, history=history)
-            
-            # Save chat to Firestore
-            logger.debug('Saving chat to Firestore', extra={
-                'user_id': user_id,
-                'response_length': len(response)
-            })
-            
-             # Save chat history using the service
-            user_service.save_chat_message(user_id, new_message, response)
-            
-            logger.info('Chat processed successfully', extra={
-                'user_id': user_id,
-                'response_length': len(response)
-            })
-            
-            return jsonify({
-                "response": response,
-                "user_id": user_id
-            })
+            body, status = generation_service.make_chat(user_id, new_message)
+            return jsonify(body), status
 
+        except ServiceOverloaded as e:
+            return jsonify({"error": str(e)}), e.status, {'Retry-After': str(e.retry_after)}
         except Exception as e:
             logger.error('Error in chat', extra={
                 'user_id': user_id,
@@ -200,6 +183,7 @@ def init_user_routes(db):
 
     @user_bp.route('/chat/history', methods=['GET'])
     @require_auth
+    @conditional_get
     def get_chat_history(user_id):
         """
         Get the chat history for the authenticated user.
@@ -248,6 +232,7 @@ def init_user_routes(db):
             return jsonify({"error": str(e)}), 500
 
     @user_bp.route('/profile', methods=['GET'])
+    @conditional_get
     @log_api_call(logger)
     def get_user_profile():
         """Get user profile from Firestore"""
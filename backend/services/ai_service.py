@@ -1,16 +1,96 @@
+import json
+import time
+import httpx
 from google import genai
+from pydantic import TypeAdapter, ValidationError
 from config import Config
-from models.models import DietPlan, Recipe, MacroBreakdown, HealthAdvice, Message
+from models.models import DietPlan, Recipe, MacroBreakdown, FoodMacroBreakdown, HealthAdvice, Message
+from utils.circuit_breaker import CircuitBreaker
+from utils.limiter import AdaptiveLimiter, ServiceOverloaded
 from utils.logger import setup_logger, log_function_call
+from utils.metrics import metrics
+from utils.retry import CallPolicy, DeadlineExceeded, RetryingCaller
+from utils.single_flight import SingleFlight
 
 # Set up logger
 logger = setup_logger('AIService')
 
+# Validators for list[<output class>] responses, built once per class
+_list_adapters = {}
+
+def _schema_name(output_class):
+    return output_class.__name__ if output_class else 'text'
+
+def _is_timeout(error):
+    return isinstance(error, (TimeoutError, httpx.TimeoutException))
+
+def _is_overload(error):
+    """Upstream errors that mean "send less": rate limited, unavailable, timed out"""
+    return getattr(error, 'code', None) in (429, 503, 504) or _is_timeout(error)
+
+def _is_transient(error):
+    """Upstream errors worth retrying"""
+    return (getattr(error, 'code', None) in (408, 429, 500, 502, 503, 504)
+            or isinstance(error, (TimeoutError, ConnectionError, httpx.TransportError)))
+
+def _http_options(deadline):
+    """Per-request HTTP timeout (milliseconds) ending at ``deadline``"""
+    return {'timeout': max(1, int((deadline - time.monotonic()) * 1000))}
+
+def _estimate_tokens(text):
+    # ~4 characters per token, plus the reserved output
+    return len(text) // 4 + Config.GEMINI_OUTPUT_TOKEN_ESTIMATE
+
+def _tokens_used(response):
+    usage = getattr(response, 'usage_metadata', None)
+    return getattr(usage, 'total_token_count', None)
+
 class AIService:
+    """Gemini requests of one process.
+
+    Created once by ServiceContainer; every request the service makes goes
+    through its limiter, retry caller and circuit breaker.
+    """
+
     def __init__(self):
         self.logger = logger
         self.client = genai.Client(api_key=Config.PALM_API_KEY)
 
+        # Identical generate_content calls in flight share one upstream
+        # request (see get_response)
+        self.in_flight = SingleFlight(
+            on_join=lambda key: metrics.increment('ai.upstream_calls_saved', schema=_schema_name(key[2]))
+        )
+        metrics.register_gauge('ai.single_flight.in_flight', self.in_flight.in_flight)
+        metrics.register_gauge('ai.single_flight.waiting', self.in_flight.waiting)
+
+        self.limiter = AdaptiveLimiter(
+            'gemini',
+            initial_limit=Config.GEMINI_INITIAL_CONCURRENCY,
+            min_limit=Config.GEMINI_MIN_CONCURRENCY,
+            max_limit=Config.GEMINI_MAX_CONCURRENCY,
+            requests_per_minute=Config.GEMINI_RPM,
+            tokens_per_minute=Config.GEMINI_TPM,
+            max_queue=Config.GEMINI_QUEUE_SIZE,
+            queue_timeout=Config.GEMINI_QUEUE_TIMEOUT,
+        )
+
+        # Deadlines, retries and hedging per method (Config.GEMINI_CALL_POLICIES).
+        # Sized so hedged calls never queue for a thread: the limiter admits at
+        # most MAX_CONCURRENCY requests (each with one hedge) and QUEUE_SIZE waiters
+        self.caller = RetryingCaller(
+            'gemini', _is_transient, 2 * Config.GEMINI_MAX_CONCURRENCY + Config.GEMINI_QUEUE_SIZE
+        )
+
+        # Opened by calls that still failed after their retries; the limiter
+        # shedding load locally is not an upstream failure
+        self.breaker = CircuitBreaker(
+            'gemini',
+            failure_threshold=Config.GEMINI_BREAKER_FAILURES,
+            reset_timeout=Config.GEMINI_BREAKER_RESET_TIMEOUT,
+            is_failure=lambda error: _is_transient(error) or isinstance(error, DeadlineExceeded),
+        )
+
     def chat(self, history, new_message):
         """
         Chat with the Gemini model using chat session.
@@ -34,43 +114,101 @@ class AIService:
         """
         try:
             print(history)
-            # Start a new chat session with history
-            chat = self.client.chats.create(model=Config.GEMINI_MODEL,history=history)
-            
-            # Send the new message
-            response = chat.send_message(new_message)
-            
+            history_text = ''.join(
+                part.get('text', '') for message in history for part in message.get('parts', [])
+            )
+            tokens = _estimate_tokens(history_text + new_message)
+
+            def attempt(deadline, hedge):
+                # Start a new chat session with history, then send the new message
+                chat = self.client.chats.create(model=Config.GEMINI_MODEL,history=history)
+                with self.limiter.permit(tokens, _is_overload, deadline, block=not hedge) as permit:
+                    response = chat.send_message(new_message, config={'http_options': _http_options(deadline)})
+                    permit.tokens_used = _tokens_used(response)
+                return response
+
+            policy = CallPolicy.for_method(Config.GEMINI_CALL_POLICIES, 'chat')
+            with self.breaker.guard():
+                response = self.caller.call('chat', policy, attempt)
             return response.text
         except Exception as e:
             self.logger.error(f'Error in chat: {str(e)}')
             raise e
 
-    def get_response(self, prompt, output_class=None):
-        """Get response from Gemini model"""
+    def get_response(self, prompt, output_class=None, method='default'):
+        """Get response from Gemini model.
+
+        The call follows the retry/hedging policy configured for ``method``.
+        Concurrent calls with the same (model, prompt, output class) are
+        coalesced: one upstream request is made and every caller gets its
+        text, or its exception.
+        """
         self.logger.debug(f'Getting response for prompt: {prompt[:100]}...')
         self.logger.debug(f'Output class: {output_class.__name__ if output_class else "None"}')
-        
+
+        text, shared = self.in_flight.do(
+            (Config.GEMINI_MODEL, prompt, output_class),
+            self._generate, prompt, output_class, method
+        )
+        if shared:
+            self.logger.debug('Joined an identical in-flight request', extra={'schema': _schema_name(output_class)})
+        return text
+
+    def _generate(self, prompt, output_class, method):
+        """Make the generate_content request, with retries and hedging"""
+        tokens = _estimate_tokens(prompt)
+
+        def attempt(deadline, hedge):
+            with self.limiter.permit(tokens, _is_overload, deadline, block=not hedge) as permit:
+                metrics.increment('ai.upstream_calls', schema=_schema_name(output_class))
+                if output_class:
+                    response = self.client.models.generate_content(
+                        model = Config.GEMINI_MODEL,
+                        contents=prompt,
+                        config={
+                            "response_mime_type": "application/json",
+                            "response_schema": list[output_class],
+                            "http_options": _http_options(deadline),
+                        },
+                    )
+                else:
+                    response = self.client.models.generate_content(
+                         model = Config.GEMINI_MODEL,
+                        contents=prompt,
+                        config={"http_options": _http_options(deadline)}
+                    )
+                permit.tokens_used = _tokens_used(response)
+            return response
+
         try:
-            if output_class:
-                response = self.client.models.generate_content(
-                    model = Config.GEMINI_MODEL,
-                    contents=prompt,
-                    config={
-                        "response_mime_type": "application/json",
-                        "response_schema": list[output_class],
-                    },
-                )
-            else:
-                response = self.client.models.generate_content(
-                     model = Config.GEMINI_MODEL,
-                    contents=prompt
-                )
+            policy = CallPolicy.for_method(Config.GEMINI_CALL_POLICIES, method)
+            with self.breaker.guard():
+                response = self.caller.call(method, policy, attempt)
             self.logger.debug(f'Response received: {response.text[:100]}...')
             return response.text
+        except ServiceOverloaded:
+            raise
         except Exception as e:
+            metrics.increment('ai.upstream_errors', schema=_schema_name(output_class))
             self.logger.error(f'Error getting response: {str(e)}')
             raise
 
+    def parse_response(self, text, output_class):
+        """Parse and validate a JSON response against list[output_class].
+
+        The text is decoded exactly once; the result is a list of plain dicts
+        ready to be stored in Firestore and returned to clients.
+        """
+        adapter = _list_adapters.get(output_class)
+        if adapter is None:
+            adapter = _list_adapters[output_class] = TypeAdapter(list[output_class])
+        try:
+            items = adapter.validate_json(text)
+        except ValidationError as e:
+            self.logger.error(f'Invalid {output_class.__name__} response: {str(e)}')
+            raise ValueError(f'Model returned an invalid {output_class.__name__} response') from e
+        return [item.model_dump() for item in items]
+
     @log_function_call(logger)
     def generate_diet_plan(self, user_data, preferences):
         """Generate a diet plan based on user data and preferences"""
@@ -84,13 +222,32 @@ class AIService:
         Return a list of DietPlan objects with mealtime, foodItem, calories, protein, carbs, and fat."""
         
         try:
-            response = self.get_response(prompt, DietPlan)
+            response = self.parse_response(self.get_response(prompt, DietPlan, 'generate_diet_plan'), DietPlan)
             self.logger.debug(f'Diet plan generated successfully')
             return response
         except Exception as e:
             self.logger.error(f'Error generating diet plan: {str(e)}')
             raise
 
+    @log_function_call(logger)
+    def generate_cohort_diet_plan(self, cohort, variant=1):
+        """Generate variant number ``variant`` of a plan library cohort's diet plan
+        (see services/plan_library.py)"""
+        self.logger.debug(f'Generating diet plan variant {variant} for cohort: {cohort}')
+
+        prompt = f"""Create a diabetes-friendly diet plan with the preferences: {cohort['preferences'] or 'no specific preferences'} and vegan: {cohort['vegan']} 
+        for an adult with a BMI of {cohort['bmi_band']} and goal: {cohort['goal']}. 
+        TDEE: {cohort['tdee']} cal. This is menu {variant} of several for this group, so vary the dishes.
+        Return a list of DietPlan objects with mealtime, foodItem, calories, protein, carbs, and fat."""
+
+        try:
+            response = self.parse_response(self.get_response(prompt, DietPlan, 'generate_cohort_diet_plan'), DietPlan)
+            self.logger.debug(f'Cohort diet plan generated successfully')
+            return response
+        except Exception as e:
+            self.logger.error(f'Error generating cohort diet plan: {str(e)}')
+            raise
+
     @log_function_call(logger)
     def generate_health_advice(self, user_data, metrics):
         """Generate health advice based on user data and metrics"""
@@ -109,7 +266,7 @@ class AIService:
         """
         
         try:
-            response = self.get_response(prompt, HealthAdvice)
+            response = self.parse_response(self.get_response(prompt, HealthAdvice, 'generate_health_advice'), HealthAdvice)
             self.logger.debug(f'Health advice generated successfully')
             return response
         except Exception as e:
@@ -125,7 +282,7 @@ class AIService:
         Return a Recipe object with recipeName, calories, protein, fats, carbs, and ingredients."""
         
         try:
-            response = self.get_response(prompt, Recipe)
+            response = self.parse_response(self.get_response(prompt, Recipe, 'generate_recipe'), Recipe)
             self.logger.debug(f'Recipe generated successfully')
             return response
         except Exception as e:
@@ -140,9 +297,41 @@ class AIService:
         Return a list of MacroBreakdown objects with nutrient and amount."""
         
         try:
-            response = self.get_response(prompt, MacroBreakdown)
+            response = self.parse_response(self.get_response(prompt, MacroBreakdown, 'get_macro_breakdown'), MacroBreakdown)
             self.logger.debug(f'Macro breakdown generated successfully')
             return response
         except Exception as e:
             self.logger.error(f'Error getting macro breakdown: {str(e)}')
-            raise 
\ No newline at end of file
+            raise 
+
+    def get_macro_breakdowns(self, food_items):
+        """Get macro breakdowns for several food items in one request.
+
+        Returns {food_item: [MacroBreakdown dicts]}; items the model left out
+        are missing from the result.
+        """
+        self.logger.debug(f'Getting macro breakdowns for {len(food_items)} foods')
+
+        prompt = f"""Return the macro breakdown of each of these foods: {json.dumps(food_items)}.
+        Return a list of FoodMacroBreakdown objects, one per food in the same order, with food_item
+        (exactly as given) and macros (a list of MacroBreakdown objects with nutrient and amount)."""
+
+        try:
+            response = self.parse_response(
+                self.get_response(prompt, FoodMacroBreakdown, 'get_macro_breakdowns'), FoodMacroBreakdown
+            )
+        except Exception as e:
+            self.logger.error(f'Error getting macro breakdowns: {str(e)}')
+            raise
+
+        # Match by name, then by position for names the model changed
+        by_name = {item['food_item'].strip().lower(): item['macros'] for item in response}
+        results = {}
+        for index, food_item in enumerate(food_items):
+            macros = by_name.get(food_item.strip().lower())
+            if macros is None and len(response) == len(food_items):
+                macros = response[index]['macros']
+            if macros is not None:
+                results[food_item] = macros
+        self.logger.debug(f'Macro breakdowns generated for {len(results)} of {len(food_items)} foods')
+        return results
@@ -0,0 +1,81 @@
+import re
+from config import Config
+from utils.logger import setup_logger
+from utils.metrics import metrics
+from utils.minhash import MinHasher, MinHashLSH, shingles
+
+# Set up logger
+logger = setup_logger('chat_answer_cache')
+
+# Words that make a message depend on the conversation so far
+CONTEXT_WORDS = frozenset({
+    'it', 'its', 'that', 'this', 'these', 'those', 'they', 'them', 'their', 'he', 'she',
+    'above', 'previous', 'earlier', 'again', 'also', 'more', 'else', 'instead', 'same',
+    'said', 'mentioned', 'continue', 'why', 'yes', 'no', 'ok', 'okay', 'thanks',
+})
+
+# Words that make a message about the user; their answers are not shared
+PERSONAL_WORDS = frozenset({'i', 'im', 'ive', 'id', 'me', 'my', 'mine', 'myself', 'we', 'our', 'us'})
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def normalize_question(message):
+    """Lower-cased words of ``message`` without punctuation"""
+    return ' '.join(_WORD.findall(str(message).lower().replace("'", '')))
+
+
+class ChatAnswerCache:
+    """Shared answers to generic chat questions, found by near-duplicate match.
+
+    Only answers to a first message (empty history) are stored, and only
+    for questions that are neither personal nor refer to earlier turns. A
+    message is answered from the cache when it is such a question too, also
+    starts its conversation, and its MinHash signature is at least
+    ``CHAT_ANSWER_CACHE_THRESHOLD`` similar to a stored one.
+    """
+
+    def __init__(self):
+        self.hasher = MinHasher(Config.CHAT_ANSWER_CACHE_PERMUTATIONS)
+        self.index = MinHashLSH(
+            Config.CHAT_ANSWER_CACHE_PERMUTATIONS,
+            Config.CHAT_ANSWER_CACHE_BANDS,
+            Config.CHAT_ANSWER_CACHE_THRESHOLD,
+            Config.CHAT_ANSWER_CACHE_SIZE,
+            Config.CHAT_ANSWER_CACHE_TTL,
+        )
+        metrics.register_gauge('chat_answer_cache.size', lambda: len(self.index))
+
+    def generic(self, question):
+        words = question.split()
+        return bool(words) and not any(word in CONTEXT_WORDS or word in PERSONAL_WORDS for word in words)
+
+    def get(self, message, history):
+        """Cached answer to a near-duplicate of a first ``message``, or None"""
+        question = normalize_question(message)
+        # Inside a conversation the answer may depend on earlier turns
+        if history or not self.generic(question):
+            metrics.increment('chat_answer_cache.lookups', result='ineligible')
+            return None
+        answer = self.index.get(question)
+        if answer is not None:
+            metrics.increment('chat_answer_cache.lookups', result='hit')
+            return answer
+        match = self.index.query(self.hasher.signature(shingles(question)))
+        if match is None:
+            metrics.increment('chat_answer_cache.lookups', result='miss')
+            return None
+        metrics.increment('chat_answer_cache.lookups', result='hit')
+        logger.debug('Chat answer served from cache', extra={
+            'question': question,
+            'matched': match[0],
+            'similarity': round(match[2], 3)
+        })
+        return match[1]
+
+    def put(self, message, history, answer):
+        """Store the answer to a generic first message"""
+        question = normalize_question(message)
+        if history or not answer or not self.generic(question):
+            return
+        self.index.insert(question, self.hasher.signature(shingles(question)), answer)
@@ -0,0 +1,58 @@
+import requests
+from config import Config
+from services.ai_service import AIService
+from services.chat_answer_cache import ChatAnswerCache
+from services.food_recognizer import FoodRecognizer
+from services.generation_service import GenerationService
+from services.health_service import HealthService
+from services.history_service import HistoryService
+from services.job_service import JobService
+from services.macro_service import MacroService
+from services.plan_library import PlanLibrary
+from services.user_service import UserService
+from utils.idempotency import IdempotencyStore
+from utils.lifecycle import register_shutdown_hook
+from utils.logger import setup_logger
+from utils.rate_limit import RateLimiter, load_backend
+
+# Set up logger
+logger = setup_logger('container')
+
+
+class ServiceContainer:
+    """The services of one process, shared by all blueprints.
+
+    Created once in ``create_app`` (after forking, under gunicorn) and handed
+    to every ``init_*_routes``, so there is one Gemini client, one HTTP
+    connection pool and one set of caches and limiters per process rather
+    than one per blueprint. The async routes get the same container, so the
+    Flask and ASGI routes of a process share the rate limits, idempotency
+    keys and chat answers as well.
+    """
+
+    def __init__(self, db, diabetes_model):
+        self.db = db
+        self.diabetes_model = diabetes_model
+        self.ai_service = AIService()
+        self.user_service = UserService(db)
+        self.health_service = HealthService(db, diabetes_model)
+        self.history_service = HistoryService(db)
+        self.recognizer = FoodRecognizer()
+        self.plan_library = PlanLibrary(db, self.ai_service)
+        self.macro_service = MacroService(self.ai_service)
+        # None unless enabled
+        self.chat_answer_cache = ChatAnswerCache() if Config.CHAT_ANSWER_CACHE_ENABLED else None
+        self.generation_service = GenerationService(
+            self.user_service, self.health_service, self.history_service, self.ai_service, self.plan_library,
+            self.chat_answer_cache
+        )
+        self.job_service = JobService(db)
+
+        # Used by the rate_limited and idempotent route decorators
+        self.rate_limiter = RateLimiter(Config.RATE_LIMITS, load_backend(Config.RATE_LIMIT_BACKEND))
+        self.idempotency_store = IdempotencyStore(Config.IDEMPOTENCY_STORE_SIZE, Config.IDEMPOTENCY_TTL)
+
+        # Pooled connections for the Firebase Auth REST API
+        self.http = requests.Session()
+        register_shutdown_hook(self.http.close, 'http_session')
+        logger.info('Services created')
@@ -0,0 +1,37 @@
+from clarifai.client.model import Model
+from config import Config
+from utils.circuit_breaker import CircuitBreaker
+from utils.logger import setup_logger, log_function_call
+
+# Set up logger
+logger = setup_logger('food_recognizer')
+
+class FoodRecognizer:
+    """Food recognition with the Clarifai food-item model"""
+
+    def __init__(self):
+        self.logger = setup_logger('FoodRecognizer')
+        self.breaker = CircuitBreaker(
+            'clarifai',
+            failure_threshold=Config.CLARIFAI_BREAKER_FAILURES,
+            reset_timeout=Config.CLARIFAI_BREAKER_RESET_TIMEOUT,
+        )
+
+    @log_function_call(logger)
+    def recognize(self, file_path):
+        """Recognize the food in an image file.
+
+        Returns (food_name, confidence) for the top concept, or None when
+        nothing was detected. Raises CircuitOpen while Clarifai is failing.
+        """
+        with self.breaker.guard():
+            self.logger.debug('Initializing Clarifai model')
+            model = Model(url=Config.CLARIFAI_MODEL_URL,
+                        pat=Config.CLARIFAI_PAT)
+            self.logger.debug('Running food recognition')
+            prediction = model.predict_by_filepath(file_path, input_type="image")
+
+        if not prediction.outputs:
+            return None
+        concept = prediction.outputs[0].data.concepts[0]
+        return concept.name, concept.value
@@ -0,0 +1,140 @@
+from utils.circuit_breaker import CircuitOpen
+from utils.logger import setup_logger, log_function_call
+
+# Set up logger
+logger = setup_logger('generation_service')
+
+
+def save_now(description, write, *args):
+    """Default ``save``: run the write before returning"""
+    write(*args)
+
+
+class GenerationService:
+    """Diet plans, health advice and chat answers for one user.
+
+    The work behind POST /plan, /advice and /chat, shared by the Flask
+    routes, the async routes and background jobs. Each ``make_*`` returns
+    (body, status) with model output as stored, loads the user's data unless
+    the caller already has it, and hands its history write to
+    ``save(description, write, *args)``; the async routes pass one that
+    finishes the write after the response is sent. Chat answers to generic
+    first messages come from ``chat_answer_cache`` when one is given.
+    """
+
+    def __init__(self, user_service, health_service, history_service, ai_service, plan_library,
+                 chat_answer_cache=None):
+        self.user_service = user_service
+        self.health_service = health_service
+        self.history_service = history_service
+        self.ai_service = ai_service
+        self.plan_library = plan_library
+        self.chat_answer_cache = chat_answer_cache
+
+    def _stale(self, record_type, user_id):
+        """The user's latest ``record_type``, served while Gemini is failing, or None"""
+        latest = self.history_service.latest(record_type, user_id)
+        if latest is None:
+            return None
+        logger.warning(f'Serving latest {record_type} while Gemini is unavailable', extra={'user_id': user_id})
+        return {**latest, "stale": True}
+
+    @log_function_call(logger)
+    def make_plan(self, user_id, preferences, user_data=None, save=save_now):
+        """Generate and store a diet plan"""
+        if user_data is None:
+            user_data = self.user_service.get_user(user_id)
+
+        # Calculate metrics
+        bmi, _ = self.health_service.calculate_bmi(user_data)
+        bmr, tdee = self.health_service.calculate_energy(user_data)
+
+        # Add metrics to user data
+        user_data = {
+            **user_data,
+            'bmi': bmi,
+            'bmr': bmr,
+            'tdee': tdee
+        }
+
+        # Get a diet plan for the user's cohort
+        try:
+            plan, _ = self.plan_library.get_plan(user_data, preferences)
+        except CircuitOpen:
+            stale = self._stale('plan', user_id)
+            if stale is None:
+                raise
+            return stale, 200
+
+        # Save to user's plan history; the id is generated locally, so the
+        # write does not have to finish before the response
+        plan_id = self.history_service.new_record_id('plan')
+        save('save_plan', self.history_service.add, 'plan', user_id, {'plan': plan}, plan_id)
+
+        return {
+            "plan": plan,
+            "plan_id": plan_id
+        }, 200
+
+    @log_function_call(logger)
+    def make_advice(self, user_id, user_data=None, save=save_now):
+        """Generate and store health advice"""
+        if user_data is None:
+            user_data = self.user_service.get_user(user_id)
+
+        # Calculate metrics
+        bmi, bmi_class = self.health_service.calculate_bmi(user_data)
+        bmr, tdee = self.health_service.calculate_energy(user_data)
+
+        metrics = {
+            'bmi': bmi,
+            'bmi_class': bmi_class,
+            'bmr': bmr,
+            'tdee': tdee
+        }
+
+        # Generate health advice
+        try:
+            advice = self.ai_service.generate_health_advice(user_data, metrics)
+        except CircuitOpen:
+            stale = self._stale('advice', user_id)
+            if stale is None:
+                raise
+            return stale, 200
+
+        # Save advice
+        save('save_advice', self.history_service.add, 'advice', user_id, {
+            'advice': advice,
+            'metrics': metrics
+        })
+
+        return {
+            "advice": advice,
+            "metrics": metrics
+        }, 200
+
+    @log_function_call(logger)
+    def make_chat(self, user_id, new_message, history=None, save=save_now):
+        """Answer a chat message and store the exchange"""
+        if history is None:
+            history = self.user_service.get_chat_history(user_id)
+
+        # Get chat response, from the shared answers if enabled
+        cache = self.chat_answer_cache
+        response = cache.get(new_message, history) if cache else None
+        if response is None:
+            response = self.ai_service.chat(new_message=new_message, history=history)
+            if cache:
+                cache.put(new_message, history, response)
+
+        # Save chat history using the service
+        save('save_chat_message', self.user_service.save_chat_message, user_id, new_message, response)
+
+        logger.info('Chat processed successfully', extra={
+            'user_id': user_id,
+            'response_length': len(response)
+        })
+        return {
+            "response": response,
+            "user_id": user_id
+        }, 200
@@ -0,0 +1,228 @@
+import base64
+import json
+from datetime import datetime
+from firebase_admin import firestore
+from utils.logger import setup_logger, log_function_call
+
+# Set up logger
+logger = setup_logger('history_service')
+
+# Per-user record types: Firestore collection, timestamp field and the fields
+# returned to clients (same shape as the GET /api/health/<type> responses).
+# ``llm_fields`` hold structured model output (lists of maps); records written
+# before it was stored natively hold the raw JSON string instead.
+RECORD_TYPES = {
+    'plan': {
+        'collection': 'plans',
+        'timestamp_field': 'created_at',
+        'fields': ('plan',),
+        'llm_fields': ('plan',),
+        'id_field': 'plan_id',
+    },
+    'advice': {
+        'collection': 'advice',
+        'timestamp_field': 'timestamp',
+        'fields': ('advice', 'metrics'),
+        'llm_fields': ('advice',),
+    },
+    'diabetes_check': {
+        'collection': 'diabetes_checks',
+        'timestamp_field': 'timestamp',
+        'fields': ('prediction', 'prediction_code'),
+    },
+}
+
+# All per-user history collections that can be listed page by page, keyed by
+# collection name (the URL segment of /api/history/<collection>). ``fields``
+# are the projectable fields; the timestamp and document id are always returned.
+HISTORY_COLLECTIONS = {
+    **{spec['collection']: spec for spec in RECORD_TYPES.values()},
+    'recipe_queries': {
+        'collection': 'recipe_queries',
+        'timestamp_field': 'timestamp',
+        'fields': ('food_name', 'recipe'),
+        'llm_fields': ('recipe',),
+    },
+    'diet_queries': {
+        'collection': 'diet_queries',
+        'timestamp_field': 'timestamp',
+        'fields': ('food_item', 'response'),
+        'llm_fields': ('response',),
+    },
+}
+
+# One document per (record type, user) holding a copy of the newest record,
+# written in the same batch as the record itself
+LATEST_COLLECTION = 'latest_records'
+
+
+def decode_llm_field(value):
+    """Structured value of an LLM output field, decoding legacy JSON strings"""
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+    return value
+
+
+class HistoryService:
+    def __init__(self, db):
+        self.logger = setup_logger('HistoryService')
+        self.db = db
+
+    def pointer_ref(self, record_type, user_id):
+        """Reference to the latest-record document for ``record_type``"""
+        return self.db.collection(LATEST_COLLECTION).document(f'{record_type}_{user_id}')
+
+    def new_record_id(self, record_type):
+        """Generate a document id for a record before it is written"""
+        return self.db.collection(RECORD_TYPES[record_type]['collection']).document().id
+
+    def format_record(self, record_type, record_id, data):
+        """Build the client-facing dict for a stored record"""
+        spec = RECORD_TYPES[record_type]
+        record = {field: data.get(field) for field in spec['fields']}
+        for field in spec.get('llm_fields', ()):
+            record[field] = decode_llm_field(record[field])
+        if spec.get('id_field'):
+            record[spec['id_field']] = record_id
+        record[spec['timestamp_field']] = data.get(spec['timestamp_field'])
+        return record
+
+    def pointer_data(self, record_type, record_id, data):
+        """Latest-record document contents for the record ``record_id``"""
+        return {**data, 'record_type': record_type, 'record_id': record_id}
+
+    @log_function_call(logger)
+    def add(self, record_type, user_id, data, record_id=None):
+        """Store a new record and move the user's latest pointer to it.
+
+        Both writes go in one batch, so the pointer never refers to a record
+        that was not saved. Returns the record id.
+        """
+        spec = RECORD_TYPES[record_type]
+        record_ref = self.db.collection(spec['collection']).document(record_id)
+        record = {
+            'user_id': user_id,
+            **data,
+            spec['timestamp_field']: firestore.SERVER_TIMESTAMP
+        }
+
+        batch = self.db.batch()
+        batch.set(record_ref, record)
+        batch.set(self.pointer_ref(record_type, user_id),
+                  self.pointer_data(record_type, record_ref.id, record))
+        batch.commit()
+        return record_ref.id
+
+    @log_function_call(logger)
+    def latest(self, record_type, user_id):
+        """Get the user's most recent record of ``record_type``, or None"""
+        snapshot = self.pointer_ref(record_type, user_id).get()
+        if not snapshot.exists:
+            return None
+        data = snapshot.to_dict()
+        return self.format_record(record_type, data['record_id'], data)
+
+    @log_function_call(logger)
+    def latest_many(self, record_types, user_id):
+        """Latest record of each type in one multi-document read.
+
+        Returns {record_type: record or None}.
+        """
+        references = [self.pointer_ref(record_type, user_id) for record_type in record_types]
+        results = dict.fromkeys(record_types)
+        for snapshot in self.db.get_all(references):
+            if snapshot.exists:
+                data = snapshot.to_dict()
+                results[data['record_type']] = self.format_record(data['record_type'], data['record_id'], data)
+        return results
+
+    @log_function_call(logger)
+    def find_any(self, collection, field, value):
+        """Newest stored record of ``collection`` whose ``field`` equals ``value``.
+
+        Not limited to one user: used to serve an earlier answer for the same
+        item (recipe, macro breakdown) while the model is unavailable. Needs a
+        composite index on (``field``, timestamp descending).
+        Returns the record in the list_page item shape, or None.
+        """
+        spec = HISTORY_COLLECTIONS[collection]
+        query = (
+            self.db.collection(collection)
+            .where(field, '==', value)
+            .order_by(spec['timestamp_field'], direction=firestore.Query.DESCENDING)
+            .limit(1)
+        )
+        docs = list(query.stream())
+        if not docs:
+            return None
+        data = docs[0].to_dict()
+        item = {
+            'id': docs[0].id,
+            **{name: data.get(name) for name in spec['fields']},
+            spec['timestamp_field']: data.get(spec['timestamp_field'])
+        }
+        for name in spec.get('llm_fields', ()):
+            item[name] = decode_llm_field(item[name])
+        return item
+
+    def encode_cursor(self, timestamp, record_id):
+        """Opaque page cursor for the record after which the next page starts"""
+        payload = json.dumps({'t': timestamp.isoformat(), 'id': record_id})
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """Inverse of ``encode_cursor``; raises ValueError for a bad cursor"""
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+            return datetime.fromisoformat(payload['t']), payload['id']
+        except (TypeError, KeyError, ValueError) as e:
+            raise ValueError('Invalid cursor') from e
+
+    @log_function_call(logger)
+    def list_page(self, collection, user_id, limit, cursor=None, fields=None):
+        """One page of a user's history, newest first.
+
+        Ordered by (timestamp, document id) descending in the query itself,
+        which needs the composite indexes in frontend/firestore.indexes.json. Only
+        ``fields`` (default: all of the collection's fields) are read.
+
+        Returns (items, next_cursor); next_cursor is None on the last page.
+        """
+        spec = HISTORY_COLLECTIONS[collection]
+        timestamp_field = spec['timestamp_field']
+        fields = list(fields or spec['fields'])
+
+        query = (
+            self.db.collection(collection)
+            .where('user_id', '==', user_id)
+            .order_by(timestamp_field, direction=firestore.Query.DESCENDING)
+            .order_by('__name__', direction=firestore.Query.DESCENDING)
+            .select(fields + [timestamp_field])
+        )
+        if cursor:
+            timestamp, record_id = self.decode_cursor(cursor)
+            query = query.start_after({timestamp_field: timestamp, '__name__': record_id})
+
+        # One extra document tells whether there is a next page
+        docs = list(query.limit(limit + 1).stream())
+        llm_fields = [field for field in spec.get('llm_fields', ()) if field in fields]
+        items = []
+        for doc in docs[:limit]:
+            data = doc.to_dict()
+            item = {
+                'id': doc.id,
+                **{field: data.get(field) for field in fields},
+                timestamp_field: data.get(timestamp_field)
+            }
+            for field in llm_fields:
+                item[field] = decode_llm_field(item[field])
+            items.append(item)
+
+        next_cursor = None
+        if len(docs) > limit:
+            last = docs[limit - 1]
+            next_cursor = self.encode_cursor(last.get(timestamp_field), last.id)
+        return items, next_cursor
@@ -0,0 +1,360 @@
+import os
+import queue
+import threading
+import time
+from firebase_admin import firestore
+from google.api_core import exceptions as google_exceptions
+from config import Config
+from utils.limiter import ServiceOverloaded
+from utils.logger import setup_logger, log_function_call
+from utils.metrics import metrics
+
+# Set up logger
+logger = setup_logger('job_service')
+
+JOBS_COLLECTION = 'jobs'
+# One document per claim of a job ('<job_id>-<attempt>'); creating it is
+# what gives a process the right to run that attempt
+CLAIMS_COLLECTION = 'job_claims'
+
+PENDING_STATES = ('queued', 'running')
+
+
+class JobService:
+    """Runs long generations as background jobs persisted in Firestore.
+
+    ``submit`` stores a queued job and hands it to a bounded pool of
+    ``workers`` threads; when ``queue_size`` jobs are already waiting it
+    raises ServiceOverloaded instead. Each job kind has a handler
+    ``handler(user_id, params) -> (body, http_status)`` registered by the
+    blueprint that serves the synchronous version of the endpoint.
+
+    A job holds a lease of ``JOB_LEASE_SECONDS`` that the process holding
+    it renews every third of that while the job waits in its queue or runs,
+    so a long wait or a slow model call does not let it lapse. Jobs whose
+    lease ran out (their process stopped) are picked up again by any
+    process, at most ``JOB_MAX_ATTEMPTS`` times; this needs a composite
+    index on jobs (status, lease_expires). Every attempt is claimed by
+    creating a claim document, so two processes never run the same
+    attempt.
+
+    A handler that raises ServiceOverloaded (shed, out of time, circuit
+    open) is retried the same way: the job goes back to queued with a lease
+    that ends after an exponential backoff from ``JOB_RETRY_DELAY``. Only
+    the last attempt records the failure. ``on_finish(params)`` runs once
+    a job is done or has failed for good, e.g. to remove its upload.
+    """
+
+    def __init__(self, db, workers=None, queue_size=None):
+        self.db = db
+        self.workers = workers or Config.JOB_WORKERS
+        self._queue = queue.Queue(maxsize=queue_size or Config.JOB_QUEUE_SIZE)
+        self._handlers = {}
+        self._threads = []
+        self._stopping = threading.Event()
+        # job id -> attempt of the jobs queued or running in this process
+        self._held = {}
+        self._held_lock = threading.Lock()
+        metrics.register_gauge('jobs.queued', self._queue.qsize)
+
+    def register(self, kind, handler, llm_fields=(), on_finish=None):
+        """Run jobs of ``kind`` with ``handler``; ``llm_fields`` of the
+        result hold model output (see utils/encoding.present_llm_fields)"""
+        self._handlers[kind] = (handler, tuple(llm_fields), on_finish)
+
+    def llm_fields(self, kind):
+        return self._handlers[kind][1] if kind in self._handlers else ()
+
+    def start(self):
+        """Start the worker threads and the recovery of abandoned jobs"""
+        if self._threads:
+            return
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f'job-worker-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        for target, name in ((self._recover_periodically, 'job-recovery'), (self._renew_periodically, 'job-leases')):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info('Job workers started', extra={'workers': self.workers})
+
+    def shutdown(self):
+        """Stop taking jobs; queued jobs are recovered after their lease"""
+        self._stopping.set()
+        for _ in range(self.workers):
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                break
+
+    def _ref(self, job_id):
+        return self.db.collection(JOBS_COLLECTION).document(job_id)
+
+    def _claim_ref(self, job_id, attempt):
+        return self.db.collection(CLAIMS_COLLECTION).document(f'{job_id}-{attempt}')
+
+    def _enqueue(self, job_id, attempt):
+        """Hand a job to the workers and keep renewing its lease; raises queue.Full"""
+        with self._held_lock:
+            self._held[job_id] = attempt
+        try:
+            self._queue.put_nowait((job_id, attempt))
+        except queue.Full:
+            self._release(job_id, attempt)
+            raise
+
+    def _release(self, job_id, attempt):
+        with self._held_lock:
+            if self._held.get(job_id) == attempt:
+                del self._held[job_id]
+
+    @log_function_call(logger)
+    def submit(self, user_id, kind, params):
+        """Queue a job and return its id"""
+        if kind not in self._handlers:
+            raise ValueError(f'Unknown job kind: {kind}')
+        if self._queue.full():
+            metrics.increment('jobs.rejected', kind=kind)
+            raise ServiceOverloaded('Too many background jobs, try again later', Config.JOB_POLL_INTERVAL)
+
+        job_ref = self.db.collection(JOBS_COLLECTION).document()
+        batch = self.db.batch()
+        batch.set(job_ref, {
+            'user_id': user_id,
+            'kind': kind,
+            'params': params,
+            'status': 'queued',
+            'attempt': 1,
+            'lease_expires': time.time() + Config.JOB_LEASE_SECONDS,
+            'created_at': firestore.SERVER_TIMESTAMP,
+            'updated_at': firestore.SERVER_TIMESTAMP
+        })
+        batch.create(self._claim_ref(job_ref.id, 1), {'job_id': job_ref.id, 'claimed_at': firestore.SERVER_TIMESTAMP})
+        batch.commit()
+
+        try:
+            self._enqueue(job_ref.id, 1)
+        except queue.Full:
+            # Filled up since the check; the job is recovered after its lease
+            logger.warning('Job queue full, job left for recovery', extra={'job_id': job_ref.id})
+        metrics.increment('jobs.submitted', kind=kind)
+        return job_ref.id
+
+    @log_function_call(logger)
+    def get(self, job_id, user_id):
+        """The job ``job_id`` of ``user_id`` as a dict, or None"""
+        snapshot = self._ref(job_id).get()
+        if not snapshot.exists:
+            return None
+        data = snapshot.to_dict()
+        if data.get('user_id') != user_id:
+            return None
+        job = {
+            'job_id': job_id,
+            'kind': data.get('kind'),
+            'status': data.get('status'),
+            'created_at': data.get('created_at'),
+            'updated_at': data.get('updated_at')
+        }
+        if data.get('status') == 'done':
+            job['result'] = data.get('result')
+        elif data.get('status') == 'failed':
+            job['error'] = data.get('error')
+            job['error_status'] = data.get('error_status')
+        return job
+
+    def _work(self):
+        while not self._stopping.is_set():
+            item = self._queue.get()
+            if item is None:
+                return
+            try:
+                self._run(*item)
+            except Exception as e:
+                logger.error('Job worker error', extra={'job_id': item[0], 'error': str(e)})
+            finally:
+                self._release(*item)
+
+    def _run(self, job_id, attempt):
+        job_ref = self._ref(job_id)
+        data = job_ref.get().to_dict()
+        if not data or data.get('status') not in PENDING_STATES or data.get('attempt') != attempt:
+            # Finished or taken over by another process meanwhile
+            return
+
+        kind = data['kind']
+        job_ref.update({
+            'status': 'running',
+            'lease_expires': time.time() + Config.JOB_LEASE_SECONDS,
+            'updated_at': firestore.SERVER_TIMESTAMP
+        })
+        handler = self._handlers[kind][0]
+        start = time.perf_counter()
+        try:
+            body, status = handler(data['user_id'], data.get('params') or {})
+        except ServiceOverloaded as e:
+            if attempt < Config.JOB_MAX_ATTEMPTS:
+                self._retry_later(job_id, attempt, kind, e)
+                return
+            body, status = {'error': str(e)}, e.status
+        except Exception as e:
+            body, status = {'error': str(e)}, getattr(e, 'status', 500)
+
+        if status < 400:
+            update = {'status': 'done', 'result': body}
+        else:
+            update = {'status': 'failed', 'error': body.get('error'), 'error_status': status}
+        job_ref.update({**update, 'updated_at': firestore.SERVER_TIMESTAMP})
+        metrics.increment('jobs.finished', kind=kind, status=update['status'])
+        logger.info('Job finished', extra={
+            'job_id': job_id,
+            'kind': kind,
+            'status': update['status'],
+            'duration': round(time.perf_counter() - start, 3)
+        })
+        self._finish(kind, data.get('params') or {})
+        self._notify(data['user_id'], job_id, kind, update['status'])
+
+    def _retry_later(self, job_id, attempt, kind, error):
+        """Leave the job for ``recover`` to run again after a backoff"""
+        delay = max(error.retry_after, Config.JOB_RETRY_DELAY * 2 ** (attempt - 1))
+        # Stop renewing the lease first, so it can run out
+        self._release(job_id, attempt)
+        self._ref(job_id).update({
+            'status': 'queued',
+            'lease_expires': time.time() + delay,
+            'updated_at': firestore.SERVER_TIMESTAMP
+        })
+        metrics.increment('jobs.retried', kind=kind)
+        logger.warning('Job overloaded, retrying later', extra={
+            'job_id': job_id,
+            'kind': kind,
+            'attempt': attempt,
+            'delay': delay,
+            'error': str(error)
+        })
+
+    def _finish(self, kind, params):
+        on_finish = self._handlers[kind][2] if kind in self._handlers else None
+        if on_finish is None:
+            return
+        try:
+            on_finish(params)
+        except Exception as e:
+            logger.warning('Job cleanup failed', extra={'kind': kind, 'error': str(e)})
+
+    def _notify(self, user_id, job_id, kind, status):
+        """Push the job's outcome to the user's device, if enabled"""
+        if not Config.JOB_PUSH_ENABLED:
+            return
+        try:
+            from firebase_admin import messaging
+
+            user = self.db.collection('users').document(user_id).get().to_dict() or {}
+            token = user.get('fcm_token')
+            if not token:
+                return
+            messaging.send(messaging.Message(
+                token=token,
+                data={'job_id': job_id, 'kind': kind, 'status': status}
+            ))
+            metrics.increment('jobs.pushed', kind=kind)
+        except Exception as e:
+            logger.warning('Job push notification failed', extra={'job_id': job_id, 'error': str(e)})
+
+    @log_function_call(logger)
+    def recover(self):
+        """Queue pending jobs whose lease has expired; returns how many"""
+        capacity = self._queue.maxsize - self._queue.qsize()
+        if capacity <= 0:
+            return 0
+        now = time.time()
+        expired = (
+            self.db.collection(JOBS_COLLECTION)
+            .where('status', 'in', list(PENDING_STATES))
+            .where('lease_expires', '<', now)
+            .limit(capacity)
+            .stream()
+        )
+        recovered = 0
+        for snapshot in expired:
+            data = snapshot.to_dict()
+            attempt = data.get('attempt', 1) + 1
+            if attempt > Config.JOB_MAX_ATTEMPTS:
+                snapshot.reference.update({
+                    'status': 'failed',
+                    'error': 'Job did not finish',
+                    'error_status': 500,
+                    'updated_at': firestore.SERVER_TIMESTAMP
+                })
+                self._finish(data.get('kind'), data.get('params') or {})
+                continue
+            try:
+                self._claim_ref(snapshot.id, attempt).create({
+                    'job_id': snapshot.id,
+                    'claimed_at': firestore.SERVER_TIMESTAMP
+                })
+            except google_exceptions.Conflict:
+                continue
+            snapshot.reference.update({
+                'status': 'queued',
+                'attempt': attempt,
+                'lease_expires': now + Config.JOB_LEASE_SECONDS,
+                'updated_at': firestore.SERVER_TIMESTAMP
+            })
+            try:
+                self._enqueue(snapshot.id, attempt)
+            except queue.Full:
+                break
+            recovered += 1
+        if recovered:
+            metrics.increment('jobs.recovered', recovered)
+            logger.info('Recovered abandoned jobs', extra={'jobs': recovered})
+        return recovered
+
+    def renew_leases(self):
+        """Extend the lease of every job this process holds; returns how many"""
+        with self._held_lock:
+            held = list(self._held)
+        if not held:
+            return 0
+        lease_expires = time.time() + Config.JOB_LEASE_SECONDS
+        batch = self.db.batch()
+        for job_id in held:
+            batch.update(self._ref(job_id), {'lease_expires': lease_expires})
+        batch.commit()
+        return len(held)
+
+    def _renew_periodically(self):
+        while not self._stopping.wait(Config.JOB_LEASE_SECONDS / 3):
+            try:
+                self.renew_leases()
+            except Exception as e:
+                logger.error('Job lease renewal failed', extra={'error': str(e)})
+
+    def _recover_periodically(self):
+        while True:
+            try:
+                self.recover()
+            except Exception as e:
+                logger.error('Job recovery failed', extra={'error': str(e)})
+            if self._stopping.wait(Config.JOB_RECOVERY_INTERVAL):
+                return
+
+
+def save_upload(file):
+    """Store an uploaded file for a background job; returns its path"""
+    os.makedirs(Config.JOB_UPLOAD_DIR, exist_ok=True)
+    extension = os.path.splitext(file.filename or '')[1][:10]
+    path = os.path.join(Config.JOB_UPLOAD_DIR, f'{os.urandom(12).hex()}{extension}')
+    file.save(path)
+    return path
+
+
+def remove_upload(path):
+    """Delete a file stored by save_upload, if it is still there"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
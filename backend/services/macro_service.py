@@ -0,0 +1,66 @@
+from config import Config
+from services.nutrition_table import get_nutrition_table
+from utils.cache import TTLCache
+from utils.food_names import normalize_food_name
+from utils.logger import setup_logger, log_function_call
+from utils.metrics import metrics
+
+# Set up logger
+logger = setup_logger('macro_service')
+
+# Breakdowns are facts about a food, not about a user: shared process-wide
+_cache = TTLCache('macro', Config.MACRO_CACHE_SIZE, Config.MACRO_CACHE_TTL)
+
+
+def food_key(food_item):
+    """Cache key of a food item"""
+    return normalize_food_name(food_item)
+
+
+class MacroService:
+    """Macro breakdowns of food items: from the bundled nutrition table when
+    the name matches confidently, else from the cache or the model"""
+
+    def __init__(self, ai_service):
+        self.logger = setup_logger('MacroService')
+        self.ai_service = ai_service
+
+    def lookup(self, food_item):
+        """Breakdown of ``food_item`` without a model call.
+
+        Returns (breakdown, source) with source 'table' or 'cache', or None.
+        """
+        table = get_nutrition_table()
+        if table is not None:
+            breakdown = table.lookup(food_item)
+            if breakdown is not None:
+                return breakdown, 'table'
+        cached = _cache.get(food_key(food_item))
+        if cached is not None:
+            return cached, 'cache'
+        return None
+
+    def breakdown(self, food_item):
+        """Breakdown of one item; returns (breakdown, source)"""
+        found = self.lookup(food_item)
+        if found is not None:
+            return found
+        # The model gets the name as the user wrote it; the key only
+        # decides which later names are answered from the cache
+        breakdown = self.ai_service.get_macro_breakdown(food_item)
+        _cache.set(food_key(food_item), breakdown)
+        return breakdown, 'model'
+
+    @log_function_call(logger)
+    def generate_many(self, food_items):
+        """Breakdowns of several items with one model request.
+
+        Returns {food_item: breakdown}; items the model did not answer are
+        missing.
+        """
+        metrics.increment('macro.batch_model_calls')
+        metrics.increment('macro.batch_model_items', len(food_items))
+        results = self.ai_service.get_macro_breakdowns(food_items)
+        for food_item, breakdown in results.items():
+            _cache.set(food_key(food_item), breakdown)
+        return results
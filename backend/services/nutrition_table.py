@@ -0,0 +1,170 @@
+import csv
+import threading
+from array import array
+from collections import defaultdict
+from config import Config
+from utils.food_names import normalize_food_name, normalize_name
+from utils.logger import setup_logger
+from utils.metrics import metrics
+
+# Set up logger
+logger = setup_logger('nutrition_table')
+
+# Per-100 g columns of data/nutrition.csv and how they are reported
+NUTRIENTS = (
+    ('calories', 'Calories', 'kcal'),
+    ('protein', 'Protein', 'g'),
+    ('carbs', 'Carbohydrates', 'g'),
+    ('fat', 'Fat', 'g'),
+    ('fiber', 'Fiber', 'g'),
+    ('sugar', 'Sugar', 'g'),
+)
+
+
+def trigrams(text):
+    """Character trigrams of ``text`` padded with spaces, e.g. ' ap', 'app'"""
+    padded = f' {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def word_trigrams(name):
+    """Trigram sets of each word of ``name``, in order"""
+    return tuple(frozenset(trigrams(word)) for word in name.split())
+
+
+def aligned_similarity(words, other_words):
+    """Dice coefficient of two names compared word by word.
+
+    Words are paired from the end, where English puts the head noun: the
+    trigrams of the last word of one name are only compared with those of
+    the last word of the other, and so on, and unpaired words count against
+    the score. So "chocolate milk" does not match "milk chocolate" (or
+    "chocolate"), and "apple pie" does not match "apple".
+    """
+    total = sum(len(grams) for grams in words) + sum(len(grams) for grams in other_words)
+    if not total:
+        return 0.0
+    shared = sum(len(grams & other) for grams, other in zip(reversed(words), reversed(other_words)))
+    return 2.0 * shared / total
+
+
+class NutritionTable:
+    """Bundled per-100 g nutrition facts with exact and fuzzy name lookup.
+
+    Nutrient values are stored column by column in float arrays (one entry
+    per food). Names and aliases are indexed by their normalized key
+    (utils/food_names.py), exactly and by the trigrams of their words. A
+    fuzzy match scores names word by word (``aligned_similarity``), so word
+    order matters, and only counts when the score reaches ``threshold``;
+    the trigram index bounds that score to skip most names unscored.
+    """
+
+    def __init__(self, rows, threshold):
+        self.threshold = threshold
+        self.names = []
+        self.columns = {column: array('f') for column, _, _ in NUTRIENTS}
+        # Searchable names (food names and aliases) -> food row
+        self._entry_rows = array('H')
+        self._entry_sizes = array('B')
+        self._entry_words = []
+        self._exact = {}
+        self._postings = defaultdict(lambda: array('H'))
+
+        for row in rows:
+            index = len(self.names)
+            self.names.append(row['name'])
+            for column in self.columns:
+                self.columns[column].append(float(row[column] or 0))
+            for name in [row['name']] + [alias for alias in (row.get('aliases') or '').split('|') if alias]:
+                self._add_entry(normalize_name(name), index)
+        self._postings = dict(self._postings)
+
+    @classmethod
+    def from_csv(cls, path, threshold):
+        with open(path, newline='', encoding='utf-8') as f:
+            return cls(csv.DictReader(f), threshold)
+
+    def _add_entry(self, name, row):
+        if not name or name in self._exact:
+            return
+        entry = len(self._entry_rows)
+        words = word_trigrams(name)
+        self._exact[name] = row
+        self._entry_rows.append(row)
+        self._entry_sizes.append(min(sum(len(grams) for grams in words), 255))
+        self._entry_words.append(words)
+        for gram in frozenset().union(*words):
+            self._postings[gram].append(entry)
+
+    def __len__(self):
+        return len(self.names)
+
+    def match(self, food_item):
+        """Best matching food row and its score (1.0 for exact), or None.
+
+        Names with an amount ("2 eggs", "100g chicken") never match: the
+        table only knows 100 g servings, so they are left to the model.
+        """
+        name = normalize_food_name(food_item)
+        if any(char.isdigit() for char in name):
+            return None
+        row = self._exact.get(name)
+        if row is not None:
+            return row, 1.0
+
+        # Query word trigrams found anywhere in a name: at least the number
+        # shared by aligned words, so it bounds the aligned score
+        words = word_trigrams(name)
+        size = sum(len(grams) for grams in words)
+        shared = defaultdict(int)
+        for grams in words:
+            for gram in grams:
+                for entry in self._postings.get(gram, ()):
+                    shared[entry] += 1
+        best, best_score = None, 0.0
+        for entry, count in shared.items():
+            if 2.0 * count / (size + self._entry_sizes[entry]) < max(self.threshold, best_score):
+                continue
+            score = aligned_similarity(words, self._entry_words[entry])
+            if score > best_score:
+                best, best_score = entry, score
+        if best is None or best_score < self.threshold:
+            return None
+        return self._entry_rows[best], best_score
+
+    def breakdown(self, row):
+        """MacroBreakdown dicts for a food row (per 100 g)"""
+        items = [{'nutrient': 'Serving size', 'amount': '100 g'}]
+        for column, label, unit in NUTRIENTS:
+            items.append({'nutrient': label, 'amount': f'{self.columns[column][row]:g} {unit}'})
+        return items
+
+    def lookup(self, food_item):
+        """Breakdown of ``food_item`` if it confidently matches a food, else None"""
+        match = self.match(food_item)
+        if match is None:
+            metrics.increment('nutrition_table.lookups', result='miss')
+            return None
+        row, score = match
+        metrics.increment('nutrition_table.lookups', result='exact' if score == 1.0 else 'fuzzy')
+        return self.breakdown(row)
+
+
+_table = None
+_table_lock = threading.Lock()
+
+
+def get_nutrition_table():
+    """The process-wide table, loaded on first use; None if disabled"""
+    global _table
+    if not Config.NUTRITION_TABLE_ENABLED:
+        return None
+    if _table is None:
+        with _table_lock:
+            if _table is None:
+                _table = NutritionTable.from_csv(Config.NUTRITION_TABLE_PATH, Config.NUTRITION_MATCH_THRESHOLD)
+                logger.info('Nutrition table loaded', extra={
+                    'foods': len(_table),
+                    'path': Config.NUTRITION_TABLE_PATH
+                })
+    return _table
@@ -0,0 +1,166 @@
+import hashlib
+import random
+import re
+from firebase_admin import firestore
+from config import Config
+from utils.limiter import ServiceOverloaded
+from utils.logger import setup_logger, log_function_call
+from utils.metrics import metrics
+
+# Set up logger
+logger = setup_logger('plan_library')
+
+# One document per cohort: the cohort fields plus a list of plan variants
+PLAN_LIBRARY_COLLECTION = 'plan_library'
+
+# Preference strings that mean "none"
+_NO_PREFERENCES = {'', 'none', 'no', 'no preference', 'no preferences', 'no specific preferences'}
+
+def _hit_rate():
+    hits = metrics.counter('plan_library.requests', result='hit')
+    total = hits + metrics.counter('plan_library.requests', result='miss')
+    return round(hits / total, 4) if total else None
+
+metrics.register_gauge('plan_library.hit_rate', _hit_rate)
+
+
+def normalize_preferences(preferences):
+    """Canonical form of free-text preferences.
+
+    Lower-cased, split on commas, semicolons, slashes and "and", stripped
+    of punctuation, de-duplicated and sorted: "Low carb and High-Protein."
+    and "high protein, low carb" are the same cohort.
+    """
+    text = str(preferences or '').lower()
+    if text.strip() in _NO_PREFERENCES:
+        return ''
+    items = set()
+    for item in re.split(r'[,;/]|\band\b', text):
+        item = ' '.join(re.sub(r'[^\w\s]', ' ', item).split())
+        if item and item not in _NO_PREFERENCES:
+            items.add(item)
+    return ', '.join(sorted(items))
+
+
+def bmi_band(bmi, edges=None):
+    """Label of the band containing ``bmi``, e.g. '25-30', '<18.5' or '40+'"""
+    edges = edges or Config.PLAN_LIBRARY_BMI_BANDS
+    if bmi < edges[0]:
+        return f'<{edges[0]:g}'
+    for low, high in zip(edges, edges[1:]):
+        if bmi < high:
+            return f'{low:g}-{high:g}'
+    return f'{edges[-1]:g}+'
+
+
+def _is_vegan(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ('true', 'yes', '1')
+    return bool(value)
+
+
+def plan_cohort(user_data, preferences):
+    """Cohort of a plan request; ``user_data`` must include bmi and tdee"""
+    return {
+        'bmi_band': bmi_band(user_data['bmi']),
+        'tdee': int(round(user_data['tdee'] / 100.0)) * 100,
+        'goal': ' '.join(str(user_data.get('goal') or '').lower().split()),
+        'vegan': _is_vegan(user_data.get('vegan', False)),
+        'preferences': normalize_preferences(preferences),
+    }
+
+
+def cohort_key(cohort):
+    """Firestore document id of a cohort"""
+    text = '|'.join(f'{name}={cohort[name]}' for name in sorted(cohort))
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+@firestore.transactional
+def _add_variant(transaction, cohort_ref, cohort, plan, variant):
+    # Read and append in one transaction so processes filling the same
+    # cohort at once cannot overwrite each other's variants
+    snapshot = cohort_ref.get(transaction=transaction)
+    variants = (snapshot.to_dict() or {}).get('variants', []) if snapshot.exists else []
+    if len(variants) >= variant:
+        return
+    transaction.set(cohort_ref, {
+        **cohort,
+        'variants': variants + [plan],
+        'updated_at': firestore.SERVER_TIMESTAMP
+    })
+
+
+class PlanLibrary:
+    """Diet plans shared between users of the same cohort.
+
+    A cohort with fewer than PLAN_LIBRARY_VARIANTS plans is filled by the
+    requests that reach it (each one generates the next variant and adds
+    it); a full cohort serves one of its plans at random without calling
+    the model. Concurrent requests generating the same variant share one
+    model call (same prompt) and store it once.
+    """
+
+    def __init__(self, db, ai_service):
+        self.logger = setup_logger('PlanLibrary')
+        self.db = db
+        self.ai_service = ai_service
+
+    def cohort_ref(self, cohort):
+        return self.db.collection(PLAN_LIBRARY_COLLECTION).document(cohort_key(cohort))
+
+    def variants(self, cohort):
+        snapshot = self.cohort_ref(cohort).get()
+        return (snapshot.to_dict() or {}).get('variants', []) if snapshot.exists else []
+
+    def add_variant(self, cohort, plan, variant):
+        """Store ``plan`` as variant number ``variant`` (from 1) of the cohort.
+
+        Nothing is written if another request, in this or another process,
+        already filled that variant.
+        """
+        _add_variant(self.db.transaction(), self.cohort_ref(cohort), cohort, plan, variant)
+
+    @log_function_call(logger)
+    def get_plan(self, user_data, preferences):
+        """Diet plan for a user; ``user_data`` must include bmi, bmr and tdee.
+
+        Returns (plan, source) where source is 'library' or 'generated'.
+        """
+        if not Config.PLAN_LIBRARY_ENABLED:
+            return self.ai_service.generate_diet_plan(user_data, preferences), 'generated'
+
+        cohort = plan_cohort(user_data, preferences)
+        variants = self.variants(cohort)
+        if len(variants) >= Config.PLAN_LIBRARY_VARIANTS:
+            metrics.increment('plan_library.requests', result='hit')
+            return random.choice(variants), 'library'
+
+        metrics.increment('plan_library.requests', result='miss')
+        variant = len(variants) + 1
+        try:
+            plan = self.ai_service.generate_cohort_diet_plan(cohort, variant)
+        except ServiceOverloaded:
+            # The model is unavailable or shedding load: a partly filled
+            # cohort is still better than an error
+            if not variants:
+                raise
+            metrics.increment('plan_library.degraded')
+            self.logger.warning('Serving partial plan library cohort', extra={'cohort': cohort_key(cohort)})
+            return random.choice(variants), 'library'
+
+        self.add_variant(cohort, plan, variant)
+        return plan, 'generated'
+
+    @log_function_call(logger)
+    def fill(self, cohort, variants=None):
+        """Generate plans until the cohort holds ``variants`` of them.
+
+        Returns the number of plans generated.
+        """
+        target = variants or Config.PLAN_LIBRARY_VARIANTS
+        generated = 0
+        for variant in range(len(self.variants(cohort)) + 1, target + 1):
+            self.add_variant(cohort, self.ai_service.generate_cohort_diet_plan(cohort, variant), variant)
+            generated += 1
+        return generated
@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+# Tests import the app modules the way app.py does, from the backend directory
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+@pytest.fixture(scope='session')
+def fake_app():
+    """The app wired to the benchmark fakes, as ``(app, db)``.
+
+    Built once per session: the route blueprints are module-level and can
+    only be set up once per process.
+    """
+    from benchmarks.fakes import build_fake_app
+    from config import Config
+    from utils.lifecycle import run_shutdown_hooks
+    yield build_fake_app(rate_limits=Config.RATE_LIMIT_ENABLED)
+    # Stop the background workers while pytest still has the log streams
+    run_shutdown_hooks()
@@ -0,0 +1,47 @@
+import pytest
+
+from services.chat_answer_cache import ChatAnswerCache, normalize_question
+
+QUESTION = 'What foods lower blood sugar?'
+HISTORY = [{'role': 'user', 'content': 'Tell me about pizza'}, {'role': 'model', 'content': '...'}]
+
+
+@pytest.fixture
+def cache():
+    cache = ChatAnswerCache()
+    cache.put(QUESTION, [], 'Fiber-rich foods')
+    return cache
+
+
+def test_normalize_question():
+    assert normalize_question("What's  GOOD for me?") == 'whats good for me'
+
+
+def test_first_message_near_duplicates_hit(cache):
+    assert cache.get('what foods lower blood sugar', []) == 'Fiber-rich foods'
+    assert cache.get('What foods lower blood sugars?', []) == 'Fiber-rich foods'
+
+
+def test_follow_ups_never_hit(cache):
+    # The same words mean something else after earlier turns
+    assert cache.get(QUESTION, HISTORY) is None
+
+
+@pytest.mark.parametrize('message', [
+    'What foods lower my blood sugar?',
+    'Why do those foods lower blood sugar?',
+])
+def test_personal_and_context_questions_never_hit(cache, message):
+    assert cache.get(message, []) is None
+
+
+def test_only_generic_first_messages_are_stored():
+    cache = ChatAnswerCache()
+    cache.put('Is oatmeal good for breakfast?', HISTORY, 'In context')
+    cache.put('Is oatmeal good for my breakfast?', [], 'Personal')
+    cache.put('Is rice good for dinner?', [], '')
+    assert len(cache.index) == 0
+
+
+def test_unrelated_questions_miss(cache):
+    assert cache.get('How much exercise is recommended weekly?', []) is None
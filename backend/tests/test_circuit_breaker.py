@@ -0,0 +1,75 @@
+import time
+
+import pytest
+
+from utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpen
+
+
+class Upstream(Exception):
+    pass
+
+
+def fail(breaker, error=Upstream):
+    with pytest.raises(error):
+        with breaker.guard():
+            raise error()
+
+
+def succeed(breaker):
+    with breaker.guard():
+        pass
+
+
+def test_opens_after_consecutive_failures():
+    breaker = CircuitBreaker('test', failure_threshold=3, reset_timeout=0.05)
+    for _ in range(2):
+        fail(breaker)
+    assert breaker.state == CLOSED
+    fail(breaker)
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpen) as error:
+        succeed(breaker)
+    assert error.value.retry_after >= 1
+
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker('test', failure_threshold=3, reset_timeout=0.05)
+    for _ in range(2):
+        fail(breaker)
+    succeed(breaker)
+    for _ in range(2):
+        fail(breaker)
+    assert breaker.state == CLOSED
+
+
+def test_ignored_errors_do_not_count():
+    breaker = CircuitBreaker(
+        'test', failure_threshold=1, reset_timeout=0.05, is_failure=lambda error: isinstance(error, Upstream)
+    )
+    fail(breaker, ValueError)
+    assert breaker.state == CLOSED
+    fail(breaker)
+    assert breaker.state == OPEN
+
+
+def test_half_open_lets_one_probe_through():
+    breaker = CircuitBreaker('test', failure_threshold=1, reset_timeout=0.05)
+    fail(breaker)
+    time.sleep(0.06)
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+    breaker.on_success()
+    assert breaker.state == CLOSED
+    succeed(breaker)
+
+
+def test_failed_probe_opens_again():
+    breaker = CircuitBreaker('test', failure_threshold=1, reset_timeout=0.05)
+    fail(breaker)
+    time.sleep(0.06)
+    fail(breaker)
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpen):
+        succeed(breaker)
@@ -0,0 +1,91 @@
+import pytest
+
+from benchmarks.fakes import mint_token
+from utils.food_names import normalize_name
+from utils.limiter import ServiceOverloaded
+
+KNOWN = {'apple': {'calories': 95}}
+
+
+class FakeMacroService:
+    """Answers KNOWN items from the 'table'; the rest need the model"""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.lookups = []
+        self.generated = []
+
+    def lookup(self, food_item):
+        self.lookups.append(food_item)
+        key = normalize_name(food_item)
+        return (KNOWN[key], 'table') if key in KNOWN else None
+
+    def generate_many(self, food_items):
+        self.generated.append(list(food_items))
+        if self.error:
+            raise self.error
+        return {food_item: {'calories': len(food_item)} for food_item in food_items}
+
+
+@pytest.fixture
+def post(fake_app, monkeypatch):
+    app, db = fake_app
+    services = app.extensions['services']
+    client = app.test_client()
+
+    def post(user_id, food_items, macro_service=None):
+        macro_service = macro_service or FakeMacroService()
+        monkeypatch.setattr(services.macro_service, 'lookup', macro_service.lookup)
+        monkeypatch.setattr(services.macro_service, 'generate_many', macro_service.generate_many)
+        return client.post('/api/food/diet/batch', json={'food_items': food_items},
+                           headers={'Authorization': f'Bearer {mint_token(user_id)}'})
+
+    return post
+
+
+def saved_queries(db, user_id):
+    return [doc.to_dict() for doc in db.collection('diet_queries').where('user_id', '==', user_id).stream()]
+
+
+def test_equivalent_names_are_resolved_once(post):
+    macro_service = FakeMacroService()
+    response = post('batch-dedupe', ['Apples', 'oatmeal', 'an apple', 'Oatmeal ', 'toast'], macro_service)
+    assert response.status_code == 200
+    items = response.get_json()['items']
+    assert [item['food_item'] for item in items] == ['Apples', 'oatmeal', 'an apple', 'Oatmeal', 'toast']
+    assert [item['source'] for item in items] == ['table', 'model', 'table', 'model', 'model']
+    assert items[1]['macro_breakdown'] == items[3]['macro_breakdown']
+    # One lookup per key, one model call for all the missing keys
+    assert macro_service.lookups == ['Apples', 'oatmeal', 'toast']
+    assert macro_service.generated == [['oatmeal', 'toast']]
+
+
+def test_every_submitted_item_is_saved(post, fake_app):
+    _, db = fake_app
+    post('batch-saved', ['apple', 'Apples', 'oatmeal'])
+    saved = saved_queries(db, 'batch-saved')
+    assert sorted(query['food_item'] for query in saved) == ['Apples', 'apple', 'oatmeal']
+    assert sorted(query['food_key'] for query in saved) == ['apple', 'apple', 'oatmeal']
+
+
+def test_overload_returns_the_items_found_without_the_model(post, fake_app):
+    _, db = fake_app
+    response = post('batch-partial', ['apple', 'oatmeal'], FakeMacroService(ServiceOverloaded('busy')))
+    assert response.status_code == 200
+    apple, oatmeal = response.get_json()['items']
+    assert apple['macro_breakdown'] == KNOWN['apple']
+    assert oatmeal == {'food_item': 'oatmeal', 'error': 'busy'}
+    assert [query['food_item'] for query in saved_queries(db, 'batch-partial')] == ['apple']
+
+
+def test_overload_with_nothing_found_is_503(post, fake_app):
+    _, db = fake_app
+    response = post('batch-overloaded', ['oatmeal', 'toast'], FakeMacroService(ServiceOverloaded('busy', retry_after=7)))
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '7'
+    assert saved_queries(db, 'batch-overloaded') == []
+
+
+@pytest.mark.parametrize('food_items', [[], 'apple', ['apple', ''], ['apple', 3]])
+def test_invalid_items_are_rejected(post, food_items):
+    assert post('batch-invalid', food_items).status_code == 400
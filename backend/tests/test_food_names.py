@@ -0,0 +1,59 @@
+import pytest
+
+from utils.food_names import FoodNameNormalizer, normalize_name, singularize
+
+
+@pytest.mark.parametrize('name, key', [
+    ('Apples ', 'apple'),
+    ('an apple', 'apple'),
+    ('APPLE', 'apple'),
+    ('fresh blueberries', 'blueberry'),
+    ('Aubergine', 'eggplant'),
+    ('garbanzo beans', 'chickpea'),
+    ('fries', 'french fries'),
+    ('French Fries', 'french fries'),
+    ("Shepherd's pie", 'shepherd pie'),
+])
+def test_equivalent_names_share_a_key(name, key):
+    assert normalize_name(name) == key
+
+
+@pytest.mark.parametrize('name, key', [
+    ('2 eggs', '2 egg'),
+    ('100g chicken', '100g chicken'),
+    ('large pizza slice', 'large pizza slice'),
+    ('bowl of rice', 'bowl rice'),
+])
+def test_amounts_and_sizes_are_kept(name, key):
+    assert normalize_name(name) == key
+
+
+def test_different_amounts_do_not_share_a_key():
+    assert normalize_name('2 eggs') != normalize_name('egg')
+    assert normalize_name('small coffee') != normalize_name('large coffee')
+
+
+@pytest.mark.parametrize('word, singular', [
+    ('berries', 'berry'),
+    ('tomatoes', 'tomato'),
+    ('peaches', 'peach'),
+    ('leaves', 'leaf'),
+    ('hummus', 'hummus'),
+    ('oats', 'oats'),
+    ('pea', 'pea'),
+])
+def test_singularize(word, singular):
+    assert singularize(word) == singular
+
+
+def test_normalizer_counts_merged_names():
+    normalize = FoodNameNormalizer(memo_size=10)
+    for name in ('apple', 'Apples', 'an apple', 'pear'):
+        normalize(name)
+    assert normalize.stats() == {'names': 4, 'keys': 2, 'merged': 2}
+
+
+def test_normalizer_memo_is_bounded():
+    normalize = FoodNameNormalizer(memo_size=2)
+    assert [normalize(name) for name in ('apple', 'pear', 'plums')] == ['apple', 'pear', 'plum']
+    assert normalize.stats()['names'] == 2
@@ -0,0 +1,109 @@
+import threading
+
+from config import Config
+from utils.idempotency import (
+    IdempotencyStore, IdempotentRequest, StoredResponse, request_fingerprint, stored_response
+)
+
+RESPONSE = StoredResponse(200, [('Content-Type', 'application/json')], b'{}')
+
+
+def test_first_request_runs_and_repeats_get_its_response():
+    store = IdempotencyStore(maxsize=10, ttl=60)
+    state, entry = store.begin('k', 'f')
+    assert state == 'new'
+    assert store.begin('k', 'f')[0] == 'in_flight'
+    store.finish('k', entry, RESPONSE)
+    state, entry = store.begin('k', 'f')
+    assert state == 'done'
+    assert entry.done.result() == RESPONSE
+
+
+def test_waiters_get_the_response_when_it_finishes():
+    store = IdempotencyStore(maxsize=10, ttl=60)
+    _, entry = store.begin('k', 'f')
+    _, waiting = store.begin('k', 'f')
+    threading.Timer(0.02, store.finish, ['k', entry, RESPONSE]).start()
+    assert waiting.done.result(timeout=1) == RESPONSE
+
+
+def test_key_reused_for_another_request_is_a_mismatch():
+    store = IdempotencyStore(maxsize=10, ttl=60)
+    store.begin('k', 'f')
+    assert store.begin('k', 'other')[0] == 'mismatch'
+
+
+def test_unstored_response_lets_the_retry_run():
+    store = IdempotencyStore(maxsize=10, ttl=60)
+    _, entry = store.begin('k', 'f')
+    store.finish('k', entry, None)
+    assert entry.done.result() is None
+    assert store.begin('k', 'f')[0] == 'new'
+
+
+def test_expired_keys_run_again():
+    store = IdempotencyStore(maxsize=10, ttl=-1)
+    _, entry = store.begin('k', 'f')
+    store.finish('k', entry, RESPONSE)
+    assert store.begin('k', 'f')[0] == 'new'
+
+
+def test_oldest_keys_are_dropped_when_full():
+    store = IdempotencyStore(maxsize=2, ttl=60)
+    for key in ('a', 'b', 'c'):
+        store.begin(key, 'f')
+    assert store.begin('a', 'f')[0] == 'new'
+    assert store.begin('c', 'f')[0] == 'in_flight'
+
+
+def test_errors_overload_and_conflicts_are_not_stored():
+    for status in (500, 503, 409, 429):
+        assert stored_response(status, [], b'') is None
+    assert stored_response(400, [], b'{}').status == 400
+
+
+def test_volatile_headers_are_not_stored():
+    stored = stored_response(200, [
+        ('Content-Type', 'application/json'), ('Content-Length', '2'), ('Content-Encoding', 'gzip'),
+        ('Date', 'x'), ('Set-Cookie', 'a=b'), ('ETag', '"1"')
+    ], b'{}')
+    assert stored.headers == [('Content-Type', 'application/json'), ('ETag', '"1"')]
+
+
+def test_fingerprint_depends_on_body_and_parts():
+    assert request_fingerprint(b'{"a": 1}') == request_fingerprint(b'{"a": 1}')
+    assert request_fingerprint(b'{"a": 1}') != request_fingerprint(b'{"a": 2}')
+    assert request_fingerprint(b'{}', 'json') != request_fingerprint(b'{}', 'text')
+    assert request_fingerprint(None) == request_fingerprint(b'')
+
+
+def test_request_runs_once_then_replays():
+    store = IdempotencyStore(maxsize=10, ttl=60)
+    first = IdempotentRequest(store, 'u', '/p', 'k', b'{}')
+    assert first.step() == ('run', None)
+    action, future = IdempotentRequest(store, 'u', '/p', 'k', b'{}').step()
+    assert action == 'wait'
+    first.finish(200, [('Content-Type', 'application/json')], b'{}')
+    assert future.result(timeout=0) == RESPONSE
+    assert IdempotentRequest(store, 'u', '/p', 'k', b'{}').step() == ('replay', RESPONSE)
+    # Keys are per user
+    assert IdempotentRequest(store, 'other', '/p', 'k', b'{}').step() == ('run', None)
+
+
+def test_request_that_raised_lets_the_retry_run():
+    store = IdempotencyStore(maxsize=10, ttl=60)
+    first = IdempotentRequest(store, 'u', '/p', 'k', b'{}')
+    first.step()
+    first.finish()
+    assert IdempotentRequest(store, 'u', '/p', 'k', b'{}').step() == ('run', None)
+
+
+def test_request_errors(monkeypatch):
+    store = IdempotencyStore(maxsize=10, ttl=60)
+    assert IdempotentRequest(store, 'u', '/p', 'k' * 256, b'{}').step()[1][1] == 400
+    IdempotentRequest(store, 'u', '/p', 'k', b'{}').step()
+    assert IdempotentRequest(store, 'u', '/p', 'k', b'{"a": 1}').step()[1][1] == 422
+    monkeypatch.setattr(Config, 'IDEMPOTENCY_WAIT_TIMEOUT', 0)
+    action, (message, status, headers) = IdempotentRequest(store, 'u', '/p', 'k', b'{}').step()
+    assert (action, status) == ('error', 409)
+    assert headers['Retry-After'] == str(Config.IDEMPOTENCY_RETRY_AFTER)
@@ -0,0 +1,158 @@
+import time
+
+import pytest
+
+from benchmarks.fakes import FakeFirestore
+from config import Config
+from services.job_service import CLAIMS_COLLECTION, JOBS_COLLECTION, JobService
+from utils.limiter import ServiceOverloaded
+
+
+@pytest.fixture
+def db():
+    return FakeFirestore()
+
+
+def make_service(db, handler, finished=None, queue_size=10):
+    service = JobService(db, workers=1, queue_size=queue_size)
+    on_finish = finished.append if finished is not None else None
+    service.register('echo', handler, on_finish=on_finish)
+    return service
+
+
+def echo(user_id, params):
+    return {'value': params['value']}, 200
+
+
+def run_queued(service):
+    """Run the queued jobs on this thread, the way a worker does"""
+    while not service._queue.empty():
+        item = service._queue.get_nowait()
+        try:
+            service._run(*item)
+        finally:
+            service._release(*item)
+
+
+def job(db, job_id):
+    return db.collection(JOBS_COLLECTION).document(job_id).get().to_dict()
+
+
+def expire_lease(db, job_id):
+    db.collection(JOBS_COLLECTION).document(job_id).update({'lease_expires': 0})
+
+
+def test_submitted_job_runs_and_stores_its_result(db):
+    finished = []
+    service = make_service(db, echo, finished)
+    job_id = service.submit('u1', 'echo', {'value': 42})
+    assert service.get(job_id, 'u1')['status'] == 'queued'
+
+    run_queued(service)
+    result = service.get(job_id, 'u1')
+    assert result['status'] == 'done'
+    assert result['result'] == {'value': 42}
+    assert finished == [{'value': 42}]
+    # Other users cannot see it
+    assert service.get(job_id, 'u2') is None
+
+
+def test_full_queue_is_rejected_with_503(db):
+    service = make_service(db, echo, queue_size=1)
+    service.submit('u1', 'echo', {'value': 1})
+    with pytest.raises(ServiceOverloaded) as error:
+        service.submit('u1', 'echo', {'value': 2})
+    assert error.value.status == 503
+    assert db.document_count(JOBS_COLLECTION) == 1
+
+
+def test_held_leases_are_renewed(db):
+    service = make_service(db, echo)
+    job_id = service.submit('u1', 'echo', {'value': 1})
+    expire_lease(db, job_id)
+    assert service.renew_leases() == 1
+    assert service.recover() == 0
+
+    run_queued(service)
+    assert service.renew_leases() == 0
+
+
+def test_expired_job_is_recovered_by_another_process(db):
+    stopped = make_service(db, echo)
+    job_id = stopped.submit('u1', 'echo', {'value': 7})
+    expire_lease(db, job_id)
+
+    other = make_service(db, echo)
+    assert other.recover() == 1
+    assert job(db, job_id)['attempt'] == 2
+    run_queued(other)
+    assert other.get(job_id, 'u1')['result'] == {'value': 7}
+
+
+def test_process_that_lost_the_claim_does_not_run_the_job(db):
+    calls = []
+
+    def handler(user_id, params):
+        calls.append(params)
+        return echo(user_id, params)
+
+    first = make_service(db, handler)
+    job_id = first.submit('u1', 'echo', {'value': 1})
+    expire_lease(db, job_id)
+
+    second = make_service(db, handler)
+    # Another process already claimed the next attempt
+    db.collection(CLAIMS_COLLECTION).document(f'{job_id}-2').create({'job_id': job_id})
+    assert second.recover() == 0
+    assert second._queue.empty()
+
+    third = make_service(db, handler)
+    db.collection(CLAIMS_COLLECTION).document(f'{job_id}-2').delete()
+    assert third.recover() == 1
+    # The first process still had attempt 1 queued; it is no longer its job
+    run_queued(first)
+    assert calls == []
+    run_queued(third)
+    assert calls == [{'value': 1}]
+
+
+def test_job_fails_after_max_attempts(db, monkeypatch):
+    monkeypatch.setattr(Config, 'JOB_MAX_ATTEMPTS', 2)
+    finished = []
+    job_id = make_service(db, echo, finished).submit('u1', 'echo', {'value': 1})
+    # Every process that takes the job over stops before running it
+    for _ in range(2):
+        expire_lease(db, job_id)
+        service = make_service(db, echo, finished)
+        service.recover()
+
+    result = service.get(job_id, 'u1')
+    assert result['status'] == 'failed'
+    assert result['error_status'] == 500
+    assert finished == [{'value': 1}]
+
+
+def test_overloaded_job_is_retried_after_a_backoff(db, monkeypatch):
+    monkeypatch.setattr(Config, 'JOB_MAX_ATTEMPTS', 2)
+    monkeypatch.setattr(Config, 'JOB_RETRY_DELAY', 60)
+    finished = []
+
+    def handler(user_id, params):
+        raise ServiceOverloaded('busy', retry_after=5)
+
+    service = make_service(db, handler, finished)
+    job_id = service.submit('u1', 'echo', {'value': 1})
+    run_queued(service)
+    data = job(db, job_id)
+    assert data['status'] == 'queued'
+    assert data['lease_expires'] - time.time() == pytest.approx(60, abs=5)
+    assert service.renew_leases() == 0
+    assert finished == []
+
+    expire_lease(db, job_id)
+    assert service.recover() == 1
+    run_queued(service)
+    result = service.get(job_id, 'u1')
+    assert result['status'] == 'failed'
+    assert result['error_status'] == 503
+    assert finished == [{'value': 1}]
@@ -0,0 +1,108 @@
+import threading
+import time
+
+import pytest
+
+from utils.limiter import AdaptiveLimiter, ServiceOverloaded, TokenBucket
+
+
+def test_token_bucket_refills_over_time():
+    bucket = TokenBucket(per_minute=60)
+    now = bucket.updated
+    assert bucket.wait_time(60, now) == 0
+    bucket.take(60)
+    assert bucket.wait_time(1, now) == pytest.approx(1.0)
+    assert bucket.wait_time(1, now + 1.0) == 0
+    # Never more than the capacity
+    assert bucket.wait_time(1, now + 3600) == 0
+    assert bucket.tokens == 60
+
+
+def test_limit_grows_additively_on_success():
+    limiter = AdaptiveLimiter('test', 2, 1, 4, 6000, 600000, max_queue=4, queue_timeout=0.2)
+    for _ in range(2):
+        with limiter.permit(1):
+            pass
+    assert limiter.limit == pytest.approx(2 + 1 / 2 + 1 / 2.5)
+
+
+def test_limit_shrinks_multiplicatively_on_overload():
+    limiter = AdaptiveLimiter('test', 4, 1, 4, 6000, 600000, max_queue=4, queue_timeout=0.2)
+    with pytest.raises(TimeoutError):
+        with limiter.permit(1, is_overload=lambda error: isinstance(error, TimeoutError)):
+            raise TimeoutError()
+    assert limiter.limit == pytest.approx(4 * 0.7)
+
+
+def test_other_errors_do_not_shrink_the_limit():
+    limiter = AdaptiveLimiter('test', 3, 1, 4, 6000, 600000, max_queue=4, queue_timeout=0.2)
+    with pytest.raises(ValueError):
+        with limiter.permit(1, is_overload=lambda error: isinstance(error, TimeoutError)):
+            raise ValueError()
+    assert limiter.limit > 3
+
+
+def test_limit_stays_within_bounds():
+    limiter = AdaptiveLimiter('test', 1, 1, 4, 6000, 600000, max_queue=4, queue_timeout=0.2)
+    for _ in range(5):
+        permit = limiter.acquire(1)
+        permit.overloaded = True
+        limiter.release(permit)
+    assert limiter.limit == 1
+    for _ in range(200):
+        limiter.release(limiter.acquire(1))
+    assert limiter.limit == 4
+
+
+def test_waits_for_a_slot_then_sheds_at_the_deadline():
+    limiter = AdaptiveLimiter('test', 1, 1, 4, 6000, 600000, max_queue=4, queue_timeout=0.2)
+    held = limiter.acquire(1)
+    start = time.monotonic()
+    with pytest.raises(ServiceOverloaded):
+        limiter.acquire(1)
+    assert time.monotonic() - start >= 0.2
+    limiter.release(held)
+
+
+def test_waiter_gets_a_released_slot():
+    limiter = AdaptiveLimiter('test', 1, 1, 4, 6000, 600000, max_queue=4, queue_timeout=2)
+    held = limiter.acquire(1)
+    threading.Timer(0.05, limiter.release, [held]).start()
+    limiter.release(limiter.acquire(1))
+
+
+def test_non_blocking_acquire_is_rejected_without_capacity():
+    limiter = AdaptiveLimiter('test', 1, 1, 4, 6000, 600000, max_queue=4, queue_timeout=0.2)
+    held = limiter.acquire(1)
+    with pytest.raises(ServiceOverloaded):
+        limiter.acquire(1, block=False)
+    limiter.release(held)
+
+
+def test_full_queue_is_rejected_at_once():
+    limiter = AdaptiveLimiter('test', 1, 1, 4, 6000, 600000, max_queue=1, queue_timeout=0.3)
+    held = limiter.acquire(1)
+    waiter = threading.Thread(target=pytest.raises, args=(ServiceOverloaded, limiter.acquire, 1))
+    waiter.start()
+    time.sleep(0.05)
+    start = time.monotonic()
+    with pytest.raises(ServiceOverloaded):
+        limiter.acquire(1)
+    assert time.monotonic() - start < 0.1
+    waiter.join()
+    limiter.release(held)
+
+
+def test_token_rate_limits_calls():
+    limiter = AdaptiveLimiter('test', 2, 1, 4, 6000, 100, max_queue=4, queue_timeout=0.05)
+    limiter.release(limiter.acquire(100))
+    with pytest.raises(ServiceOverloaded) as error:
+        limiter.acquire(50)
+    assert error.value.retry_after >= 1
+
+
+def test_token_reservation_is_corrected():
+    limiter = AdaptiveLimiter('test', 2, 1, 4, 6000, 1000, max_queue=4, queue_timeout=0.2)
+    with limiter.permit(500) as permit:
+        permit.tokens_used = 100
+    assert limiter.tokens.tokens == pytest.approx(900, abs=5)
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from utils.minhash import MinHasher, MinHashLSH, shingles
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b)
+
+
+def signature(hasher, text):
+    return hasher.signature(shingles(text))
+
+
+@pytest.fixture
+def hasher():
+    return MinHasher(128)
+
+
+def test_shingles():
+    assert shingles('apple', 3) == {'app', 'ppl', 'ple'}
+    assert shingles('ab', 3) == {'ab'}
+
+
+def test_signatures_are_deterministic():
+    assert np.array_equal(signature(MinHasher(64), 'what is diabetes'), signature(MinHasher(64), 'what is diabetes'))
+
+
+def test_signature_agreement_estimates_jaccard(hasher):
+    a = 'what foods lower blood sugar quickly'
+    b = 'what foods lower blood sugar fast'
+    estimate = np.mean(signature(hasher, a) == signature(hasher, b))
+    assert abs(estimate - jaccard(shingles(a), shingles(b))) < 0.15
+
+
+def make_index(hasher, threshold=0.7, max_entries=10, ttl=60):
+    return MinHashLSH(hasher.num_perm, 32, threshold, max_entries, ttl)
+
+
+def test_query_finds_near_duplicates_only(hasher):
+    index = make_index(hasher)
+    index.insert('what foods lower blood sugar', signature(hasher, 'what foods lower blood sugar'), 'answer')
+    key, value, similarity = index.query(signature(hasher, 'which foods lower blood sugar'))
+    assert (key, value) == ('what foods lower blood sugar', 'answer')
+    assert similarity >= 0.7
+    assert index.query(signature(hasher, 'how much should i exercise each week')) is None
+
+
+def test_exact_get_and_replace(hasher):
+    index = make_index(hasher)
+    index.insert('q', signature(hasher, 'q'), 'old')
+    index.insert('q', signature(hasher, 'q'), 'new')
+    assert index.get('q') == 'new'
+    assert len(index) == 1
+    assert index.get('other') is None
+
+
+def test_oldest_entry_is_evicted_when_full(hasher):
+    index = make_index(hasher, max_entries=2)
+    for text in ('first question here', 'second question here', 'third question here'):
+        index.insert(text, signature(hasher, text), text)
+    assert len(index) == 2
+    assert index.get('first question here') is None
+    assert index.get('third question here') == 'third question here'
+
+
+def test_expired_entries_are_not_returned(hasher):
+    index = make_index(hasher, ttl=-1)
+    index.insert('what is insulin', signature(hasher, 'what is insulin'), 'answer')
+    assert index.get('what is insulin') is None
+    index.insert('what is insulin', signature(hasher, 'what is insulin'), 'answer')
+    assert index.query(signature(hasher, 'what is insulin')) is None
+    assert len(index) == 0
+
+
+def test_bands_must_divide_permutations():
+    with pytest.raises(ValueError):
+        MinHashLSH(64, 10, 0.8, 10, 60)
@@ -0,0 +1,62 @@
+import pytest
+
+from config import Config
+from services.nutrition_table import NutritionTable, aligned_similarity, word_trigrams
+
+
+@pytest.fixture(scope='module')
+def table():
+    return NutritionTable.from_csv(Config.NUTRITION_TABLE_PATH, 0.8)
+
+
+def matched_name(table, query):
+    match = table.match(query)
+    return None if match is None else table.names[match[0]]
+
+
+@pytest.mark.parametrize('query, name', [
+    ('apple', 'apple'),
+    ('Apples', 'apple'),
+    ('milk chocolate', 'milk chocolate'),
+    ('porridge', 'oatmeal'),
+])
+def test_exact_and_alias(table, query, name):
+    assert matched_name(table, query) == name
+    assert table.match(query)[1] == 1.0
+
+
+@pytest.mark.parametrize('query, name', [
+    ('bannana', 'banana'),
+    ('brocoli', 'broccoli'),
+    ('chiken breast', 'chicken breast'),
+    ('dark chocolat', 'dark chocolate'),
+])
+def test_misspellings(table, query, name):
+    assert matched_name(table, query) == name
+    assert table.match(query)[1] < 1.0
+
+
+@pytest.mark.parametrize('query', [
+    # Same words, different food
+    'chocolate milk',
+    # Another food containing a known name
+    'apple pie',
+    'rice milk',
+    'almond mlk',
+    'pad thai',
+    'xyz',
+])
+def test_reordered_and_near_miss_names_do_not_match(table, query):
+    assert matched_name(table, query) is None
+    assert table.lookup(query) is None
+
+
+def test_word_order_matters():
+    assert aligned_similarity(word_trigrams('chocolate milk'), word_trigrams('milk chocolate')) == 0.0
+    assert aligned_similarity(word_trigrams('chocolate milk'), word_trigrams('chocolate milk')) == 1.0
+
+
+def test_breakdown_is_per_100_g(table):
+    breakdown = table.lookup('banana')
+    assert breakdown[0] == {'nutrient': 'Serving size', 'amount': '100 g'}
+    assert {'nutrient': 'Calories', 'amount': '89 kcal'} in breakdown
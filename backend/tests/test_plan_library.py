@@ -0,0 +1,111 @@
+import pytest
+
+from benchmarks.fakes import FakeFirestore
+from config import Config
+from services.plan_library import PLAN_LIBRARY_COLLECTION, PlanLibrary, bmi_band, normalize_preferences, plan_cohort
+from utils.limiter import ServiceOverloaded
+
+USER = {'bmi': 27.3, 'bmr': 1700, 'tdee': 2349, 'goal': ' Lose  Weight', 'vegan': 'yes'}
+
+
+class FakeAIService:
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = []
+
+    def generate_cohort_diet_plan(self, cohort, variant):
+        self.calls.append(variant)
+        if self.error:
+            raise self.error
+        return f'plan {variant}'
+
+
+@pytest.fixture(autouse=True)
+def library_enabled(monkeypatch):
+    monkeypatch.setattr(Config, 'PLAN_LIBRARY_ENABLED', True)
+    monkeypatch.setattr(Config, 'PLAN_LIBRARY_VARIANTS', 2)
+
+
+@pytest.fixture
+def db():
+    return FakeFirestore()
+
+
+@pytest.mark.parametrize('preferences, normalized', [
+    ('Low carb and High-Protein.', 'high protein, low carb'),
+    ('high protein, low carb', 'high protein, low carb'),
+    ('nuts; nuts / dairy', 'dairy, nuts'),
+    ('None', ''),
+    ('no preference, none', ''),
+    (None, ''),
+])
+def test_normalize_preferences(preferences, normalized):
+    assert normalize_preferences(preferences) == normalized
+
+
+@pytest.mark.parametrize('bmi, band', [
+    (17, '<18.5'),
+    (18.5, '18.5-25'),
+    (24.9, '18.5-25'),
+    (30, '30-35'),
+    (41, '40+'),
+])
+def test_bmi_band(bmi, band):
+    assert bmi_band(bmi) == band
+
+
+def test_plan_cohort_rounds_and_normalizes():
+    assert plan_cohort(USER, 'Low carb') == {
+        'bmi_band': '25-30',
+        'tdee': 2300,
+        'goal': 'lose weight',
+        'vegan': True,
+        'preferences': 'low carb',
+    }
+    assert plan_cohort({**USER, 'tdee': 2290, 'vegan': 'false'}, 'LOW CARB.')['vegan'] is False
+    assert plan_cohort(USER, 'low carb') == plan_cohort({**USER, 'bmi': 29.9, 'tdee': 2251}, 'Low Carb')
+
+
+def test_miss_generates_and_stores_the_next_variant(db):
+    ai = FakeAIService()
+    library = PlanLibrary(db, ai)
+    assert library.get_plan(USER, 'low carb') == ('plan 1', 'generated')
+    assert library.get_plan(USER, 'Low Carb') == ('plan 2', 'generated')
+    assert ai.calls == [1, 2]
+    assert library.variants(plan_cohort(USER, 'low carb')) == ['plan 1', 'plan 2']
+    assert db.document_count(PLAN_LIBRARY_COLLECTION) == 1
+
+
+def test_full_cohort_is_served_without_the_model(db):
+    ai = FakeAIService()
+    library = PlanLibrary(db, ai)
+    library.fill(plan_cohort(USER, ''))
+    ai.calls.clear()
+    for _ in range(5):
+        plan, source = library.get_plan(USER, 'none')
+        assert plan in ('plan 1', 'plan 2')
+        assert source == 'library'
+    assert ai.calls == []
+
+
+def test_variant_filled_elsewhere_is_not_overwritten(db):
+    library = PlanLibrary(db, FakeAIService())
+    cohort = plan_cohort(USER, '')
+    library.add_variant(cohort, 'first', 1)
+    library.add_variant(cohort, 'second', 1)
+    assert library.variants(cohort) == ['first']
+
+
+def test_overload_serves_a_partial_cohort(db):
+    library = PlanLibrary(db, FakeAIService())
+    library.get_plan(USER, '')
+    library.ai_service = FakeAIService(ServiceOverloaded('busy'))
+    assert library.get_plan(USER, '') == ('plan 1', 'library')
+    assert library.variants(plan_cohort(USER, '')) == ['plan 1']
+
+
+def test_overload_with_an_empty_cohort_is_raised(db):
+    library = PlanLibrary(db, FakeAIService(ServiceOverloaded('busy')))
+    with pytest.raises(ServiceOverloaded):
+        library.get_plan(USER, '')
+    assert db.document_count(PLAN_LIBRARY_COLLECTION) == 0
@@ -0,0 +1,112 @@
+from functools import wraps
+
+import pytest
+from flask import Flask, jsonify
+
+from utils.decorators import idempotent, rate_limited
+from utils.idempotency import IdempotencyStore
+from utils.rate_limit import LocalBackend, RateLimiter
+
+MINUTE = [(2, 60)]
+
+
+def test_allows_up_to_the_limit_then_rejects():
+    backend = LocalBackend()
+    assert backend.hit('u', MINUTE, 0.0) == 0
+    assert backend.hit('u', MINUTE, 1.0) == 0
+    assert backend.hit('u', MINUTE, 2.0) > 0
+
+
+def test_rejected_requests_are_not_counted():
+    backend = LocalBackend()
+    backend.hit('u', [(1, 60)], 0.0)
+    for _ in range(5):
+        assert backend.hit('u', [(1, 60)], 10.0) > 0
+    # Only the allowed request is in the previous window
+    assert backend.hit('u', [(1, 60)], 120.0) == 0
+
+
+def test_keys_are_independent():
+    backend = LocalBackend()
+    backend.hit('a', [(1, 60)], 0.0)
+    assert backend.hit('a', [(1, 60)], 0.0) > 0
+    assert backend.hit('b', [(1, 60)], 0.0) == 0
+
+
+def test_previous_window_is_weighted_by_overlap():
+    backend = LocalBackend()
+    for second in range(2):
+        backend.hit('u', MINUTE, 50.0 + second)
+    # 75% into the next window a quarter of the 2 earlier requests remain
+    assert backend.hit('u', MINUTE, 105.0) == 0
+    # That request and the remaining share of the earlier ones fill the limit
+    assert backend.hit('u', MINUTE, 106.0) > 0
+
+
+def test_retry_after_is_when_a_request_fits_again():
+    backend = LocalBackend()
+    backend.hit('u', [(1, 60)], 30.0)
+    retry_after = backend.hit('u', [(1, 60)], 30.0)
+    assert retry_after > 0
+    assert backend.hit('u', [(1, 60)], 30.0 + retry_after + 0.01) == 0
+    backend.hit('v', [(1, 60)], 30.0)
+    assert backend.hit('v', [(1, 60)], 30.0 + retry_after - 1) > 0
+
+
+def test_every_window_must_allow_the_request():
+    backend = LocalBackend()
+    limits = [(10, 60), (2, 86400)]
+    assert backend.hit('u', limits, 0.0) == 0
+    assert backend.hit('u', limits, 1.0) == 0
+    assert backend.hit('u', limits, 120.0) > 0
+
+
+def test_stale_counters_are_pruned():
+    backend = LocalBackend(max_keys=2)
+    for index in range(3):
+        backend.hit(f'u{index}', [(1, 60)], 0.0)
+    backend.hit('late', [(1, 60)], 600.0)
+    assert len(backend) == 1
+
+
+def test_limiter_returns_whole_seconds_and_skips_unlimited_routes():
+    limiter = RateLimiter({'chat': [(1, 60)]}, LocalBackend())
+    assert limiter.check('u', 'chat') is None
+    retry_after = limiter.check('u', 'chat')
+    # With a limit of 1 the request has to age out of the previous window too
+    assert isinstance(retry_after, int) and 1 <= retry_after <= 120
+    assert limiter.check('u', 'other') is None
+
+
+@pytest.fixture
+def client():
+    """A POST route stacked like the app's: idempotent above rate_limited"""
+    rate_limiter = RateLimiter({'test': [(1, 60)]}, LocalBackend())
+    idempotency_store = IdempotencyStore(100, 60)
+    app = Flask(__name__)
+    calls = []
+
+    def as_user(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            return f(*args, user_id='u', **kwargs)
+        return decorated_function
+
+    @app.route('/test', methods=['POST'])
+    @as_user
+    @idempotent(idempotency_store)
+    @rate_limited(rate_limiter, 'test')
+    def view(user_id):
+        calls.append(user_id)
+        return jsonify({"calls": len(calls)})
+
+    return app.test_client(), calls
+
+
+def test_idempotent_retries_are_not_rate_limited(client):
+    client, calls = client
+    responses = [client.post('/test', json={}, headers={'Idempotency-Key': 'k'}) for _ in range(3)]
+    assert [response.status_code for response in responses] == [200, 200, 200]
+    assert responses[2].headers['Idempotent-Replayed'] == 'true'
+    assert len(calls) == 1
+    assert client.post('/test', json={}, headers={'Idempotency-Key': 'other'}).status_code == 429
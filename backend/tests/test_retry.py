@@ -0,0 +1,120 @@
+import time
+
+import pytest
+
+from utils import retry
+from utils.retry import CallPolicy, DeadlineExceeded, LatencyWindow, RetryingCaller, backoff_delay
+
+
+class Transient(Exception):
+    pass
+
+
+@pytest.fixture
+def caller(monkeypatch):
+    # No real backoff sleeps; the delays themselves are tested separately
+    monkeypatch.setattr(retry, 'backoff_delay', lambda number, base, cap: 0.0)
+    return RetryingCaller('test', lambda error: isinstance(error, Transient), hedge_threads=4)
+
+
+def failing(times, result='ok', error=Transient):
+    calls = []
+
+    def attempt(deadline, hedge):
+        calls.append(hedge)
+        if len(calls) <= times:
+            raise error()
+        return result
+    return attempt, calls
+
+
+def test_transient_errors_are_retried(caller):
+    attempt, calls = failing(2)
+    assert caller.call('m', CallPolicy(budget=5, attempts=3), attempt) == 'ok'
+    assert len(calls) == 3
+
+
+def test_last_transient_error_is_raised(caller):
+    attempt, calls = failing(5)
+    with pytest.raises(Transient):
+        caller.call('m', CallPolicy(budget=5, attempts=3), attempt)
+    assert len(calls) == 3
+
+
+def test_other_errors_are_not_retried(caller):
+    attempt, calls = failing(1, error=ValueError)
+    with pytest.raises(ValueError):
+        caller.call('m', CallPolicy(budget=5, attempts=3), attempt)
+    assert len(calls) == 1
+
+
+def test_no_retry_once_the_budget_is_spent(caller):
+    def attempt(deadline, hedge):
+        time.sleep(0.06)
+        raise Transient()
+    with pytest.raises(DeadlineExceeded):
+        caller.call('m', CallPolicy(budget=0.05, attempts=5), attempt)
+
+
+def test_each_attempt_gets_the_remaining_budget(caller):
+    deadlines = []
+
+    def attempt(deadline, hedge):
+        deadlines.append(deadline)
+        if len(deadlines) == 1:
+            raise Transient()
+        return 'ok'
+    start = time.monotonic()
+    caller.call('m', CallPolicy(budget=2, attempts=2), attempt)
+    assert deadlines[0] == deadlines[1]
+    assert deadlines[0] - start == pytest.approx(2, abs=0.05)
+
+
+def test_slow_call_is_hedged_and_the_faster_answer_wins(caller):
+    def attempt(deadline, hedge):
+        if hedge:
+            return 'hedge'
+        time.sleep(0.3)
+        return 'first'
+    policy = CallPolicy(budget=2, hedge_percentile=95, hedge_delay=0.02)
+    assert caller.call('m', policy, attempt) == 'hedge'
+
+
+def test_fast_call_is_not_hedged(caller):
+    attempt, calls = failing(0)
+    policy = CallPolicy(budget=2, hedge_percentile=95, hedge_delay=0.5)
+    assert caller.call('m', policy, attempt) == 'ok'
+    assert calls == [False]
+
+
+def test_hedged_call_gives_up_at_the_deadline(caller):
+    def attempt(deadline, hedge):
+        time.sleep(0.5)
+        return 'late'
+    policy = CallPolicy(budget=0.1, hedge_percentile=95, hedge_delay=0.02)
+    with pytest.raises(DeadlineExceeded):
+        caller.call('m', policy, attempt)
+
+
+def test_hedged_latency_counts_from_submission():
+    caller = RetryingCaller('test', lambda error: False, hedge_threads=1)
+    # Occupy the only thread so the call waits for it
+    caller._pool().submit(time.sleep, 0.1)
+    attempt, calls = failing(0)
+    policy = CallPolicy(budget=2, hedge_percentile=95, hedge_delay=1)
+    assert caller.call('m', policy, attempt) == 'ok'
+    assert caller._window('m').percentile(50, min_samples=1) >= 0.1
+
+
+def test_latency_window_percentile():
+    window = LatencyWindow(size=100)
+    for value in range(1, 11):
+        window.record(value)
+    assert window.percentile(50) is None
+    assert window.percentile(50, min_samples=10) == 5
+    assert window.percentile(95, min_samples=10) == 10
+
+
+def test_backoff_is_jittered_and_capped():
+    for number in range(1, 8):
+        assert 0 <= backoff_delay(number, 0.5, 4.0) <= min(4.0, 0.5 * 2 ** (number - 1))
@@ -0,0 +1,113 @@
+"""Populate the latest-record pointers for records written before they existed.
+
+GET /api/health/plan, /advice and /diabetes_check read a single
+``latest_records/<record_type>_<user_id>`` document that is updated together
+with every new record. This job scans the record collections once, finds the
+newest record per user and writes the missing (or older) pointers in batches.
+Pointers that already refer to a record at least as new are left alone, so
+the job can be re-run. Run it right after deploying the pointer writes; a
+record saved between the pointer check and the batch commit would be
+overwritten by the older one until that user's next record.
+
+Usage (from the ``backend`` directory)::
+
+    python -m tools.backfill_latest_records --dry-run
+    python -m tools.backfill_latest_records --type plan --type advice
+"""
+import argparse
+
+from services.history_service import HistoryService, RECORD_TYPES
+from utils.logger import setup_logger
+
+# Set up logger
+logger = setup_logger('backfill_latest_records')
+
+# Firestore allows at most 500 writes per batch
+BATCH_SIZE = 500
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def newest_per_user(db, record_type):
+    """Map user_id -> (timestamp, record_id) of the user's newest record"""
+    spec = RECORD_TYPES[record_type]
+    timestamp_field = spec['timestamp_field']
+    newest = {}
+    query = db.collection(spec['collection']).select(['user_id', timestamp_field])
+    for doc in query.stream():
+        data = doc.to_dict()
+        user_id = data.get('user_id')
+        timestamp = data.get(timestamp_field)
+        if not user_id or timestamp is None:
+            continue
+        if user_id not in newest or timestamp > newest[user_id][0]:
+            newest[user_id] = (timestamp, doc.id)
+    return newest
+
+
+def backfill(db, record_type, dry_run=False):
+    """Write missing or stale pointers for one record type; returns counts"""
+    history_service = HistoryService(db)
+    spec = RECORD_TYPES[record_type]
+    collection = db.collection(spec['collection'])
+    newest = newest_per_user(db, record_type)
+    counts = {'users': len(newest), 'written': 0, 'up_to_date': 0}
+
+    for user_ids in _chunks(sorted(newest), BATCH_SIZE):
+        pointers = db.get_all([history_service.pointer_ref(record_type, user_id) for user_id in user_ids])
+        current = {}
+        for snapshot in pointers:
+            if snapshot.exists:
+                data = snapshot.to_dict()
+                current[data.get('user_id')] = data.get(spec['timestamp_field'])
+
+        stale = [
+            user_id for user_id in user_ids
+            if current.get(user_id) is None or current[user_id] < newest[user_id][0]
+        ]
+        counts['up_to_date'] += len(user_ids) - len(stale)
+        if not stale or dry_run:
+            counts['written'] += len(stale)
+            continue
+
+        batch = db.batch()
+        for record in db.get_all([collection.document(newest[user_id][1]) for user_id in stale]):
+            if not record.exists:
+                continue
+            data = record.to_dict()
+            batch.set(history_service.pointer_ref(record_type, data['user_id']),
+                      history_service.pointer_data(record_type, record.id, data))
+            counts['written'] += 1
+        batch.commit()
+
+    logger.info('Latest-record backfill finished', extra={
+        'record_type': record_type,
+        'dry_run': dry_run,
+        **counts
+    })
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--type', dest='record_types', action='append', choices=sorted(RECORD_TYPES),
+                        help='record type to backfill (repeatable; default: all)')
+    parser.add_argument('--dry-run', action='store_true', help='only count the pointers to write')
+    args = parser.parse_args(argv)
+
+    # Imported here so the module can be used with a stand-in client
+    from app import init_firebase
+    db = init_firebase()
+
+    for record_type in args.record_types or list(RECORD_TYPES):
+        counts = backfill(db, record_type, dry_run=args.dry_run)
+        action = 'would write' if args.dry_run else 'wrote'
+        print(f"{record_type}: {counts['users']} users, {action} {counts['written']} pointers, "
+              f"{counts['up_to_date']} already up to date")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,282 @@
+"""Latency and error statistics from the daily log files.
+
+Streams ``logs/*.log`` entry by entry and pairs
+
+- "API Request: <METHOD> <URL>" with "API Response"/"API Error" entries, and
+- "Calling <func>" with "Function <func> completed successfully"/"Error in <func>"
+
+to report per-endpoint and per-function latency percentiles, error rates and
+the slowest calls. Latencies go into fixed-size log-scale histograms and only
+unmatched entries are held in memory, so memory use stays roughly constant
+regardless of log size.
+
+Usage (from the ``backend`` directory)::
+
+    python -m tools.log_stats logs/ --from 2025-06-01 --to 2025-06-30
+    python -m tools.log_stats logs/2025-06-08.log --top 20 --json stats.json
+"""
+import argparse
+import heapq
+import itertools
+import json
+import math
+import re
+import sys
+from collections import deque
+from datetime import datetime
+from urllib.parse import urlsplit
+
+from utils.log_parser import iter_log_files
+
+API_REQUEST = 'API Request: '
+API_RESPONSE = 'API Response: '
+API_ERROR = 'API Error: '
+CALLING = 'Calling '
+COMPLETED_RE = re.compile(r'^Function (\S+) completed successfully$')
+ERROR_IN_RE = re.compile(r'^Error in (\w+)$')
+# Logged once per process start; requests still open at that point never finished
+APP_START_MESSAGE = 'Calling create_app'
+
+# "<Response 52 bytes [200 OK]>" or "(<Response ...>, 404)"
+TUPLE_STATUS_RE = re.compile(r',\s*(\d{3})\)$')
+RESPONSE_STATUS_RE = re.compile(r'\[(\d{3})[^\]]*\]>')
+
+# Unmatched start entries kept per key before the oldest is dropped
+MAX_PENDING_PER_KEY = 1000
+
+
+class LatencyHistogram:
+    """Log-scale histogram with ~1% relative error and a bounded bucket count"""
+
+    GROWTH = 1.02
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        ms = max(seconds * 1000, 0.001)
+        index = int(math.log(ms) / math.log(self.GROWTH))
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def percentile(self, pct):
+        if not self.count:
+            return None
+        rank = math.ceil(pct / 100 * self.count)
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(self.GROWTH ** (index + 1), self.max)
+        return self.max
+
+
+class Stats:
+    """Counts and latency histogram for one endpoint or function"""
+
+    def __init__(self):
+        self.histogram = LatencyHistogram()
+        self.errors = 0
+        self.client_errors = 0
+        self.unmatched = 0
+
+    def to_dict(self):
+        histogram = self.histogram
+        calls = histogram.count
+        return {
+            'calls': calls,
+            'errors': self.errors,
+            'error_rate': round(self.errors / calls, 4) if calls else None,
+            'client_errors': self.client_errors,
+            'unmatched': self.unmatched,
+            'latency_ms': {
+                'p50': _round(histogram.percentile(50)),
+                'p95': _round(histogram.percentile(95)),
+                'p99': _round(histogram.percentile(99)),
+                'mean': _round(histogram.total / calls) if calls else None,
+                'max': _round(histogram.max) if calls else None,
+            },
+        }
+
+
+def _round(value):
+    return round(value, 2) if value is not None else None
+
+
+def _response_status(extra):
+    response = str(extra.get('response', '')).strip()
+    match = TUPLE_STATUS_RE.search(response) or RESPONSE_STATUS_RE.search(response)
+    return int(match.group(1)) if match else None
+
+
+def _endpoint(method_and_url):
+    method, _, url = method_and_url.partition(' ')
+    return f'{method} {urlsplit(url).path}'
+
+
+class LogAnalyzer:
+    def __init__(self, top=10, start=None, end=None):
+        self.endpoints = {}
+        self.functions = {}
+        self.top = top
+        self.start = start
+        self.end = end
+        self._pending = {}
+        self._slowest = []
+        self._sequence = itertools.count()
+        self.entries = 0
+
+    def _stats(self, table, key):
+        if key not in table:
+            table[key] = Stats()
+        return table[key]
+
+    def _open(self, key, timestamp, table, name):
+        pending = self._pending.setdefault(key, deque())
+        if len(pending) >= MAX_PENDING_PER_KEY:
+            pending.popleft()
+            self._stats(table, name).unmatched += 1
+        pending.append(timestamp)
+
+    def _close(self, key, timestamp):
+        pending = self._pending.get(key)
+        if not pending:
+            return None
+        started = pending.popleft()
+        if not pending:
+            del self._pending[key]
+        return (timestamp - started).total_seconds()
+
+    def _record_slow(self, kind, name, timestamp, seconds):
+        item = (seconds, next(self._sequence), kind, name, timestamp.isoformat())
+        if len(self._slowest) < self.top:
+            heapq.heappush(self._slowest, item)
+        elif seconds > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, item)
+
+    def add(self, entry):
+        if self.start and entry.timestamp < self.start:
+            return
+        if self.end and entry.timestamp > self.end:
+            return
+        self.entries += 1
+        message = entry.message
+
+        if entry.logger == 'app' and message == APP_START_MESSAGE:
+            self._flush_pending()
+
+        if message.startswith(API_REQUEST):
+            name = _endpoint(message[len(API_REQUEST):])
+            self._open(('api', entry.logger, message[len(API_REQUEST):]), entry.timestamp,
+                       self.endpoints, name)
+        elif message.startswith(API_RESPONSE) or message.startswith(API_ERROR):
+            is_error = message.startswith(API_ERROR)
+            target = message[len(API_ERROR if is_error else API_RESPONSE):]
+            name = _endpoint(target)
+            seconds = self._close(('api', entry.logger, target), entry.timestamp)
+            stats = self._stats(self.endpoints, name)
+            if seconds is None:
+                stats.unmatched += 1
+                return
+            status = None if is_error else _response_status(entry.extra)
+            if is_error or (status and status >= 500):
+                stats.errors += 1
+            elif status and status >= 400:
+                stats.client_errors += 1
+            stats.histogram.add(seconds)
+            self._record_slow('endpoint', name, entry.timestamp, seconds)
+        elif message.startswith(CALLING):
+            name = f'{entry.logger}.{message[len(CALLING):]}'
+            self._open(('fn', name), entry.timestamp, self.functions, name)
+        elif ERROR_IN_RE.match(message) or COMPLETED_RE.match(message):
+            is_error = message.startswith('Error in ')
+            function = (ERROR_IN_RE.match(message) or COMPLETED_RE.match(message)).group(1)
+            name = f'{entry.logger}.{function}'
+            seconds = self._close(('fn', name), entry.timestamp)
+            stats = self._stats(self.functions, name)
+            if seconds is None:
+                stats.unmatched += 1
+                return
+            if is_error:
+                stats.errors += 1
+            stats.histogram.add(seconds)
+            self._record_slow('function', name, entry.timestamp, seconds)
+
+    def _flush_pending(self):
+        """Count every open start entry as unmatched and forget it"""
+        for key, pending in self._pending.items():
+            table = self.endpoints if key[0] == 'api' else self.functions
+            name = _endpoint(key[2]) if key[0] == 'api' else key[1]
+            self._stats(table, name).unmatched += len(pending)
+        self._pending = {}
+
+    def report(self):
+        self._flush_pending()
+
+        return {
+            'entries': self.entries,
+            'endpoints': {name: stats.to_dict() for name, stats in sorted(self.endpoints.items())},
+            'functions': {name: stats.to_dict() for name, stats in sorted(self.functions.items())},
+            'slowest': [
+                {'kind': kind, 'name': name, 'finished_at': finished, 'latency_ms': _round(seconds * 1000)}
+                for seconds, _, kind, name, finished in sorted(self._slowest, reverse=True)
+            ],
+        }
+
+
+def _print_table(title, rows):
+    print(f'\n{title}')
+    print(f"{'name':55} {'calls':>7} {'err%':>6} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'max ms':>10}")
+    for name, stats in rows.items():
+        latency = stats['latency_ms']
+        error_rate = f"{stats['error_rate'] * 100:.1f}" if stats['error_rate'] is not None else '-'
+        cells = [latency[key] if latency[key] is not None else '-' for key in ('p50', 'p95', 'p99', 'max')]
+        print(f"{name[:55]:55} {stats['calls']:>7} {error_rate:>6} "
+              + ' '.join(f'{cell:>10}' for cell in cells))
+
+
+def _parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d') if value else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('logs', nargs='*', default=['logs'],
+                        help='log files, directories or globs (default: logs/)')
+    parser.add_argument('--from', dest='start_date', help='first date (YYYY-MM-DD)')
+    parser.add_argument('--to', dest='end_date', help='last date, inclusive (YYYY-MM-DD)')
+    parser.add_argument('--top', type=int, default=10, help='number of slowest calls to list')
+    parser.add_argument('--json', dest='json_path', help='also write the report as JSON')
+    args = parser.parse_args(argv)
+
+    start = _parse_date(args.start_date)
+    end = _parse_date(args.end_date)
+    if end:
+        end = end.replace(hour=23, minute=59, second=59, microsecond=999999)
+
+    analyzer = LogAnalyzer(top=args.top, start=start, end=end)
+    for entry in iter_log_files(args.logs, start and start.date(), end and end.date()):
+        analyzer.add(entry)
+    report = analyzer.report()
+
+    print(f"Parsed {report['entries']} log entries")
+    _print_table('Endpoints', report['endpoints'])
+    _print_table('Functions', report['functions'])
+    print('\nSlowest calls')
+    for item in report['slowest']:
+        print(f"{item['latency_ms']:>12} ms  {item['kind']:8} {item['name']}  ({item['finished_at']})")
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'\nReport written to {args.json_path}', file=sys.stderr)
+    return report
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""Fill the diet plan library for the most common cohorts ahead of time.
+
+POST /api/health/plan serves plans from ``plan_library/<cohort>`` documents
+once a cohort holds PLAN_LIBRARY_VARIANTS plans and generates them one
+request at a time otherwise. This job reads the stored user profiles,
+groups them into cohorts (with the given preferences, by default none) and
+generates the missing plans for the largest cohorts, so that their users
+are answered from the library from the first request. Cohorts that are
+already full are skipped, so the job can be re-run.
+
+Usage (from the ``backend`` directory)::
+
+    python -m tools.pregenerate_plans --dry-run
+    python -m tools.pregenerate_plans --top 100 --preferences "" --preferences "high protein"
+"""
+import argparse
+from collections import Counter
+
+from config import Config
+from services.health_service import HealthService
+from services.plan_library import PlanLibrary, cohort_key, plan_cohort
+from utils.logger import setup_logger
+
+# Set up logger
+logger = setup_logger('pregenerate_plans')
+
+# Profile fields needed to place a user in a cohort
+PROFILE_FIELDS = ['age', 'sex', 'height', 'weight', 'activity_level', 'goal', 'vegan']
+
+
+def count_cohorts(db, preferences):
+    """Counter of cohort key -> number of users, and key -> cohort"""
+    # BMI and energy only; the diabetes model is not needed
+    health_service = HealthService(db, None)
+    counts = Counter()
+    cohorts = {}
+    for doc in db.collection('users').select(PROFILE_FIELDS).stream():
+        user_data = doc.to_dict()
+        try:
+            bmi, _ = health_service.calculate_bmi(user_data)
+            _, tdee = health_service.calculate_energy(user_data)
+        except (KeyError, TypeError, ValueError):
+            # Profile not filled in yet
+            continue
+        for preference in preferences:
+            cohort = plan_cohort({**user_data, 'bmi': bmi, 'tdee': tdee}, preference)
+            key = cohort_key(cohort)
+            counts[key] += 1
+            cohorts[key] = cohort
+    return counts, cohorts
+
+
+def pregenerate(db, ai_service, top, preferences, variants=None, dry_run=False):
+    """Fill the ``top`` largest cohorts; returns counts"""
+    library = PlanLibrary(db, ai_service)
+    target = variants or Config.PLAN_LIBRARY_VARIANTS
+    counts, cohorts = count_cohorts(db, preferences)
+    result = {'cohorts': len(counts), 'filled': 0, 'already_full': 0, 'plans': 0, 'failed': 0}
+
+    for key, users in counts.most_common(top):
+        cohort = cohorts[key]
+        missing = target - len(library.variants(cohort))
+        if missing <= 0:
+            result['already_full'] += 1
+            continue
+        if dry_run:
+            result['filled'] += 1
+            result['plans'] += missing
+            print(f"{users:6d} users  {missing} plans  {cohort}")
+            continue
+        try:
+            result['plans'] += library.fill(cohort, target)
+            result['filled'] += 1
+        except Exception as e:
+            result['failed'] += 1
+            logger.error('Error filling cohort', extra={'cohort': key, 'error': str(e)})
+
+    logger.info('Plan library pregeneration finished', extra={'dry_run': dry_run, **result})
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--top', type=int, default=50, help='number of cohorts to fill, largest first')
+    parser.add_argument('--preferences', action='append',
+                        help='preferences to generate plans for (repeatable; default: none)')
+    parser.add_argument('--variants', type=int, help='plans per cohort (default: PLAN_LIBRARY_VARIANTS)')
+    parser.add_argument('--dry-run', action='store_true', help='only list the cohorts to fill')
+    args = parser.parse_args(argv)
+
+    # Imported here so the module can be used with a stand-in client
+    from app import init_firebase
+    from services.ai_service import AIService
+    db = init_firebase()
+
+    result = pregenerate(db, AIService(), args.top, args.preferences or [''],
+                         variants=args.variants, dry_run=args.dry_run)
+    action = 'would generate' if args.dry_run else 'generated'
+    print(f"{result['cohorts']} cohorts, {result['filled']} filled ({action} {result['plans']} plans), "
+          f"{result['already_full']} already full, {result['failed']} failed")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from utils.logger import setup_logger
+
+# Set up logger
+logger = setup_logger('async_offload')
+
+
+class BoundedOffloader:
+    """Runs blocking client calls on a fixed-size thread pool.
+
+    Coroutines waiting for a free thread hold no OS thread themselves, so
+    thousands of in-flight requests share ``max_workers`` threads per
+    dependency.
+    """
+
+    def __init__(self, name, max_workers):
+        self.name = name
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f'{name}-offload')
+
+    async def run(self, func, *args, **kwargs):
+        """Await ``func(*args, **kwargs)`` executed on the pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+class BackgroundTasks:
+    """Tracks fire-and-forget coroutines (e.g. history writes) so they can be
+    awaited before shutdown instead of being dropped"""
+
+    def __init__(self):
+        self._tasks = set()
+
+    def spawn(self, coro, description):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+
+        def done(finished):
+            self._tasks.discard(finished)
+            if not finished.cancelled() and finished.exception() is not None:
+                logger.error('Background task failed', extra={
+                    'task': description,
+                    'error': str(finished.exception())
+                })
+
+        task.add_done_callback(done)
+        return task
+
+    async def drain(self):
+        """Wait for all pending background tasks"""
+        if self._tasks:
+            logger.info('Waiting for background tasks', extra={'pending': len(self._tasks)})
+            await asyncio.gather(*self._tasks, return_exceptions=True)
@@ -0,0 +1,101 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+from utils.limiter import ServiceOverloaded
+from utils.logger import setup_logger
+from utils.metrics import metrics
+
+# Set up logger
+logger = setup_logger('circuit_breaker')
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpen(ServiceOverloaded):
+    """The dependency's breaker is open; the call was not attempted"""
+
+
+class CircuitBreaker:
+    """Stops calling a dependency that keeps failing.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    calls fail at once with CircuitOpen. Once ``reset_timeout`` seconds have
+    passed it lets a single probe call through (half-open): success closes
+    the breaker, failure opens it for another ``reset_timeout``.
+    ``is_failure(exc)`` decides which exceptions count (default: all).
+    """
+
+    def __init__(self, name, failure_threshold, reset_timeout, is_failure=None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.is_failure = is_failure or (lambda error: True)
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+        metrics.register_gauge(f'{name}.breaker', self.status)
+
+    def status(self):
+        with self._lock:
+            return {'state': self.state, 'failures': self.failures}
+
+    def _transition(self, state):
+        # Called with the lock held
+        metrics.increment(f'{self.name}.breaker.transitions', to=state)
+        logger.warning('Circuit breaker state changed', extra={
+            'breaker': self.name,
+            'from': self.state,
+            'to': state,
+            'failures': self.failures
+        })
+        self.state = state
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+
+    def before_call(self):
+        """Raise CircuitOpen unless a call may go through now"""
+        with self._lock:
+            if self.state == OPEN:
+                remaining = self.opened_at + self.reset_timeout - time.monotonic()
+                if remaining > 0:
+                    metrics.increment(f'{self.name}.breaker.rejected')
+                    raise CircuitOpen(f'{self.name} is unavailable, retry later', max(1, math.ceil(remaining)))
+                self._transition(HALF_OPEN)
+            if self.state == HALF_OPEN:
+                if self._probing:
+                    metrics.increment(f'{self.name}.breaker.rejected')
+                    raise CircuitOpen(f'{self.name} is unavailable, retry later', 1)
+                self._probing = True
+
+    def on_success(self):
+        with self._lock:
+            self._probing = False
+            self.failures = 0
+            if self.state != CLOSED:
+                self._transition(CLOSED)
+
+    def on_failure(self, error):
+        with self._lock:
+            self._probing = False
+            if not self.is_failure(error):
+                return
+            self.failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                self._transition(OPEN)
+
+    @contextmanager
+    def guard(self):
+        """``with breaker.guard():`` around one call to the dependency"""
+        self.before_call()
+        try:
+            yield
+        except Exception as e:
+            self.on_failure(e)
+            raise
+        self.on_success()
@@ -1,7 +1,32 @@
+import base64
+import hashlib
+import json
+from concurrent.futures import TimeoutError as FutureTimeout
 from functools import wraps
-from flask import request, jsonify
+from flask import request, jsonify, make_response
+from config import Config
+from utils.encoding import LLM_OUTPUT_HEADER
+from utils.idempotency import IDEMPOTENCY_HEADER, REPLAYED_HEADER, IdempotentRequest
 import firebase_admin.auth
 
+def peek_token_uid(id_token):
+    """Read the uid claim from an ID token WITHOUT verifying it.
+
+    Only for starting work speculatively (e.g. prefetching the user's
+    document) while the real verification runs; never trust the result
+    before ``verify_id_token`` has confirmed the same uid.
+    """
+    parts = id_token.split('.')
+    if len(parts) < 2:
+        return None
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(parts[1] + '=' * (-len(parts[1]) % 4)))
+    except ValueError:
+        return None
+    if not isinstance(payload, dict):
+        return None
+    return payload.get('user_id') or payload.get('uid') or payload.get('sub')
+
 def require_auth(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -19,4 +44,103 @@ def require_auth(f):
             return jsonify({"error": "Invalid ID token"}), 401
         except Exception as e:
             return jsonify({"error": str(e)}), 500
-    return decorated_function 
\ No newline at end of file
+    return decorated_function 
+
+def rate_limited(rate_limiter, route):
+    """Apply the ``route`` limits of ``rate_limiter`` to the authenticated user.
+
+    Goes right after ``require_auth``, or after ``idempotent`` so replayed
+    requests are not counted; GET requests are not limited, others over a
+    limit get a 429 with Retry-After and never reach the view. Routes pass
+    ``services.rate_limiter``.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if request.method in ('GET', 'HEAD'):
+                return f(*args, **kwargs)
+            retry_after = rate_limiter.check(kwargs.get('user_id'), route)
+            if retry_after is not None:
+                return jsonify({"error": "Too many requests, slow down"}), 429, {'Retry-After': str(retry_after)}
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+def conditional_get(f):
+    """Add an ETag to successful GET responses and answer If-None-Match.
+
+    The ETag is a hash of the response body, so a client revalidating
+    unchanged data gets an empty 304 instead of the full payload. Responses
+    are user-specific, so they are marked private and vary on Authorization;
+    ``HTTP_CACHE_MAX_AGE`` (seconds, default 0) lets clients skip
+    revalidation for a short while.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        response = make_response(f(*args, **kwargs))
+        if request.method != 'GET' or response.status_code != 200:
+            return response
+
+        response.set_etag(hashlib.blake2b(response.get_data(), digest_size=16).hexdigest())
+        if Config.HTTP_CACHE_MAX_AGE > 0:
+            response.cache_control.max_age = Config.HTTP_CACHE_MAX_AGE
+        else:
+            response.cache_control.no_cache = True
+        response.cache_control.private = True
+        response.vary.add('Authorization')
+        response.vary.add(LLM_OUTPUT_HEADER)
+        return response.make_conditional(request)
+    return decorated_function
+
+def replay_response(stored):
+    """Flask response for a StoredResponse"""
+    response = make_response(stored.body, stored.status, stored.headers)
+    response.headers[REPLAYED_HEADER] = 'true'
+    return response
+
+def idempotent(idempotency_store):
+    """Run a POST at most once per ``Idempotency-Key`` header and user.
+
+    Goes right after ``require_auth``, above ``rate_limited``. A request
+    repeating a key gets the response of the first one, waiting for it (up
+    to ``IDEMPOTENCY_WAIT_TIMEOUT``, then 409) while it is still running,
+    so the retry makes no model call, no write and is not rate limited.
+    Server errors, overload and rate-limit responses are not kept, so
+    retrying those runs the request again. Requests without the header are
+    not affected. Routes pass ``services.idempotency_store``.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            key = request.headers.get(IDEMPOTENCY_HEADER)
+            if not key or request.method != 'POST':
+                return f(*args, **kwargs)
+
+            call = IdempotentRequest(
+                idempotency_store, kwargs.get('user_id'), request.path, key,
+                request.get_data(), request.headers.get(LLM_OUTPUT_HEADER)
+            )
+            action, value = call.step()
+            while action == 'wait':
+                try:
+                    value.result(timeout=call.remaining())
+                except FutureTimeout:
+                    pass
+                action, value = call.step()
+            if action == 'error':
+                message, status, headers = value
+                return jsonify({"error": message}), status, headers
+            if action == 'replay':
+                return replay_response(value)
+
+            response = None
+            try:
+                response = make_response(f(*args, **kwargs))
+                return response
+            finally:
+                if response is None:
+                    call.finish()
+                else:
+                    call.finish(response.status_code, response.headers.items(), response.get_data())
+        return decorated_function
+    return decorator
@@ -0,0 +1,208 @@
+import dataclasses
+import decimal
+import gzip
+import json
+import uuid
+from datetime import date
+from flask import request
+from flask.json.provider import JSONProvider
+from werkzeug.http import http_date
+from config import Config
+from utils.logger import setup_logger
+
+try:
+    import orjson
+except ImportError:  # Falls back to the standard library encoder
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # Only gzip is offered
+    brotli = None
+
+# Set up logger
+logger = setup_logger('encoding')
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'text/plain', 'text/html', 'text/csv'}
+
+# Model output (plans, advice, recipes, macro breakdowns) is returned as JSON
+# values. Clients built for the old format, a JSON-encoded string, can ask for
+# it with "X-LLM-Output: string"; LLM_OUTPUT_AS_STRING makes that the default
+# ("X-LLM-Output: json" then opts back in).
+LLM_OUTPUT_HEADER = 'X-LLM-Output'
+
+
+def _default(o):
+    """Encode the types Flask's default provider handles, plus numpy scalars.
+
+    Firestore timestamps (DatetimeWithNanoseconds) are datetimes; like
+    Flask's jsonify they are written as HTTP dates unless
+    ``JSON_DATETIME_FORMAT`` is 'iso'.
+    """
+    if isinstance(o, date):
+        return o.isoformat() if Config.JSON_DATETIME_FORMAT == 'iso' else http_date(o)
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+    if hasattr(o, 'tolist'):
+        return o.tolist()
+    raise TypeError(f'Object of type {type(o).__name__} is not JSON serializable')
+
+
+class FastJSONProvider(JSONProvider):
+    """JSON provider using orjson when it is installed.
+
+    Keys are sorted so equal payloads encode to equal bytes (ETags depend on
+    it); output is always compact.
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        if orjson is not None:
+            self._options = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+            if Config.JSON_DATETIME_FORMAT != 'iso':
+                self._options |= orjson.OPT_PASSTHROUGH_DATETIME
+
+    def dumps_bytes(self, obj):
+        if orjson is not None:
+            return orjson.dumps(obj, default=_default, option=self._options)
+        return json.dumps(obj, default=_default, sort_keys=True, separators=(',', ':')).encode()
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            kwargs.setdefault('default', _default)
+            return json.dumps(obj, **kwargs)
+        return self.dumps_bytes(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj), mimetype='application/json')
+
+
+def llm_output_as_string(request):
+    """Whether ``request`` wants model output as a JSON-encoded string"""
+    requested = request.headers.get(LLM_OUTPUT_HEADER, '').lower()
+    if requested in ('string', 'json'):
+        return requested == 'string'
+    return Config.LLM_OUTPUT_AS_STRING
+
+
+def present_llm_output(value, request):
+    """Model output as sent to the client making ``request``"""
+    if value is not None and not isinstance(value, str) and llm_output_as_string(request):
+        return json.dumps(value)
+    return value
+
+
+def present_llm_fields(record, fields, request):
+    """Apply ``present_llm_output`` to ``fields`` of a record dict in place"""
+    if record:
+        for field in fields:
+            if field in record:
+                record[field] = present_llm_output(record[field], request)
+    return record
+
+
+def compression(enabled=True, min_size=None):
+    """Per-route compression settings, e.g. ``@compression(min_size=256)``.
+
+    The options are stored on the view function and carried to the
+    registered view by ``functools.wraps`` in the other decorators.
+    """
+    def decorator(f):
+        f.compression_options = {'enabled': enabled, 'min_size': min_size}
+        return f
+    return decorator
+
+
+def _route_options(app, request):
+    view = app.view_functions.get(request.endpoint)
+    return getattr(view, 'compression_options', None) or {}
+
+
+def choose_encoding(request, response, size, options):
+    """Content-Encoding to use for ``response``, or None"""
+    if not options.get('enabled', True):
+        return None
+    min_size = options.get('min_size')
+    if size < (Config.COMPRESSION_MIN_SIZE if min_size is None else min_size):
+        return None
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return None
+    if getattr(response, 'direct_passthrough', False) or 'Content-Encoding' in response.headers:
+        return None
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return None
+    offered = ['br', 'gzip'] if brotli is not None else ['gzip']
+    return request.accept_encodings.best_match(offered)
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=Config.COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=Config.COMPRESSION_GZIP_LEVEL)
+
+
+def _apply_encoding(response, encoding, compressed):
+    response.headers['Content-Encoding'] = encoding
+    response.headers['Content-Length'] = str(len(compressed))
+    response.vary.add('Accept-Encoding')
+    # The compressed bytes differ from the ones the ETag was computed on
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+
+
+def init_response_encoding(app):
+    """Use the fast JSON provider and compress large responses (Flask)"""
+    app.json = FastJSONProvider(app)
+    if not Config.COMPRESSION_ENABLED:
+        return app
+
+    @app.after_request
+    def compress_response(response):
+        if response.is_streamed:
+            return response
+        data = response.get_data()
+        encoding = choose_encoding(request, response, len(data), _route_options(app, request))
+        if encoding:
+            compressed = compress(data, encoding)
+            response.set_data(compressed)
+            _apply_encoding(response, encoding, compressed)
+        return response
+
+    logger.info('Response encoding initialized', extra={
+        'orjson': orjson is not None,
+        'brotli': brotli is not None
+    })
+    return app
+
+
+def init_async_response_encoding(app):
+    """Same as ``init_response_encoding`` for the Quart app"""
+    app.json = FastJSONProvider(app)
+    if not Config.COMPRESSION_ENABLED:
+        return app
+
+    # Only the ASGI app needs Quart
+    from quart import request as async_request
+
+    @app.after_request
+    async def compress_response(response):
+        data = await response.get_data()
+        encoding = choose_encoding(async_request, response, len(data), _route_options(app, async_request))
+        if encoding:
+            compressed = compress(data, encoding)
+            response.set_data(compressed)
+            _apply_encoding(response, encoding, compressed)
+        return response
+
+    return app
@@ -0,0 +1,167 @@
+import re
+import threading
+from collections import Counter
+
+from utils.metrics import metrics
+
+# Words that do not change which food is meant. Amounts, sizes and
+# containers ("2", "100g", "large", "bowl") do change the answer and are kept
+STOP_WORDS = frozenset({
+    'a', 'an', 'the', 'some', 'of', 'with', 'fresh', 'raw', 'plain', 'homemade', 'organic',
+})
+
+# Singular forms that the suffix rules below get wrong
+IRREGULAR_SINGULARS = {
+    'leaves': 'leaf',
+    'loaves': 'loaf',
+    'halves': 'half',
+    'knives': 'knife',
+    'teeth': 'tooth',
+    'geese': 'goose',
+    'mice': 'mouse',
+    'cookies': 'cookie',
+    'brownies': 'brownie',
+    'smoothies': 'smoothie',
+    'pies': 'pie',
+    'fries': 'fries',
+    'chives': 'chive',
+    'olives': 'olive',
+    'shrimps': 'shrimp',
+}
+
+# Words ending in "s" that are already singular (or uncountable)
+INVARIANT = frozenset({
+    'hummus', 'houmous', 'hummous', 'couscous', 'asparagus', 'molasses', 'swiss', 'oats',
+    'grits', 'chips', 'crisps', 'brussels', 'greens', 'citrus', 'cactus', 'glass', 'bass',
+    'watercress', 'schnapps', 'jus', 'cornflakes',
+})
+
+# (suffix, replacement) tried in order on words not handled above
+SINGULAR_SUFFIXES = (
+    ('ies', 'y'),
+    ('oes', 'o'),
+    ('ches', 'ch'),
+    ('shes', 'sh'),
+    ('sses', 'ss'),
+    ('xes', 'x'),
+    ('zes', 'z'),
+    ('ss', 'ss'),
+    ('us', 'us'),
+    ('is', 'is'),
+    ('s', ''),
+)
+
+# Regional and alternative names -> the name used everywhere else, after
+# the words themselves have been normalized
+SYNONYMS = {
+    'aubergine': 'eggplant',
+    'courgette': 'zucchini',
+    'capsicum': 'bell pepper',
+    'prawn': 'shrimp',
+    'yoghurt': 'yogurt',
+    'garbanzo bean': 'chickpea',
+    'garbanzo': 'chickpea',
+    'chick pea': 'chickpea',
+    'porridge': 'oatmeal',
+    'rolled oats': 'oatmeal',
+    'maize': 'corn',
+    'beetroot': 'beet',
+    'rocket': 'arugula',
+    'coriander leaf': 'cilantro',
+    'spring onion': 'scallion',
+    'green onion': 'scallion',
+    'minced beef': 'ground beef',
+    'beef mince': 'ground beef',
+    'crisps': 'potato chips',
+    'fries': 'french fries',
+    # Keeps "french fries" from becoming "french french fries"
+    'french fries': 'french fries',
+    'doughnut': 'donut',
+    'wholemeal': 'whole wheat',
+    'houmous': 'hummus',
+    'hummous': 'hummus',
+    'lasagne': 'lasagna',
+    'kiwifruit': 'kiwi',
+}
+
+# Longest synonym phrase, in words
+_MAX_PHRASE = max(len(phrase.split()) for phrase in SYNONYMS)
+
+_WORD = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+
+def singularize(word):
+    """Singular form of one lower-case word"""
+    if word in IRREGULAR_SINGULARS:
+        return IRREGULAR_SINGULARS[word]
+    if word in INVARIANT or len(word) <= 3:
+        return word
+    for suffix, replacement in SINGULAR_SUFFIXES:
+        if word.endswith(suffix):
+            return word[:len(word) - len(suffix)] + replacement
+    return word
+
+
+def _apply_synonyms(words):
+    result = []
+    index = 0
+    while index < len(words):
+        for size in range(min(_MAX_PHRASE, len(words) - index), 0, -1):
+            phrase = ' '.join(words[index:index + size])
+            if phrase in SYNONYMS:
+                result.extend(SYNONYMS[phrase].split())
+                index += size
+                break
+        else:
+            result.append(words[index])
+            index += 1
+    return result
+
+
+def normalize_name(name):
+    """Canonical key of a food name (see FoodNameNormalizer)"""
+    words = [singularize(word.replace("'", '')) for word in _WORD.findall(str(name).lower())]
+    kept = [word for word in words if word not in STOP_WORDS]
+    # "the" alone is still something; keep the words rather than return ''
+    return ' '.join(_apply_synonyms(kept or words))
+
+
+class FoodNameNormalizer:
+    """Canonical keys for food names.
+
+    Case and whitespace are folded, punctuation and stop words dropped,
+    words singularized and synonyms replaced, so "Apples ", "an apple" and
+    "APPLE" share the key "apple". Amounts and sizes are kept: "2 eggs" is
+    "2 egg", not "egg". Results are memoized for
+    up to ``memo_size`` distinct names, which also gives the number of
+    distinct names merged into fewer keys (``merged``). Use the shared
+    ``normalize_food_name`` for names that come from requests and
+    ``normalize_name`` for reference data, which should not be counted.
+    """
+
+    def __init__(self, memo_size=10000):
+        self.memo_size = memo_size
+        self._lock = threading.Lock()
+        self._memo = {}
+        self._names_per_key = Counter()
+
+    def __call__(self, name):
+        key = self._memo.get(name)
+        if key is not None:
+            return key
+        key = normalize_name(name)
+        with self._lock:
+            if name not in self._memo and len(self._memo) < self.memo_size:
+                self._memo[name] = key
+                self._names_per_key[key] += 1
+        return key
+
+    def stats(self):
+        with self._lock:
+            names, keys = len(self._memo), len(self._names_per_key)
+        return {'names': names, 'keys': keys, 'merged': names - keys}
+
+
+# Shared by every cache and lookup keyed on food names
+normalize_food_name = FoodNameNormalizer()
+metrics.register_gauge('food_names', normalize_food_name.stats)
@@ -0,0 +1,147 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import Future
+from config import Config
+from utils.metrics import metrics
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+# Set on responses replayed from the store
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+
+# Response headers that are recomputed when a stored response is sent again
+_VOLATILE_HEADERS = frozenset({'content-length', 'content-encoding', 'date', 'set-cookie'})
+
+StoredResponse = namedtuple('StoredResponse', 'status headers body')
+
+
+def request_fingerprint(body, *parts):
+    """Hash of a request body (and anything else that shapes the response)"""
+    digest = hashlib.blake2b(body or b'', digest_size=16)
+    for part in parts:
+        digest.update(b'\0' + (part or '').encode())
+    return digest.hexdigest()
+
+
+def stored_response(status, headers, body):
+    """StoredResponse for a finished request, or None if a retry should run
+    the request again (server errors, overload, rate limiting, conflicts)"""
+    if status >= 500 or status in (409, 429):
+        return None
+    kept = [(name, value) for name, value in headers if name.lower() not in _VOLATILE_HEADERS]
+    return StoredResponse(status, kept, body)
+
+
+class _Entry:
+    __slots__ = ('fingerprint', 'expires', 'done')
+
+    def __init__(self, fingerprint, expires):
+        self.fingerprint = fingerprint
+        self.expires = expires
+        # Resolves to the StoredResponse, or None if it was not stored
+        self.done = Future()
+
+
+class IdempotencyStore:
+    """In-flight and completed responses by idempotency key.
+
+    The first request with a key runs; requests repeating the key while it
+    runs wait for its response, and later ones get the stored response
+    until ``ttl`` seconds after it completed. A key repeated with a
+    different request (fingerprint) is a client error. Holds at most
+    ``maxsize`` keys, dropping the oldest first.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        metrics.register_gauge('idempotency.size', lambda: len(self._entries))
+
+    def begin(self, key, fingerprint):
+        """Claim or look up ``key``.
+
+        Returns (state, entry): 'new' (the caller runs the request and must
+        call ``finish``), 'done' (``entry.done`` holds the stored response),
+        'in_flight' (wait on ``entry.done``) or 'mismatch'.
+        """
+        state, entry = self._begin(key, fingerprint)
+        metrics.increment('idempotency.requests', result=state)
+        return state, entry
+
+    def _begin(self, key, fingerprint):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires < now:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                entry = self._entries[key] = _Entry(fingerprint, now + self.ttl)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                return 'new', entry
+            if entry.fingerprint != fingerprint:
+                return 'mismatch', entry
+            return ('done' if entry.done.done() else 'in_flight'), entry
+
+    def finish(self, key, entry, response):
+        """Record the response of a 'new' request (None: not stored)"""
+        with self._lock:
+            if self._entries.get(key) is entry:
+                if response is None:
+                    del self._entries[key]
+                else:
+                    entry.expires = time.monotonic() + self.ttl
+        entry.done.set_result(response)
+
+
+class IdempotentRequest:
+    """One POST with an Idempotency-Key going through the store.
+
+    Shared by ``utils.decorators.idempotent`` and the async routes, which
+    only differ in how they wait. ``step()`` says what to do next:
+
+    - ('run', None): run the request, then call ``finish``
+    - ('replay', stored): answer with the first request's StoredResponse
+    - ('wait', future): the first request is still running; wait for
+      ``future`` at most ``remaining()`` seconds, then step again
+    - ('error', (message, status, headers)): answer with this error
+    """
+
+    def __init__(self, store, user_id, path, key, body, variant=None):
+        self.store = store
+        self.key = (user_id, path, key)
+        self.fingerprint = request_fingerprint(body, variant)
+        self.deadline = time.monotonic() + Config.IDEMPOTENCY_WAIT_TIMEOUT
+        self.entry = None
+
+    def remaining(self):
+        return max(self.deadline - time.monotonic(), 0)
+
+    def step(self):
+        if len(self.key[2]) > MAX_KEY_LENGTH:
+            return 'error', (f"{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters", 400, {})
+        state, entry = self.store.begin(self.key, self.fingerprint)
+        if state == 'new':
+            self.entry = entry
+            return 'run', None
+        if state == 'mismatch':
+            return 'error', (f"{IDEMPOTENCY_HEADER} was already used for a different request", 422, {})
+        if state == 'done':
+            return 'replay', entry.done.result()
+        if not self.remaining():
+            return 'error', ("A request with this Idempotency-Key is still in progress", 409, {
+                'Retry-After': str(Config.IDEMPOTENCY_RETRY_AFTER)
+            })
+        # When it resolves to None the first request was not kept (e.g. it
+        # failed) and the next step runs this one
+        return 'wait', entry.done
+
+    def finish(self, status=None, headers=(), body=None):
+        """Record the response of a request that ran (no status: it raised)"""
+        stored = stored_response(status, headers, body) if status is not None else None
+        self.store.finish(self.key, self.entry, stored)
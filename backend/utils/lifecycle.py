@@ -0,0 +1,44 @@
+import atexit
+import logging
+import threading
+from utils.logger import setup_logger
+
+# Set up logger
+logger = setup_logger('lifecycle')
+
+_shutdown_hooks = []
+_shutdown_lock = threading.Lock()
+_shutdown_done = False
+
+
+def register_shutdown_hook(hook, name=None):
+    """Register a callable to run once when the process shuts down.
+
+    Hooks run in reverse registration order, so later components (which may
+    depend on earlier ones) are stopped first.
+    """
+    _shutdown_hooks.append((name or getattr(hook, '__name__', repr(hook)), hook))
+    return hook
+
+
+def run_shutdown_hooks():
+    """Run all shutdown hooks, then flush and close the log handlers"""
+    global _shutdown_done
+    with _shutdown_lock:
+        if _shutdown_done:
+            return
+        _shutdown_done = True
+
+        for name, hook in reversed(_shutdown_hooks):
+            try:
+                logger.info('Running shutdown hook', extra={'hook': name})
+                hook()
+            except Exception as e:
+                logger.error('Shutdown hook failed', extra={'hook': name, 'error': str(e)})
+
+        logger.info('Shutdown complete, flushing logs')
+        logging.shutdown()
+
+
+# Also covers the development server and one-off scripts
+atexit.register(run_shutdown_hooks)
@@ -0,0 +1,179 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+from utils.logger import setup_logger
+from utils.metrics import metrics
+
+# Set up logger
+logger = setup_logger('limiter')
+
+
+class ServiceOverloaded(Exception):
+    """Raised when a call is shed instead of queued; routes answer ``status``"""
+
+    status = 503
+
+    def __init__(self, message, retry_after=1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Refills ``per_minute`` tokens per minute up to ``capacity``.
+
+    Not thread-safe on its own; AdaptiveLimiter guards it with its lock.
+    """
+
+    def __init__(self, per_minute, capacity=None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, count, now):
+        """Seconds until ``count`` tokens are available (0 if they are now)"""
+        self._refill(now)
+        count = min(count, self.capacity)
+        if self.tokens >= count:
+            return 0.0
+        return (count - self.tokens) / self.rate
+
+    def take(self, count):
+        # May go negative when a call used more than was reserved
+        self.tokens -= count
+
+    def give(self, count):
+        self.tokens = min(self.capacity, self.tokens + count)
+
+
+class Permit:
+    def __init__(self, reserved_tokens):
+        self.reserved_tokens = reserved_tokens
+        self.tokens_used = None
+        self.overloaded = False
+
+
+class AdaptiveLimiter:
+    """Concurrency limit adapted by AIMD, plus request and token rate buckets.
+
+    Callers queue (at most ``max_queue`` of them) until a concurrency slot
+    and enough RPM/TPM budget are available, or until their deadline, in
+    which case ServiceOverloaded is raised; a full queue is rejected at
+    once. The limit grows by 1/limit per successful call (about +1 per
+    round of calls) and is multiplied by ``decrease_factor`` whenever the
+    upstream signals overload (429/503, timeouts).
+    """
+
+    def __init__(self, name, initial_limit, min_limit, max_limit, requests_per_minute,
+                 tokens_per_minute, max_queue, queue_timeout, decrease_factor=0.7):
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(initial_limit)
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.decrease_factor = decrease_factor
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.in_flight = 0
+        self.queued = 0
+        self._cond = threading.Condition()
+        metrics.register_gauge(f'{name}.limiter', self.state)
+
+    def state(self):
+        with self._cond:
+            now = time.monotonic()
+            self.requests._refill(now)
+            self.tokens._refill(now)
+            return {
+                'limit': round(self.limit, 2),
+                'in_flight': self.in_flight,
+                'queued': self.queued,
+                'max_queue': self.max_queue,
+                'rpm_available': int(self.requests.tokens),
+                'tpm_available': int(self.tokens.tokens),
+            }
+
+    def _reject(self, reason, retry_after):
+        metrics.increment(f'{self.name}.limiter.rejected', reason=reason)
+        logger.warning('Call shed by limiter', extra={
+            'limiter': self.name,
+            'reason': reason,
+            'limit': round(self.limit, 2),
+            'in_flight': self.in_flight,
+            'queued': self.queued
+        })
+        raise ServiceOverloaded(f'{self.name} is overloaded, retry later', max(1, math.ceil(retry_after)))
+
+    def acquire(self, tokens, deadline=None, block=True):
+        """Wait for capacity to make one call estimated at ``tokens`` tokens.
+
+        ``deadline`` is a time.monotonic() value; callers never wait more
+        than ``queue_timeout`` seconds. With ``block=False`` the call is
+        rejected unless capacity is available right away (hedged requests).
+        """
+        now = time.monotonic()
+        deadline = min(deadline or math.inf, now + self.queue_timeout)
+        tokens = min(tokens, self.tokens.capacity)
+
+        with self._cond:
+            if not block:
+                deadline = now
+            elif self.queued >= self.max_queue:
+                self._reject('queue_full', self.queue_timeout)
+            self.queued += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = None
+                    if self.in_flight < int(self.limit):
+                        wait = max(self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+                        if wait == 0:
+                            self.requests.take(1)
+                            self.tokens.take(tokens)
+                            self.in_flight += 1
+                            return Permit(tokens)
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self._reject('deadline' if block else 'no_capacity', wait or 1)
+                    self._cond.wait(min(remaining, wait) if wait else remaining)
+            finally:
+                self.queued -= 1
+
+    def release(self, permit):
+        with self._cond:
+            self.in_flight -= 1
+            if permit.tokens_used is not None:
+                extra = permit.tokens_used - permit.reserved_tokens
+                if extra > 0:
+                    self.tokens.take(extra)
+                else:
+                    self.tokens.give(-extra)
+            if permit.overloaded:
+                self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+                metrics.increment(f'{self.name}.limiter.overload_signals')
+            else:
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+
+    @contextmanager
+    def permit(self, tokens, is_overload=None, deadline=None, block=True):
+        """``with limiter.permit(n) as permit:`` around one upstream call.
+
+        Exceptions for which ``is_overload(exc)`` is true shrink the limit.
+        Set ``permit.tokens_used`` to correct the token reservation.
+        """
+        permit = self.acquire(tokens, deadline, block)
+        try:
+            yield permit
+        except Exception as e:
+            permit.overloaded = bool(is_overload and is_overload(e))
+            raise
+        finally:
+            self.release(permit)
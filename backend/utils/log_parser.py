@@ -0,0 +1,99 @@
+import glob
+import json
+import os
+import re
+from collections import namedtuple
+from datetime import datetime
+
+# A parsed log entry. ``extra`` is the decoded "Extra:" JSON (empty if the
+# entry had none) and ``details`` holds any further lines, e.g. tracebacks.
+LogEntry = namedtuple('LogEntry', ['timestamp', 'logger', 'level', 'message', 'extra', 'details'])
+
+# Header line written by CustomFormatter ("2025-06-08T16:10:26.070245 - ...")
+# and by the older logging.Formatter default ("2025-06-05 17:28:22,882 - ...")
+HEADER_RE = re.compile(
+    r'^(\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?) - (\S+) - '
+    r'(DEBUG|INFO|WARNING|ERROR|CRITICAL) - (.*)$'
+)
+EXTRA_PREFIX = 'Extra: '
+LOG_FILE_RE = re.compile(r'(\d{4}-\d{2}-\d{2})\.log$')
+
+
+def parse_timestamp(value):
+    """Parse either timestamp style used in the log files"""
+    value = value.replace(',', '.')
+    if 'T' not in value:
+        value = value.replace(' ', 'T', 1)
+    return datetime.fromisoformat(value)
+
+
+def _decode_extra(line):
+    try:
+        extra = json.loads(line[len(EXTRA_PREFIX):])
+    except ValueError:
+        return {}
+    return extra if isinstance(extra, dict) else {}
+
+
+def iter_log_entries(lines):
+    """Yield LogEntry objects from an iterable of log lines.
+
+    Lines are consumed one at a time, so arbitrarily large files are parsed
+    in constant memory (apart from a single entry's traceback).
+    """
+    current = None
+    extra = {}
+    details = []
+
+    for line in lines:
+        line = line.rstrip('\r\n')
+        match = HEADER_RE.match(line)
+        if match:
+            if current is not None:
+                yield LogEntry(*current, extra, details)
+            timestamp, logger_name, level, message = match.groups()
+            current = (parse_timestamp(timestamp), logger_name, level, message)
+            extra = {}
+            details = []
+        elif current is None or not line:
+            continue
+        elif line.startswith(EXTRA_PREFIX) and not extra and not details:
+            extra = _decode_extra(line)
+        else:
+            details.append(line)
+
+    if current is not None:
+        yield LogEntry(*current, extra, details)
+
+
+def log_files(paths, start_date=None, end_date=None):
+    """Expand files, directories and globs into daily log files in date order.
+
+    ``start_date``/``end_date`` (datetime.date, inclusive) filter on the
+    YYYY-MM-DD file name; files without a date in their name are kept.
+    """
+    files = set()
+    for path in paths:
+        if os.path.isdir(path):
+            files.update(glob.glob(os.path.join(path, '*.log')))
+        else:
+            files.update(glob.glob(path) or [path])
+
+    selected = []
+    for file_path in files:
+        match = LOG_FILE_RE.search(os.path.basename(file_path))
+        if match:
+            file_date = datetime.strptime(match.group(1), '%Y-%m-%d').date()
+            if start_date and file_date < start_date:
+                continue
+            if end_date and file_date > end_date:
+                continue
+        selected.append(file_path)
+    return sorted(selected)
+
+
+def iter_log_files(paths, start_date=None, end_date=None):
+    """Yield LogEntry objects from several log files, file by file"""
+    for file_path in log_files(paths, start_date, end_date):
+        with open(file_path, encoding='utf-8', errors='replace') as f:
+            yield from iter_log_entries(f)
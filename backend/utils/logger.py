@@ -1,5 +1,6 @@
 import logging
 import sys
+import threading
 import os
 import json
 from datetime import datetime
@@ -7,6 +8,27 @@ from functools import wraps
 import traceback
 import functools
 
+# Attributes every LogRecord has; anything else was passed through ``extra=``
+STANDARD_RECORD_ATTRS = set(logging.LogRecord('', 0, '', 0, '', (), None).__dict__) | {
+    'message', 'asctime', 'timestamp', 'extra_json', 'stack_trace'
+}
+
+# Request headers holding credentials; their values are never logged
+SENSITIVE_HEADERS = frozenset({
+    'authorization', 'proxy-authorization', 'cookie', 'x-api-key', 'x-goog-api-key', 'x-firebase-appcheck'
+})
+REDACTED = '[redacted]'
+
+# Body/form fields whose values are logged; others (health and profile data,
+# chat messages, credentials) only by name
+LOGGED_BODY_FIELDS = frozenset({'food_item', 'food_items', 'preferences'})
+
+# ``extra=`` fields that carry user data (chat text, profile updates,
+# arguments and return values of logged functions); written as REDACTED
+REDACTED_EXTRA_FIELDS = frozenset({
+    'chat_message', 'update_data', 'question', 'matched', 'function_args', 'function_kwargs', 'return_value'
+})
+
 class CustomFormatter(logging.Formatter):
     """Custom formatter that includes more detailed information"""
     
@@ -14,11 +36,13 @@ class CustomFormatter(logging.Formatter):
         # Add timestamp
         record.timestamp = datetime.now().isoformat()
         
-        # Add extra fields if they exist
-        if hasattr(record, 'extra'):
-            record.extra_json = json.dumps(record.extra)
-        else:
-            record.extra_json = '{}'
+        # Add extra fields if they exist (logging sets them as record attributes)
+        extra = {
+            key: REDACTED if key in REDACTED_EXTRA_FIELDS else value
+            for key, value in record.__dict__.items()
+            if key not in STANDARD_RECORD_ATTRS
+        }
+        record.extra_json = json.dumps(extra, default=str)
             
         # Add stack trace for errors
         if record.levelno >= logging.ERROR:
@@ -28,41 +52,60 @@ class CustomFormatter(logging.Formatter):
             
         return super().format(record)
 
+_handlers = None
+_handlers_lock = threading.Lock()
+
+def _shared_handlers():
+    """Console and file handlers, created once and shared by every logger"""
+    global _handlers
+    with _handlers_lock:
+        if _handlers is not None:
+            return _handlers
+
+        # Create console handler with custom formatting
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setLevel(logging.DEBUG)
+        console_formatter = CustomFormatter(
+            '%(timestamp)s - %(name)s - %(levelname)s - %(message)s\n'
+            'Extra: %(extra_json)s\n'
+            '%(stack_trace)s'
+        )
+        console_handler.setFormatter(console_formatter)
+
+        # Create the 'logs' directory if it doesn't exist
+        log_dir = 'logs'
+        if not os.path.exists(log_dir):
+            os.makedirs(log_dir)
+
+        # Create file handler with custom formatting
+        file_handler = logging.FileHandler(
+            f'logs/{datetime.now().strftime("%Y-%m-%d")}.log'
+        )
+        file_handler.setLevel(logging.DEBUG)
+        file_formatter = CustomFormatter(
+            '%(timestamp)s - %(name)s - %(levelname)s - %(message)s\n'
+            'Extra: %(extra_json)s\n'
+            '%(stack_trace)s'
+        )
+        file_handler.setFormatter(file_formatter)
+
+        _handlers = (console_handler, file_handler)
+        return _handlers
+
 def setup_logger(name):
-    """Set up a logger with both console and file handlers"""
+    """Set up a logger with both console and file handlers.
+
+    Can be called any number of times for the same name (e.g. in service
+    constructors): the handlers are attached once, so each record is
+    written once.
+    """
     logger = logging.getLogger(name)
     logger.setLevel(logging.DEBUG)
 
-    # Create console handler with custom formatting
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(logging.DEBUG)
-    console_formatter = CustomFormatter(
-        '%(timestamp)s - %(name)s - %(levelname)s - %(message)s\n'
-        'Extra: %(extra_json)s\n'
-        '%(stack_trace)s'
-    )
-    console_handler.setFormatter(console_formatter)
-
-    # Create the 'logs' directory if it doesn't exist
-    log_dir = 'logs'
-    if not os.path.exists(log_dir):
-        os.makedirs(log_dir)
-
-    # Create file handler with custom formatting
-    file_handler = logging.FileHandler(
-        f'logs/{datetime.now().strftime("%Y-%m-%d")}.log'
-    )
-    file_handler.setLevel(logging.DEBUG)
-    file_formatter = CustomFormatter(
-        '%(timestamp)s - %(name)s - %(levelname)s - %(message)s\n'
-        'Extra: %(extra_json)s\n'
-        '%(stack_trace)s'
-    )
-    file_handler.setFormatter(file_formatter)
-
     # Add handlers to logger
-    logger.addHandler(console_handler)
-    logger.addHandler(file_handler)
+    for handler in _shared_handlers():
+        if handler not in logger.handlers:
+            logger.addHandler(handler)
 
     return logger
 
@@ -119,6 +162,30 @@ def log_function_call(logger):
         return wrapper
     return decorator
 
+def _request_summary(request, body, user_id=None):
+    """What ``log_api_call`` records about a request: credential headers
+    redacted, and body values only for ``LOGGED_BODY_FIELDS``"""
+    headers = {
+        name: REDACTED if name.lower() in SENSITIVE_HEADERS else value
+        for name, value in request.headers.items()
+    }
+    summary = {
+        'method': request.method,
+        'url': request.url,
+        'headers': headers,
+        'args': dict(request.args),
+        'json': _logged_fields(body),
+        'json_fields': sorted(body) if isinstance(body, dict) else None
+    }
+    if user_id:
+        summary['user_id'] = user_id
+    return summary
+
+def _logged_fields(body):
+    if not isinstance(body, dict):
+        return None
+    return {key: value for key, value in body.items() if key in LOGGED_BODY_FIELDS}
+
 def log_api_call(logger):
     """Decorator to log API endpoint calls with request and response data"""
     def decorator(func):
@@ -126,15 +193,9 @@ def log_api_call(logger):
         def wrapper(*args, **kwargs):
             # Extract request data from Flask request
             from flask import request
-            request_data = {
-                'method': request.method,
-                'url': request.url,
-                'headers': dict(request.headers),
-                'args': dict(request.args),
-                'json': request.get_json(silent=True),
-                'form': dict(request.form),
-                'files': list(request.files.keys()) if request.files else None
-            }
+            request_data = _request_summary(request, request.get_json(silent=True), kwargs.get('user_id'))
+            request_data['form'] = _logged_fields(request.form.to_dict())
+            request_data['files'] = list(request.files.keys()) if request.files else None
             
             # Log request
             logger.info(
@@ -165,4 +226,43 @@ def log_api_call(logger):
                 raise
                 
         return wrapper
-    return decorator 
\ No newline at end of file
+    return decorator
+
+def log_async_api_call(logger):
+    """Async counterpart of log_api_call for the ASGI (Quart) routes.
+
+    Writes the same "API Request"/"API Response"/"API Error" entries so the
+    log tools treat both serving paths alike.
+    """
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            from quart import request
+            request_data = _request_summary(request, await request.get_json(silent=True), kwargs.get('user_id'))
+
+            logger.info(
+                f"API Request: {request.method} {request.url}",
+                extra={'request': request_data}
+            )
+
+            try:
+                result = await func(*args, **kwargs)
+
+                logger.info(
+                    f"API Response: {request.method} {request.url}",
+                    extra={'response': str(result)}
+                )
+
+                return result
+            except Exception as e:
+                logger.error(
+                    f"API Error: {request.method} {request.url}",
+                    extra={
+                        'request': request_data,
+                        'error': str(e)
+                    }
+                )
+                raise
+
+        return wrapper
+    return decorator
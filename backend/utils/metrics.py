@@ -0,0 +1,67 @@
+import os
+import threading
+import time
+
+from utils.logger import setup_logger
+
+# Set up logger
+logger = setup_logger('metrics')
+
+
+def _key(name, labels):
+    return (name, tuple(sorted(labels.items())))
+
+
+class MetricsRegistry:
+    """In-process counters and gauges.
+
+    Counters are incremented by the code paths they describe; gauges are
+    callables sampled when a snapshot is taken (queue lengths, limits). Each
+    worker process has its own registry, so under gunicorn every worker
+    reports its own numbers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._started = time.time()
+
+    def increment(self, name, value=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def counter(self, name, **labels):
+        with self._lock:
+            return self._counters.get(_key(name, labels), 0)
+
+    def register_gauge(self, name, func):
+        """Register ``func() -> number or dict`` to be sampled as ``name``"""
+        with self._lock:
+            self._gauges[name] = func
+
+    def snapshot(self):
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+
+        result = {
+            'pid': os.getpid(),
+            'uptime_s': round(time.time() - self._started, 1),
+            'counters': {},
+            'gauges': {},
+        }
+        for (name, labels), value in sorted(counters.items()):
+            label = ','.join(f'{k}={v}' for k, v in labels)
+            result['counters'][f'{name}{{{label}}}' if label else name] = value
+        for name, func in sorted(gauges.items()):
+            try:
+                result['gauges'][name] = func()
+            except Exception as e:
+                logger.error('Error sampling gauge', extra={'gauge': name, 'error': str(e)})
+        return result
+
+
+# Process-wide registry
+metrics = MetricsRegistry()
@@ -0,0 +1,131 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# Universal hashing (a * x + b) mod p, as in datasketch
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+def shingles(text, size=5):
+    """Character ``size``-grams of ``text`` (the text itself if shorter)"""
+    if len(text) <= size:
+        return {text}
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+class MinHasher:
+    """MinHash signatures of shingle sets with ``num_perm`` hash functions"""
+
+    def __init__(self, num_perm=64, seed=1):
+        self.num_perm = num_perm
+        generator = np.random.RandomState(seed)
+        self._a = generator.randint(1, (1 << 61) - 1, size=num_perm, dtype=np.uint64)
+        self._b = generator.randint(0, (1 << 61) - 1, size=num_perm, dtype=np.uint64)
+
+    def signature(self, items):
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(item.encode(), digest_size=4).digest(), 'little') for item in items),
+            dtype=np.uint64
+        )
+        if not len(hashes):
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        # Overflow wraps around in uint64, which is fine for hashing
+        with np.errstate(over='ignore'):
+            permuted = (np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=0)
+
+
+class MinHashLSH:
+    """Near-duplicate index of MinHash signatures with banded LSH.
+
+    Signatures are split into ``bands`` bands; entries sharing any band are
+    candidates, and a candidate matches when its estimated similarity is at
+    least ``threshold``. Holds at most ``max_entries`` entries for ``ttl``
+    seconds each, evicting the oldest first. Signatures live in one
+    preallocated matrix so that all candidates are scored at once.
+    """
+
+    def __init__(self, num_perm, bands, threshold, max_entries, ttl):
+        if num_perm % bands:
+            raise ValueError('num_perm must be a multiple of bands')
+        self.num_perm = num_perm
+        self.rows = num_perm // bands
+        self.bands = bands
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._signatures = np.zeros((max_entries, num_perm), dtype=np.uint64)
+        self._keys = [None] * max_entries
+        self._free = list(range(max_entries - 1, -1, -1))
+        # key -> (expires, slot, value), oldest first
+        self._entries = OrderedDict()
+        # Band value -> slots, one dict per band
+        self._buckets = [{} for _ in range(bands)]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _band_keys(self, signature):
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+
+    def _remove(self, key):
+        _, slot, _ = self._entries.pop(key)
+        for buckets, band_key in zip(self._buckets, self._band_keys(self._signatures[slot])):
+            bucket = buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(slot)
+                if not bucket:
+                    del buckets[band_key]
+        self._keys[slot] = None
+        self._free.append(slot)
+
+    def insert(self, key, signature, value):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            while not self._free:
+                self._remove(next(iter(self._entries)))
+            slot = self._free.pop()
+            self._signatures[slot] = signature
+            self._keys[slot] = key
+            self._entries[key] = (time.monotonic() + self.ttl, slot, value)
+            for buckets, band_key in zip(self._buckets, self._band_keys(signature)):
+                buckets.setdefault(band_key, set()).add(slot)
+
+    def get(self, key):
+        """Value stored under exactly ``key``, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                self._remove(key)
+                return None
+            return entry[2]
+
+    def query(self, signature):
+        """Best (key, value, similarity) at or above the threshold, or None"""
+        now = time.monotonic()
+        with self._lock:
+            candidates = set()
+            for buckets, band_key in zip(self._buckets, self._band_keys(signature)):
+                candidates.update(buckets.get(band_key, ()))
+            if not candidates:
+                return None
+            slots = np.fromiter(candidates, dtype=np.intp, count=len(candidates))
+            scores = np.count_nonzero(self._signatures[slots] == signature, axis=1) / self.num_perm
+            for index in np.argsort(-scores, kind='stable'):
+                if scores[index] < self.threshold:
+                    break
+                key = self._keys[slots[index]]
+                expires, _, value = self._entries[key]
+                if expires < now:
+                    self._remove(key)
+                    continue
+                return key, value, float(scores[index])
+            return None
@@ -0,0 +1,89 @@
+import cProfile
+import io
+import os
+import pstats
+from datetime import datetime
+from flask import request, g
+from config import Config
+from utils.logger import setup_logger
+
+# Set up logger
+logger = setup_logger('profiler')
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_QUERY_PARAM = 'profile'
+
+
+def _requested_profile_mode():
+    """Return 'file', 'inline' or None depending on the request flag"""
+    value = request.headers.get(PROFILE_HEADER) or request.args.get(PROFILE_QUERY_PARAM)
+    if not value:
+        return None
+
+    value = value.strip().lower()
+    if value == 'inline':
+        return 'inline'
+    if value in ('1', 'true', 'yes', 'file'):
+        return 'file'
+    return None
+
+
+def _start_profiling():
+    """Start a profiler for this request if it was asked for"""
+    mode = _requested_profile_mode()
+    if not mode:
+        return None
+
+    profiler = cProfile.Profile()
+    g.profiler = profiler
+    g.profile_mode = mode
+    profiler.enable()
+    return None
+
+
+def _stop_profiling(response):
+    """Stop the request profiler and write or return the profile"""
+    profiler = g.pop('profiler', None)
+    if profiler is None:
+        return response
+
+    profiler.disable()
+    mode = g.pop('profile_mode', 'file')
+
+    if mode == 'inline':
+        stream = io.StringIO()
+        stats = pstats.Stats(profiler, stream=stream)
+        stats.sort_stats(Config.PROFILE_SORT_KEY).print_stats(Config.PROFILE_INLINE_LIMIT)
+        logger.info('Returning inline profile', extra={'path': request.path})
+
+        response.set_data(stream.getvalue())
+        response.mimetype = 'text/plain'
+        return response
+
+    os.makedirs(Config.PROFILE_DIR, exist_ok=True)
+    file_name = '{}-{}-{}.prof'.format(
+        datetime.now().strftime('%Y%m%dT%H%M%S%f'),
+        request.method,
+        (request.endpoint or 'unknown').replace('.', '_')
+    )
+    profile_path = os.path.join(Config.PROFILE_DIR, file_name)
+    profiler.dump_stats(profile_path)
+    logger.info('Profile written', extra={'path': request.path, 'profile_path': profile_path})
+
+    response.headers['X-Profile-Path'] = file_name
+    return response
+
+
+def init_profiler(app):
+    """Register the per-request profiling hooks when profiling is enabled.
+
+    Nothing is registered when ``Config.PROFILING_ENABLED`` is off, so the
+    request path is untouched in that case.
+    """
+    if not Config.PROFILING_ENABLED:
+        return app
+
+    logger.warning('Per-request profiling is enabled', extra={'profile_dir': Config.PROFILE_DIR})
+    app.before_request(_start_profiling)
+    app.after_request(_stop_profiling)
+    return app
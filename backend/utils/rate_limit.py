@@ -0,0 +1,120 @@
+import importlib
+import math
+import threading
+import time
+from config import Config
+from utils.logger import setup_logger
+from utils.metrics import metrics
+
+# Set up logger
+logger = setup_logger('rate_limit')
+
+
+class RateLimitBackend:
+    """Where rate-limit counters live.
+
+    ``hit`` counts one request for ``key`` against every (limit, window)
+    pair in ``limits`` and returns 0 if it is allowed, else the seconds
+    until it would be. A rejected request must not be counted. Set
+    ``RATE_LIMIT_BACKEND`` to ``module:Class`` to use another
+    implementation (e.g. counters shared by all processes); it is created
+    without arguments, and ``hit`` runs on the request path, so it must be
+    fast.
+    """
+
+    def hit(self, key, limits, now):
+        raise NotImplementedError
+
+
+class LocalBackend(RateLimitBackend):
+    """Per-process sliding-window counters.
+
+    Each (key, window) keeps the counts of the current and the previous
+    fixed window; the previous count is weighted by how much of it still
+    overlaps the sliding window. That is three integers per counter, and
+    counters whose windows have passed are dropped once there are more than
+    ``max_keys``.
+    """
+
+    def __init__(self, max_keys=None):
+        self.max_keys = max_keys or Config.RATE_LIMIT_MAX_KEYS
+        self._lock = threading.Lock()
+        # (key, window) -> [window index, previous count, current count]
+        self._counters = {}
+
+    def __len__(self):
+        return len(self._counters)
+
+    def hit(self, key, limits, now):
+        with self._lock:
+            counters = []
+            over, retry_after = False, 0.0
+            for limit, window in limits:
+                index, offset = divmod(now, window)
+                counter = self._counters.get((key, window))
+                if counter is None:
+                    counter = self._counters[(key, window)] = [index, 0, 0]
+                elif counter[0] != index:
+                    # Roll over; a gap of more than one window clears both
+                    counter[1] = counter[2] if counter[0] == index - 1 else 0
+                    counter[2] = 0
+                    counter[0] = index
+                counters.append(counter)
+                previous, current = counter[1], counter[2]
+                if previous * (1 - offset / window) + current + 1 > limit:
+                    over = True
+                    retry_after = max(retry_after, self._wait(limit, window, offset, previous, current))
+            if over:
+                return max(retry_after, 0.001)
+            for counter in counters:
+                counter[2] += 1
+            if len(self._counters) > self.max_keys:
+                self._prune(now)
+            return 0
+
+    @staticmethod
+    def _wait(limit, window, offset, previous, current):
+        """Seconds until one more request fits under ``limit``"""
+        if current < limit:
+            # The previous window's share has to shrink
+            return max(window * (1 - (limit - 1 - current) / previous) - offset, 0.0) if previous else 0.0
+        # Only once this window's count has become the previous one
+        return window - offset + window * max(1 - (limit - 1) / current, 0.0)
+
+    def _prune(self, now):
+        stale = [
+            counter_key for counter_key, counter in self._counters.items()
+            if counter[0] < now // counter_key[1] - 1
+        ]
+        for counter_key in stale:
+            del self._counters[counter_key]
+        logger.debug('Pruned rate-limit counters', extra={'removed': len(stale), 'kept': len(self._counters)})
+
+
+class RateLimiter:
+    """Per-user, per-route request limits from ``RATE_LIMITS``"""
+
+    def __init__(self, limits, backend):
+        self.limits = limits
+        self.backend = backend
+        if isinstance(backend, LocalBackend):
+            metrics.register_gauge('rate_limit.counters', backend.__len__)
+
+    def check(self, user_id, route):
+        """Count a request; returns None if allowed, else the Retry-After seconds"""
+        limits = self.limits.get(route)
+        if not limits or not Config.RATE_LIMIT_ENABLED:
+            return None
+        retry_after = self.backend.hit(f'{route}:{user_id}', limits, time.time())
+        if not retry_after:
+            return None
+        metrics.increment('rate_limit.rejected', route=route)
+        return max(1, math.ceil(retry_after))
+
+
+def load_backend(spec):
+    """Backend named by ``RATE_LIMIT_BACKEND``: 'local' or 'module:Class'"""
+    if not spec or spec == 'local':
+        return LocalBackend()
+    module_name, _, class_name = spec.partition(':')
+    return getattr(importlib.import_module(module_name), class_name)()
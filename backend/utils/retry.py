@@ -0,0 +1,185 @@
+import math
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from utils.limiter import ServiceOverloaded
+from utils.logger import setup_logger
+from utils.metrics import metrics
+
+# Set up logger
+logger = setup_logger('retry')
+
+
+class DeadlineExceeded(ServiceOverloaded):
+    """The call's time budget ran out before the upstream answered"""
+
+    status = 504
+
+
+class CallPolicy:
+    """How one kind of upstream call is made; see Config.GEMINI_CALL_POLICIES"""
+
+    def __init__(self, budget, attempts=1, backoff_base=0.5, backoff_max=4.0,
+                 hedge_percentile=None, hedge_delay=None):
+        self.budget = budget
+        self.attempts = max(1, attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_percentile = hedge_percentile
+        self.hedge_delay = hedge_delay
+
+    @classmethod
+    def for_method(cls, policies, method):
+        return cls(**policies.get(method, policies['default']))
+
+
+class LatencyWindow:
+    """Latencies of the last ``size`` successful calls"""
+
+    def __init__(self, size=200):
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=size)
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct, min_samples=20):
+        """Nearest-rank percentile, or None until ``min_samples`` are recorded"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < min_samples:
+            return None
+        rank = math.ceil(pct / 100 * len(samples))
+        return samples[max(0, min(len(samples), rank) - 1)]
+
+
+def backoff_delay(retry, base, cap):
+    """Full-jitter exponential backoff before retry number ``retry`` (from 1)"""
+    return random.uniform(0, min(cap, base * 2 ** (retry - 1)))
+
+
+class RetryingCaller:
+    """Makes upstream calls under a CallPolicy.
+
+    The whole call, retries included, must finish within the policy's
+    budget; each attempt gets the time that is left. Transient errors are
+    retried with jittered backoff while the budget allows it. Hedged methods
+    send a duplicate request once the first has been outstanding longer
+    than the configured percentile of recent latencies, and return
+    whichever answers first; the slower request is abandoned and ends at
+    its own deadline.
+
+    Both requests of a hedged call run on a pool of ``hedge_threads``
+    threads, which should be large enough that they never wait for one:
+    every request in flight or queued in the limiter, plus a hedge for each
+    request in flight.
+    """
+
+    def __init__(self, name, is_transient, hedge_threads):
+        self.name = name
+        self.is_transient = is_transient
+        self._hedge_threads = hedge_threads
+        self._executor = None
+        self._lock = threading.Lock()
+        self._latencies = {}
+        metrics.register_gauge(f'{name}.latency_p95', lambda: self._percentiles(95))
+
+    def _window(self, method):
+        with self._lock:
+            window = self._latencies.get(method)
+            if window is None:
+                window = self._latencies[method] = LatencyWindow()
+            return window
+
+    def _percentiles(self, pct):
+        with self._lock:
+            windows = dict(self._latencies)
+        return {method: window.percentile(pct) for method, window in windows.items()}
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._hedge_threads, thread_name_prefix=f'{self.name}-hedge'
+                )
+            return self._executor
+
+    def call(self, method, policy, attempt):
+        """Run ``attempt(deadline, hedge)`` under ``policy``.
+
+        ``attempt`` makes one upstream request that must give up at
+        ``deadline`` (a time.monotonic() value); ``hedge`` is True for the
+        duplicate request of a hedged call.
+        """
+        deadline = time.monotonic() + policy.budget
+        for number in range(1, policy.attempts + 1):
+            try:
+                if policy.hedge_percentile is not None:
+                    return self._hedged(method, policy, attempt, deadline)
+                return self._timed(method, attempt, deadline, False)
+            except ServiceOverloaded:
+                raise
+            except Exception as e:
+                if not self.is_transient(e):
+                    raise
+                last = number == policy.attempts
+                delay = 0 if last else backoff_delay(number, policy.backoff_base, policy.backoff_max)
+                # Out of budget: the attempt timed out, or no time to retry
+                if time.monotonic() + delay >= deadline:
+                    metrics.increment(f'{self.name}.deadline_exceeded', method=method)
+                    raise DeadlineExceeded(f'{self.name} did not answer in time') from e
+                if last:
+                    raise
+                metrics.increment(f'{self.name}.retries', method=method)
+                logger.warning('Retrying after transient error', extra={
+                    'upstream': self.name,
+                    'method': method,
+                    'attempt': number,
+                    'delay': round(delay, 3),
+                    'error': str(e)
+                })
+                time.sleep(delay)
+
+    def _timed(self, method, attempt, deadline, hedge, start=None):
+        """One attempt; its latency counts from ``start`` (when it was submitted)"""
+        if time.monotonic() >= deadline:
+            raise DeadlineExceeded(f'{self.name} did not answer in time')
+        start = start or time.monotonic()
+        result = attempt(deadline, hedge)
+        self._window(method).record(time.monotonic() - start)
+        return result
+
+    def _hedged(self, method, policy, attempt, deadline):
+        executor = self._pool()
+        first = executor.submit(self._timed, method, attempt, deadline, False, time.monotonic())
+        delay = self._window(method).percentile(policy.hedge_percentile)
+        if delay is None:
+            delay = policy.hedge_delay
+        done, _ = wait([first], timeout=max(0, min(delay, deadline - time.monotonic())))
+        if done:
+            return first.result()
+
+        pending = {first}
+        if time.monotonic() < deadline:
+            metrics.increment(f'{self.name}.hedges', method=method)
+            pending.add(executor.submit(self._timed, method, attempt, deadline, True, time.monotonic()))
+
+        while pending:
+            done, pending = wait(pending, timeout=max(0, deadline - time.monotonic()),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                metrics.increment(f'{self.name}.deadline_exceeded', method=method)
+                raise DeadlineExceeded(f'{self.name} did not answer in time')
+            for future in done:
+                if future.exception() is None:
+                    if future is not first:
+                        metrics.increment(f'{self.name}.hedge_wins', method=method)
+                    return future.result()
+
+        # Both failed; the first request's error is the informative one
+        # (a hedge is shed when the limiter has no spare capacity)
+        raise first.exception()
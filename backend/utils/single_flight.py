@@ -0,0 +1,69 @@
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it
+    is in flight wait for it and receive the same result, or the same
+    exception. Nothing is cached: once the call finishes, the next caller
+    starts a new one.
+    """
+
+    def __init__(self, on_join=None):
+        """``on_join(key)`` is called for every caller that joins a call"""
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._on_join = on_join
+
+    def do(self, key, func, *args, **kwargs):
+        """Run or join the call for ``key``.
+
+        Returns (result, shared) where ``shared`` is True for callers that
+        joined another caller's execution.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                leader = True
+
+        if not leader:
+            if self._on_join is not None:
+                self._on_join(key)
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = func(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self):
+        """Number of distinct calls currently executing"""
+        with self._lock:
+            return len(self._calls)
+
+    def waiting(self):
+        """Number of callers currently waiting on another caller's execution"""
+        with self._lock:
+            return sum(call.waiters for call in self._calls.values())
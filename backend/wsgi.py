@@ -0,0 +1,10 @@
+"""WSGI entry point for production servers.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Imported by each gunicorn worker after forking, so the Firebase and Gemini
+clients created in ``create_app`` belong to the worker process.
+"""
+from app import create_app
+
+app = create_app()
@@ -3,6 +3,7 @@ import { View, Text, ScrollView, StyleSheet, ActivityIndicator, Alert, Touchable
 import axios from 'axios';
 import { auth } from '../../firebase';
 import { logger } from '../../utils/logger';
+import { parseLlmOutput } from '../../utils/llmOutput';
 import API_URL from '../../backendurl';
 
 interface HealthAdvice {
@@ -42,7 +43,7 @@ const AdvicePage: React.FC = () => {
         },
       });
 
-      const adviceData = JSON.parse(response.data.advice)[0];
+      const adviceData = parseLlmOutput(response.data.advice)[0];
       logger.info('Health advice received', {
         hasAdvice: !!adviceData,
         timestamp: adviceData?.timestamp
@@ -87,7 +88,7 @@ const AdvicePage: React.FC = () => {
         },
       });
 
-      const adviceData = JSON.parse(response.data.advice)[0];
+      const adviceData = parseLlmOutput(response.data.advice)[0];
       logger.info('New health advice generated', {
         hasAdvice: !!adviceData,
         timestamp: adviceData?.timestamp
@@ -3,6 +3,7 @@ import { View, TextInput, Button, Alert, StyleSheet, Text, ScrollView, ActivityI
 import axios from 'axios';
 import { auth } from '../../firebase';
 import { logger } from '../../utils/logger';
+import { parseLlmOutput } from '../../utils/llmOutput';
 import API_URL from '../../backendurl';
 
 interface MacroBreakdown {
@@ -91,7 +92,7 @@ const DietPage: React.FC = () => {
         dataLength: response.data?.macro_breakdown?.length
       });
 
-      const parsedMacros = JSON.parse(response.data.macro_breakdown);
+      const parsedMacros = parseLlmOutput(response.data.macro_breakdown);
       logger.info('Successfully parsed macro breakdown', {
         macroCount: parsedMacros.length,
         macros: parsedMacros
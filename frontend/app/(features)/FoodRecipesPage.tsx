@@ -4,6 +4,7 @@ import * as DocumentPicker from 'expo-document-picker';
 import axios from 'axios';
 import { auth } from '../../firebase';
 import { logger } from '../../utils/logger';
+import { parseLlmOutput } from '../../utils/llmOutput';
 import API_URL from '../../backendurl'; // Import API_URL
 
 interface Recipe {
@@ -113,7 +114,7 @@ const FoodRecipesPage: React.FC = () => {
         hasRecipe: !!uploadResponse.data.recipe
       });
 
-      const parsedRecipe = JSON.parse(uploadResponse.data.recipe);
+      const parsedRecipe = parseLlmOutput(uploadResponse.data.recipe);
       logger.info('Recipe parsed successfully', {
         recipeCount: parsedRecipe.length,
         firstRecipe: parsedRecipe[0]?.recipeName
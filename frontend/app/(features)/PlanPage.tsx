@@ -3,6 +3,7 @@ import { View, TextInput, Alert, Text, StyleSheet, ScrollView, ActivityIndicator
 import axios from 'axios';
 import { auth } from '../../firebase';
 import { logger } from '../../utils/logger';
+import { parseLlmOutput } from '../../utils/llmOutput';
 import API_URL from '../../backendurl';
 
 interface MealPlan {
@@ -71,7 +72,7 @@ const PlanPage: React.FC = () => {
       
       if (response.data) {
         setPlanHistory([response.data]);
-        setPlan(JSON.parse(response.data.plan));
+        setPlan(parseLlmOutput(response.data.plan));
       }
     } catch (error: any) {
       if (error.response?.status === 404) {
@@ -127,7 +128,7 @@ const PlanPage: React.FC = () => {
         planCount: response.data?.length
       });
       
-      const parsedPlan = JSON.parse(response.data.plan);
+      const parsedPlan = parseLlmOutput(response.data.plan);
       setPlan(parsedPlan);
       await fetchPlanHistory(); // Refresh history after new plan
       Alert.alert('Success', 'New meal plan generated successfully');
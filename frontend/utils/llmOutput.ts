@@ -0,0 +1,5 @@
+// Plans, advice, recipes and macro breakdowns come back from the backend as
+// JSON values; older backends sent them as JSON-encoded strings.
+export function parseLlmOutput<T = any>(value: unknown): T {
+  return (typeof value === 'string' ? JSON.parse(value) : value) as T;
+}